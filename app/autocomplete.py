@@ -0,0 +1,120 @@
+from bisect import bisect_left, insort
+import heapq
+
+# Prefixes matching more notes than this get a memoized, incrementally updated top list
+SCAN_LIMIT = 256
+
+class CategoryNotesIndex:
+    """Sorted prefix index over the notes of one category, ranked by frequency then recency."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.keys = []      # sorted lowercase notes, searched with bisect
+        self.notes = {}     # lowercase note -> [display text, count, last_used]
+        self._top = {}      # prefix -> memoized top notes (lowercase), best first
+
+    def _rank(self, key):
+        _, count, last_used = self.notes[key]
+        return (count, last_used)
+
+    def add(self, note, last_used):
+        key = note.lower()
+        entry = self.notes.get(key)
+        if entry is None:
+            self.notes[key] = [note, 1, last_used]
+            insort(self.keys, key)
+        else:
+            entry[0] = note  # most recent spelling wins
+            entry[1] += 1
+            entry[2] = max(entry[2], last_used)
+
+        # Scores only ever grow, so a memoized top list just needs this note re-placed
+        for length in range(1, len(key) + 1):
+            top = self._top.get(key[:length])
+            if top is None:
+                continue
+            if key in top:
+                top.sort(key=self._rank, reverse=True)
+            elif len(top) < self.limit or self._rank(key) > self._rank(top[-1]):
+                top.append(key)
+                top.sort(key=self._rank, reverse=True)
+                del top[self.limit:]
+
+    def warm(self):
+        """Precompute top lists for single-character prefixes, the most expensive lookups."""
+        for first in {key[0] for key in self.keys}:
+            self.lookup(first)
+
+    def lookup(self, prefix):
+        prefix = prefix.lower()
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + '\U0010ffff', lo)
+        if hi - lo <= SCAN_LIMIT:
+            top = heapq.nlargest(self.limit, self.keys[lo:hi], key=self._rank)
+        else:
+            top = self._top.get(prefix)
+            if top is None:
+                top = heapq.nlargest(self.limit, self.keys[lo:hi], key=self._rank)
+                self._top[prefix] = top
+        return [self.notes[key][0] for key in top]
+
+class NotesIndex:
+    """Per-category prefix index over past notes for the GUI autocomplete.
+
+    Lookups cost O(log n) plus at most SCAN_LIMIT ranked candidates, and popular short
+    prefixes are served from memoized top lists, so they stay fast with hundreds of
+    thousands of distinct notes. New notes are added incrementally.
+    """
+
+    def __init__(self, limit=5):
+        self.limit = limit
+        self._categories = {}
+        self._clock = 0
+
+    def add(self, category, note):
+        """Record one use of note in category."""
+        if not isinstance(note, str):
+            return
+        note = note.strip()
+        if not note:
+            return
+        self._clock += 1
+        index = self._categories.get(category)
+        if index is None:
+            index = self._categories[category] = CategoryNotesIndex(self.limit)
+        index.add(note, self._clock)
+
+    def lookup(self, category, prefix):
+        """Return up to `limit` notes of category starting with prefix, best ranked first."""
+        if not prefix:
+            return []
+        index = self._categories.get(category)
+        if index is None:
+            return []
+        return index.lookup(prefix)
+
+    @classmethod
+    def from_frame(cls, df, limit=5):
+        """Build the index from the ledger in one pass; later rows count as more recent."""
+        index = cls(limit)
+        notes = df[['Category', 'Notes']].astype(object).dropna()
+        notes = notes[notes['Notes'].map(lambda n: isinstance(n, str))]
+        notes = notes.assign(Notes=notes['Notes'].str.strip(), Order=range(1, len(notes) + 1))
+        notes = notes[notes['Notes'] != '']
+        notes = notes.assign(Key=notes['Notes'].str.lower())
+
+        # Count and last use per (category, note), keeping the latest spelling
+        grouped = notes.groupby(['Category', 'Key'], sort=False).agg(
+            Note=('Notes', 'last'), Count=('Notes', 'size'), LastUsed=('Order', 'max'))
+        for category, group in grouped.groupby(level='Category', sort=False):
+            category_index = index._categories[category] = CategoryNotesIndex(limit)
+            keys = group.index.get_level_values('Key').tolist()
+            category_index.notes = {
+                key: [note, count, last_used]
+                for key, note, count, last_used in zip(
+                    keys, group['Note'].tolist(), group['Count'].tolist(), group['LastUsed'].tolist())
+            }
+            category_index.keys = sorted(keys)
+            category_index.warm()
+        index._clock = int(notes['Order'].max()) if not notes.empty else 0
+        return index
@@ -0,0 +1,154 @@
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+import time
+
+from app.instrument import instrumentation
+
+class TkWorker:
+    """Runs blocking work (loads, saves, backups) on a thread pool and hands results back to Tk.
+
+    Tk is not thread-safe, so finished jobs are queued and picked up by a poll loop that runs
+    on the Tk thread through root.after. `on_status` is called on the Tk thread with the label
+    of the oldest running job, or None when the worker is idle.
+
+    Each job is timed as 'gui.job' from submit until its callback has run, which is the
+    latency the user sees.
+    """
+    POLL_MS = 50
+
+    def __init__(self, root, max_workers=2, on_status=None):
+        self.root = root
+        self.on_status = on_status
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="expense-io")
+        self._done = queue.Queue()
+        self._running = []
+        self._lock = threading.Lock()
+        self._polling = False
+
+    def submit(self, label, func, *args, on_done=None, on_error=None):
+        """Run func(*args) in the background, then on_done(result) or on_error(exc) on the Tk thread."""
+        started = time.perf_counter()
+        with self._lock:
+            self._running.append(label)
+        future = self._executor.submit(func, *args)
+        future.add_done_callback(lambda f: self._done.put((label, started, f, on_done, on_error)))
+        self._report_status()
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.POLL_MS, self._poll)
+        return future
+
+    def _poll(self):
+        while True:
+            try:
+                label, started, future, on_done, on_error = self._done.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._running.remove(label)
+            exc = future.exception()
+            if exc is not None:
+                if on_error:
+                    on_error(exc)
+                else:
+                    print(f"❌ {label} failed: {exc}")
+            elif on_done:
+                on_done(future.result())
+            instrumentation.record('gui.job', started, time.perf_counter(), {'label': label})
+            self._report_status()
+
+        with self._lock:
+            busy = bool(self._running)
+        if busy:
+            self.root.after(self.POLL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def _report_status(self):
+        if self.on_status:
+            with self._lock:
+                label = self._running[0] if self._running else None
+            self.on_status(label)
+
+    def is_busy(self):
+        with self._lock:
+            return bool(self._running)
+
+    def shutdown(self):
+        """Wait for running jobs to finish (used on exit)."""
+        self._executor.shutdown(wait=True)
+
+class SaveCoalescer:
+    """Collects submitted expenses and writes a burst of them with a single save.
+
+    Each add restarts a short timer; when it fires, everything queued so far is handed
+    to `save_batch(entries)` on the worker. Entries added while a save is running are
+    kept for the next one. The worker must run one job at a time (max_workers=1), so
+    saves never overlap and a job submitted after flush() sees the flushed entries saved.
+    """
+    DELAY_MS = 400
+
+    def __init__(self, root, worker, save_batch, on_saved=None, on_error=None):
+        self.root = root
+        self.worker = worker
+        self.save_batch = save_batch
+        self.on_saved = on_saved
+        self.on_error = on_error
+        self.pending = []
+        self._timer = None
+        self._in_flight = []  # (batch, future) per submitted save, oldest first
+
+    def add(self, entry):
+        self.pending.append(entry)
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+        self._timer = self.root.after(self.DELAY_MS, self._flush_when_idle)
+
+    def _flush_when_idle(self):
+        self._timer = None
+        # A running save picks the queue up when it finishes, as one batch
+        if not self._in_flight:
+            self.flush()
+
+    def flush(self):
+        """Submit everything queued now, even behind a running save."""
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+            self._timer = None
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        label = f"Saving {len(batch)} expense{'s' if len(batch) != 1 else ''}"
+        future = self.worker.submit(label, self.save_batch, batch,
+                                    on_done=lambda _: self._finished(batch, None),
+                                    on_error=lambda e: self._finished(batch, e))
+        self._in_flight.append((batch, future))
+
+    def _finished(self, batch, error):
+        self._in_flight = [(b, f) for b, f in self._in_flight if b is not batch]
+        if error is not None:
+            # Put the batch back so nothing is lost, and let the caller report it
+            self.pending[:0] = batch
+            if self.on_error:
+                self.on_error(error)
+            return
+        if self.on_saved:
+            self.on_saved(batch)
+        if self.pending and not self._in_flight:
+            self.flush()
+
+    def flush_now(self):
+        """Write everything still queued synchronously (used on exit)."""
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+            self._timer = None
+        self.worker.shutdown()
+        # The Tk callbacks of saves that ended after the main loop stopped never run,
+        # so failed batches are taken back here
+        failed = [entry for batch, future in self._in_flight if future.exception() is not None
+                  for entry in batch]
+        self._in_flight = []
+        batch, self.pending = failed + self.pending, []
+        if batch:
+            self.save_batch(batch)
@@ -0,0 +1,312 @@
+from datetime import datetime
+from pathlib import Path
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.schema import CENTS, as_cents, concat_frames, to_file_frame
+from app.storage import (
+    COLUMNS, PartitionedStorage, empty_frame, get_storage, get_storage_for_path, month_rows, normalize_frame,
+    on_files_reshuffled, sort_by_date, split_by_month,
+)
+
+# Snapshots are lists of month chunks; a chunk is stored once under the hash of its
+# rows, so a backup only writes the months that changed since any earlier snapshot.
+BACKUP_DIRNAME = 'backups'
+SNAPSHOT_ID_FORMAT = '%Y%m%dT%H%M%S%f'
+CHUNK_BACKEND = 'parquet'
+
+# Retention tier -> how snapshots are bucketed; the newest snapshot of each bucket is kept.
+# 'latest' puts every snapshot in its own bucket, i.e. keeps the N most recent ones.
+RETENTION_PERIODS = {
+    'latest': None,
+    'hourly': '%Y-%m-%d %H',
+    'daily': '%Y-%m-%d',
+    'monthly': '%Y-%m',
+}
+
+def get_backup_dir(filepath):
+    """Backups of data/Expense_Tracker.* live in data/backups/Expense_Tracker/."""
+    filepath = Path(filepath)
+    return filepath.parent / BACKUP_DIRNAME / filepath.stem
+
+def content_hash(rows):
+    """Hash of the rows' values, independent of the index and of how they are stored."""
+    rows = to_file_frame(rows[COLUMNS].reset_index(drop=True))
+    rows = rows.assign(Amount=rows['Amount'].astype(float))
+    row_hashes = pd.util.hash_pandas_object(rows, index=False).to_numpy()
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()
+
+def file_digest(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+def partition_files(filepath):
+    """month -> partition file name of a partitioned ledger, or None for the other backends.
+
+    Partition files are never overwritten, so a month whose file name is unchanged has
+    unchanged rows.
+    """
+    storage = get_storage_for_path(filepath)
+    if not isinstance(storage, PartitionedStorage):
+        return None
+    return {month: partition['file'] for month, partition in storage.load_manifest(filepath)['partitions'].items()}
+
+def _signature_to_json(signature):
+    return [list(part) if part is not None else None for part in signature] if signature else None
+
+def _signature_from_json(saved):
+    return tuple(tuple(part) if part is not None else None for part in saved) if saved else None
+
+def _write_json(data, path):
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, path)
+
+class BackupStore:
+    """Content-addressed, incremental snapshots of one ledger.
+
+    Layout under the backup directory:
+        chunks/ab/abcdef....parquet   one month of rows, named by content_hash
+        snapshots/<id>.json           manifest: creation time, totals and the month chunks
+        state.json                    data file signature (and partition files) of the newest snapshot
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.chunk_dir = self.root / 'chunks'
+        self.snapshot_dir = self.root / 'snapshots'
+        self.state_path = self.root / 'state.json'
+
+    # ---------- Snapshots ----------
+
+    def snapshots(self):
+        """All manifests, oldest first."""
+        if not self.snapshot_dir.exists():
+            return []
+        manifests = []
+        for path in sorted(self.snapshot_dir.glob('*.json')):
+            with open(path, encoding='utf-8') as f:
+                manifests.append(json.load(f))
+        return manifests
+
+    def get(self, snapshot_id):
+        path = self.snapshot_dir / f"{snapshot_id}.json"
+        if not path.exists():
+            raise ValueError(f"Unknown backup snapshot '{snapshot_id}'")
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def find(self, at=None):
+        """Return the newest snapshot taken at or before `at` (default: now), or None."""
+        cutoff = pd.Timestamp(at or datetime.now()).to_pydatetime()
+        candidates = [s for s in self.snapshots() if datetime.fromisoformat(s['created']) <= cutoff]
+        return candidates[-1] if candidates else None
+
+    def _chunk_path(self, digest, suffix):
+        return self.chunk_dir / digest[:2] / f"{digest}{suffix}"
+
+    def _existing_chunks(self):
+        """content hash -> chunk file, for every stored chunk."""
+        if not self.chunk_dir.exists():
+            return {}
+        return {path.name.split('.')[0]: path for path in self.chunk_dir.glob('*/*')
+                if '.tmp' not in path.name}
+
+    def _months_to_hash(self, df, latest, changed_months):
+        """Yield (month, rows or None); None means the month is reused from the latest snapshot."""
+        if latest is None or changed_months is None:
+            yield from split_by_month(df)
+            return
+        if not df['Date'].is_monotonic_increasing:
+            df = sort_by_date(df)
+        previous = {c['month'] for c in latest['chunks']}
+        for month in sorted(previous | set(changed_months)):
+            if month not in changed_months:
+                yield month, None
+                continue
+            rows = month_rows(df, month)
+            if len(rows):
+                yield month, rows
+
+    def _chunk_cents(self, chunk):
+        """Amount total of a stored chunk in cents (read from the file for older manifests)."""
+        if 'cents' in chunk:
+            return chunk['cents']
+        path = self.root / chunk['file']
+        return int(as_cents(normalize_frame(get_storage_for_path(path).read(path))['Amount']).sum())
+
+    def create(self, df, signature=None, now=None, changed_months=None, partitions=None):
+        """Snapshot df, writing only months not already stored. Returns (manifest, chunks written).
+
+        changed_months, if given, lists the only months that can differ from the newest
+        snapshot (e.g. the months of rows appended to the journal since); the others are
+        taken from that snapshot without hashing them again, so df only needs the rows of
+        those months. partitions (see partition_files) is kept with the signature. Returns
+        (None, 0) when the ledger is unchanged since the newest snapshot.
+        """
+        if signature is not None and signature == self.saved_signature():
+            return None, 0
+
+        storage = get_storage(CHUNK_BACKEND)
+        existing = self._existing_chunks()
+        latest = (self.snapshots() or [None])[-1]
+        previous = {c['month']: c for c in latest['chunks']} if latest else {}
+        checksums = {c['hash']: c['sha256'] for c in previous.values()}
+        chunks, written = [], 0
+        for month, rows in self._months_to_hash(df, latest, changed_months):
+            if rows is None:
+                chunks.append(previous[month])
+                continue
+            digest = content_hash(rows)
+            path = existing.get(digest)
+            if path is None:
+                path = self._chunk_path(digest, storage.suffix)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(f"{digest}.tmp{path.suffix}")
+                storage.write(rows.reset_index(drop=True), tmp_path)
+                os.replace(tmp_path, path)
+                existing[digest] = path
+                written += 1
+            chunks.append({
+                'month': month,
+                'hash': digest,
+                'rows': len(rows),
+                'cents': int(as_cents(rows['Amount']).sum()),
+                'file': path.relative_to(self.root).as_posix(),
+                'sha256': checksums.get(digest) or file_digest(path),
+            })
+
+        if latest is not None and [c['hash'] for c in latest['chunks']] == [c['hash'] for c in chunks]:
+            # Same content as the newest snapshot, e.g. after a compaction in another process
+            self._save_state(latest['id'], signature, partitions)
+            return None, 0
+
+        now = now or datetime.now()
+        manifest = {
+            'id': now.strftime(SNAPSHOT_ID_FORMAT),
+            'created': now.isoformat(),
+            'rows': sum(c['rows'] for c in chunks),
+            'total': sum(self._chunk_cents(c) for c in chunks) / CENTS,
+            'chunks': chunks,
+        }
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        _write_json(manifest, self.snapshot_dir / f"{manifest['id']}.json")
+        self._save_state(manifest['id'], signature, partitions)
+        return manifest, written
+
+    def load(self, manifest):
+        """Reassemble the ledger of a snapshot."""
+        frames = [normalize_frame(get_storage_for_path(self.root / chunk['file']).read(self.root / chunk['file']))
+                  for chunk in manifest['chunks']]
+        # Chunks are stored without the in-memory schema (a month without notes has an
+        # all-null Notes column), so they are normalized before being put together
+        frames = [f for f in frames if len(f)]
+        if not frames:
+            return empty_frame()
+        return normalize_frame(concat_frames(frames)[COLUMNS])
+
+    # ---------- State used to skip unchanged backups ----------
+
+    def _state(self):
+        if not self.state_path.exists():
+            return {}
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def saved_signature(self):
+        return _signature_from_json(self._state().get('signature'))
+
+    def saved_partitions(self):
+        """Partition files of the newest snapshot's ledger, or None if not recorded."""
+        return self._state().get('partitions')
+
+    def _save_state(self, snapshot_id, signature, partitions=None):
+        self.root.mkdir(parents=True, exist_ok=True)
+        _write_json({'snapshot': snapshot_id, 'signature': _signature_to_json(signature),
+                     'partitions': partitions}, self.state_path)
+
+    # ---------- Integrity ----------
+
+    def verify(self, deep=False):
+        """Check every snapshot's chunks exist and are intact. Returns a list of problems.
+
+        The quick check compares file checksums; deep=True also re-reads each chunk and
+        recomputes its content hash and row count.
+        """
+        problems, checked = [], {}
+        for manifest in self.snapshots():
+            for chunk in manifest['chunks']:
+                if chunk['hash'] not in checked:
+                    checked[chunk['hash']] = self._verify_chunk(chunk, deep)
+                if checked[chunk['hash']]:
+                    problems.append(f"{manifest['id']} {chunk['month']}: {checked[chunk['hash']]}")
+        return problems
+
+    def _verify_chunk(self, chunk, deep):
+        path = self.root / chunk['file']
+        if not path.exists():
+            return "chunk file is missing"
+        if file_digest(path) != chunk['sha256']:
+            return "chunk file checksum mismatch"
+        if deep:
+            try:
+                rows = get_storage_for_path(path).read(path)
+            except Exception as e:
+                return f"chunk file is unreadable ({e})"
+            if len(rows) != chunk['rows']:
+                return f"expected {chunk['rows']} rows, found {len(rows)}"
+            if content_hash(rows) != chunk['hash']:
+                return "chunk content hash mismatch"
+        return None
+
+    # ---------- Retention ----------
+
+    def prune(self, keep, now=None):
+        """Drop snapshots outside the retention policy and unreferenced chunks.
+
+        keep maps a RETENTION_PERIODS tier to how many of its most recent buckets keep a
+        snapshot, e.g. {'latest': 10, 'hourly': 24, 'daily': 30, 'monthly': 12}. The newest snapshot is
+        always kept. Returns the ids of the removed snapshots.
+        """
+        snapshots = self.snapshots()
+        if not snapshots:
+            return []
+
+        kept = {snapshots[-1]['id']}
+        for tier, count in keep.items():
+            buckets = set()
+            for manifest in reversed(snapshots):
+                period = RETENTION_PERIODS[tier]
+                bucket = datetime.fromisoformat(manifest['created']).strftime(period) if period else manifest['id']
+                if bucket in buckets:
+                    continue
+                if len(buckets) >= count:
+                    break
+                buckets.add(bucket)
+                kept.add(manifest['id'])
+
+        removed = [m['id'] for m in snapshots if m['id'] not in kept]
+        for snapshot_id in removed:
+            (self.snapshot_dir / f"{snapshot_id}.json").unlink()
+
+        referenced = {c['hash'] for m in snapshots if m['id'] in kept for c in m['chunks']}
+        for digest, path in self._existing_chunks().items():
+            if digest not in referenced:
+                path.unlink()
+        return removed
+
+def _touch_backup_state(filepath, old_signature, new_signature):
+    """Compaction doesn't change content, so an up-to-date backup stays up to date."""
+    store = BackupStore(get_backup_dir(filepath))
+    if old_signature is not None and store.saved_signature() == old_signature:
+        # Compaction writes new partition files for the months of the journal
+        store._save_state(store._state().get('snapshot'), new_signature, partition_files(filepath))
+
+on_files_reshuffled(_touch_backup_state)
@@ -0,0 +1,71 @@
+import threading
+
+class DatasetCache:
+    """Process-wide in-memory copy of the ledger.
+
+    Entries are keyed on the data file path and validated against a file signature
+    (mtime and size of the data file and its journal), so a change made by another
+    process triggers a reload while repeated reads in this process cost nothing.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.version = 0
+
+    def get(self, key, signature):
+        """Return the cached DataFrame if it is still valid, otherwise None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['signature'] == signature:
+                self.hits += 1
+                return entry['df']
+            self.misses += 1
+            if entry is not None:
+                # The files changed behind our back
+                self.reloads += 1
+                del self._entries[key]
+            return None
+
+    def peek(self, key, signature):
+        """Like get, but without touching the counters."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['signature'] == signature:
+                return entry['df']
+            return None
+
+    def store(self, key, signature, df):
+        with self._lock:
+            self._entries[key] = {'signature': signature, 'df': df}
+            self.version += 1
+
+    def touch(self, key, signature):
+        """Record a new signature for unchanged content (e.g. after compaction)."""
+        with self._lock:
+            if key in self._entries:
+                self._entries[key]['signature'] = signature
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self.version += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'reloads': self.reloads,
+                'version': self.version,
+                'entries': len(self._entries),
+            }
+
+# Shared by the GUI, the CLI and the tools running in this process
+dataset_cache = DatasetCache()
@@ -0,0 +1,321 @@
+import argparse
+import csv
+import json
+import math
+import sys
+from datetime import datetime
+
+# Non-interactive commands of main.py. Each one loads the data at most once and writes
+# at most once, so a script can pipe thousands of expenses through one `add --from-stdin`.
+
+# Exit codes, so scripts can tell failures apart without parsing messages
+EXIT_OK = 0
+EXIT_ERROR = 1          # unexpected failure
+EXIT_USAGE = 2          # bad command line (argparse)
+EXIT_INVALID_INPUT = 3  # one or more expenses were rejected
+EXIT_NO_DATA = 4        # no data file, or nothing matched
+
+# Dates are accepted in the interactive DD/MM/YYYY form and in ISO or storage order
+DATE_INPUT_FORMATS = ('%d/%m/%Y', '%Y-%m-%d', '%Y/%m/%d')
+
+FIELDS = ('Date', 'Category', 'Amount', 'Notes')
+
+# ========== PARSING ENTRIES ==========
+
+def parse_date(text):
+    """Return a DD/MM/YYYY, YYYY-MM-DD or YYYY/MM/DD date as YYYY/MM/DD text."""
+    for fmt in DATE_INPUT_FORMATS:
+        try:
+            return datetime.strptime(text.strip(), fmt).strftime('%Y/%m/%d')
+        except ValueError:
+            continue
+    raise ValueError(f"invalid date '{text}' (use DD/MM/YYYY or YYYY-MM-DD)")
+
+def parse_entry(record, categories):
+    """Validate one {'Date', 'Category', 'Amount', 'Notes'} record into a ledger entry."""
+    record = {str(k).strip().title(): v for k, v in record.items() if k is not None}
+    missing = [field for field in FIELDS[:3] if record.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+
+    by_name = {c.lower(): c for c in categories}
+    category = by_name.get(str(record['Category']).strip().lower())
+    if category is None:
+        raise ValueError(f"unknown category '{record['Category']}' (choose from: {', '.join(categories)})")
+
+    try:
+        amount = float(record['Amount'])
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid amount '{record['Amount']}'") from None
+    if not math.isfinite(amount):
+        raise ValueError(f"invalid amount '{record['Amount']}'")
+
+    notes = record.get('Notes')
+    return {
+        'Date': parse_date(str(record['Date'])),
+        'Category': category,
+        'Amount': amount,
+        'Notes': '' if notes is None else str(notes),
+    }
+
+def read_records(stream, fmt='auto'):
+    """Yield (line number, record) from CSV with a header row, or from JSON lines."""
+    if fmt == 'auto':
+        first = stream.readline()
+        fmt = 'jsonl' if first.lstrip().startswith('{') else 'csv'
+        lines = _chain([first], stream)
+    else:
+        lines = stream
+
+    if fmt == 'jsonl':
+        for number, line in enumerate(lines, start=1):
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except ValueError as e:
+                    yield number, e
+    else:
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+
+def _chain(head, rest):
+    yield from head
+    yield from rest
+
+def parse_month(text):
+    """argparse type for YYYY-MM; a bad value is a usage error."""
+    try:
+        return datetime.strptime(text.strip(), '%Y-%m')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid month '{text}' (use YYYY-MM)") from None
+
+class _PeriodAction(argparse.Action):
+    """Stores --month or --end, refusing the two together in either order.
+
+    --start is already exclusive with --month through a group; --end cannot join that
+    group because it goes with --start.
+    """
+    CONFLICTS = {'month': 'end', 'end': 'month'}
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        other = self.CONFLICTS[self.dest]
+        if getattr(namespace, other, None) is not None:
+            parser.error(f"argument {option_string}: not allowed with argument --{other}")
+        setattr(namespace, self.dest, values)
+
+# ========== COMMANDS ==========
+
+def cmd_add(args):
+    from app.expense_utils import categories, ensure_data_file, save_expense_entries
+
+    if args.from_stdin:
+        records = read_records(sys.stdin, args.format)
+    else:
+        if args.date is None or args.category is None or args.amount is None:
+            print("❌ add needs --date, --category and --amount (or --from-stdin)", file=sys.stderr)
+            return EXIT_USAGE
+        records = [(1, {'Date': args.date, 'Category': args.category,
+                        'Amount': args.amount, 'Notes': args.notes})]
+
+    entries, rejected = [], 0
+    for number, record in records:
+        try:
+            if isinstance(record, Exception):
+                raise ValueError(f"invalid JSON: {record}")
+            entries.append(parse_entry(record, categories))
+        except ValueError as e:
+            rejected += 1
+            print(f"❌ line {number}: {e}", file=sys.stderr)
+
+    if rejected and not args.skip_invalid:
+        print(f"❌ {rejected} invalid expense{'s' if rejected != 1 else ''}; nothing was saved "
+              f"(use --skip-invalid to save the valid ones).", file=sys.stderr)
+        return EXIT_INVALID_INPUT
+    if args.dry_run:
+        print(f"🔍 {len(entries)} expenses would be saved.")
+    elif entries:
+        # One write for the whole batch; the ledger itself is never loaded
+        save_expense_entries(None, entries, ensure_data_file())
+    # With --skip-invalid, saving the valid expenses is a success
+    return EXIT_INVALID_INPUT if rejected and not entries else EXIT_OK
+
+def _print_table(df, fmt):
+    if fmt == 'csv':
+        df.to_csv(sys.stdout, index=False)
+    elif fmt == 'json':
+        print(df.to_json(orient='records', date_format='iso'))
+    else:
+        print(df.to_string(index=False))
+
+def cmd_report(args):
+    from app.query import Query
+
+    start, end = args.start, args.end
+    if args.month:
+        import pandas as pd
+        first = pd.Timestamp(args.month)
+        start, end = first, first + pd.offsets.MonthEnd(0)
+
+    result = Query(start, end, args.category, group_by=args.by, aggregates=['sum', 'count']).run()
+    if result.empty:
+        print("No matching expenses.", file=sys.stderr)
+        return EXIT_NO_DATA
+    if args.format == 'table':
+        result = result.sort_values('sum', ascending=False) if args.by == 'category' else result
+        _print_table(result, args.format)
+        print(f"\nTotal: {result['sum'].sum():.2f} USD over {int(result['count'].sum())} expenses")
+    else:
+        _print_table(result, args.format)
+    return EXIT_OK
+
+def cmd_search(args):
+    from app.expense_utils import get_data_filepath, search_expenses
+    from app.schema import decimal_view
+
+    if not get_data_filepath().exists():
+        print("⚠️ No expense tracker file found.", file=sys.stderr)
+        return EXIT_NO_DATA
+    rows = search_expenses(" ".join(args.terms), limit=args.limit)
+    if rows.empty:
+        print("No matching expenses.", file=sys.stderr)
+        return EXIT_NO_DATA
+    rows = decimal_view(rows)
+    if args.format == 'table':
+        from app.storage import dates_as_text
+        _print_table(dates_as_text(rows), args.format)
+        print(f"\n{len(rows)} matching expense{'s' if len(rows) != 1 else ''}")
+    else:
+        _print_table(rows, args.format)
+    return EXIT_OK
+
+def cmd_stats(args):
+    from app.expense_utils import get_data_filepath, get_rollups
+    from app.storage import count_journal_rows, get_storage_for_path
+
+    filepath = get_data_filepath()
+    if not filepath.exists():
+        print("⚠️ No expense tracker file found.", file=sys.stderr)
+        return EXIT_NO_DATA
+
+    rollups = get_rollups()
+    days = sorted(rollups.daily)
+    stats = {
+        'file': str(filepath),
+        'backend': get_storage_for_path(filepath).name,
+        'expenses': rollups.count,
+        'total': rollups.total_amount,
+        'first_date': days[0] if days else None,
+        'last_date': days[-1] if days else None,
+        'days': len(days),
+        'months': len(rollups.monthly),
+        'journal_rows': count_journal_rows(filepath),
+    }
+    if args.format == 'json':
+        print(json.dumps(stats))
+    else:
+        for name, value in stats.items():
+            print(f"{name.replace('_', ' ').capitalize():<14} {value}")
+    return EXIT_OK
+
+def cmd_backup(args):
+    from app.expense_utils import get_data_filepath
+    from tools.manual_backup import create_manual_backup
+
+    if not get_data_filepath().exists():
+        print("⚠️ No expense tracker file found to backup.", file=sys.stderr)
+        return EXIT_NO_DATA
+    create_manual_backup(prune=not args.no_prune)
+    return EXIT_OK
+
+def cmd_export(args):
+    from app.expense_utils import get_data_filepath
+    from tools.export_data import export_to_file
+
+    if not get_data_filepath().exists():
+        print("⚠️ No expense tracker file found to export.", file=sys.stderr)
+        return EXIT_NO_DATA
+    export_to_file(args.target)
+    return EXIT_OK
+
+def cmd_serve(args):
+    from app.server import check_local_host, serve
+
+    try:
+        check_local_host(args.host)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return EXIT_USAGE
+    serve(args.host, args.port)
+    return EXIT_OK
+
+# ========== PARSER ==========
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Expense Tracker. Run without a command for the interactive menu.",
+        epilog=f"exit codes: {EXIT_OK} ok, {EXIT_ERROR} error, {EXIT_USAGE} usage, "
+               f"{EXIT_INVALID_INPUT} invalid input, {EXIT_NO_DATA} no data",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="add one expense, or many from stdin")
+    add.add_argument("--date", help="DD/MM/YYYY or YYYY-MM-DD")
+    add.add_argument("--category")
+    add.add_argument("--amount", help="amount spent (USD)")
+    add.add_argument("--notes", default="")
+    add.add_argument("--from-stdin", action="store_true",
+                     help="read expenses from stdin: CSV with a Date,Category,Amount,Notes header, or JSON lines")
+    add.add_argument("--format", choices=["auto", "csv", "jsonl"], default="auto", help="stdin format (default: auto)")
+    add.add_argument("--skip-invalid", action="store_true", help="save the valid expenses even if some are rejected")
+    add.add_argument("--dry-run", action="store_true", help="validate only, save nothing")
+    add.set_defaults(handler=cmd_add)
+
+    report = commands.add_parser("report", help="spending totals for a period")
+    period = report.add_mutually_exclusive_group()
+    period.add_argument("--month", type=parse_month, action=_PeriodAction, help="YYYY-MM")
+    period.add_argument("--start", help="first date, YYYY-MM-DD")
+    report.add_argument("--end", action=_PeriodAction, help="last date (inclusive), YYYY-MM-DD")
+    report.add_argument("--category", action="append", help="only these categories (repeatable)")
+    report.add_argument("--by", choices=["category", "day", "month", "year"], default="category")
+    report.add_argument("--format", choices=["table", "csv", "json"], default="table")
+    report.set_defaults(handler=cmd_report)
+
+    search = commands.add_parser("search", help="find expenses by words in their notes")
+    search.add_argument("terms", nargs="+", help="words the notes must contain; each matches as a prefix")
+    search.add_argument("--limit", type=int, help="only the most recent N matches")
+    search.add_argument("--format", choices=["table", "csv", "json"], default="table")
+    search.set_defaults(handler=cmd_search)
+
+    stats = commands.add_parser("stats", help="size, total and date span of the ledger")
+    stats.add_argument("--format", choices=["table", "json"], default="table")
+    stats.set_defaults(handler=cmd_stats)
+
+    backup = commands.add_parser("backup", help="create an incremental backup")
+    backup.add_argument("--no-prune", action="store_true", help="keep backups outside the retention policy")
+    backup.set_defaults(handler=cmd_backup)
+
+    export = commands.add_parser("export", help="export the ledger to a file (.xlsx, .parquet, ...)")
+    export.add_argument("target", nargs="?", help="default: data/Expense_Tracker_export.xlsx")
+    export.set_defaults(handler=cmd_export)
+
+    serve = commands.add_parser("serve", help="serve a local HTTP/JSON API (localhost only)")
+    serve.add_argument("--host", default="127.0.0.1", help="loopback address to listen on (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.set_defaults(handler=cmd_serve)
+    return parser
+
+def run(argv=None):
+    """Run one command and return its exit code."""
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except Exception as e:
+        print(f"❌ {type(e).__name__}: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    finally:
+        # Let a compaction started by this command finish before the process exits
+        if 'app.storage' in sys.modules:
+            from app.storage import wait_for_compaction
+            wait_for_compaction()
@@ -0,0 +1,73 @@
+from pathlib import Path
+import json
+import os
+import sys
+
+# Defaults, overridden by data/settings.json and then by EXPENSE_TRACKER_<NAME> env vars
+DEFAULT_SETTINGS = {
+    'storage_backend': 'partitioned',
+    # Backup retention: the most recent snapshots, then one per recent hour/day/month
+    'backup_keep_latest': 10,
+    'backup_keep_hourly': 24,
+    'backup_keep_daily': 30,
+    'backup_keep_monthly': 12,
+    # Draw every point of the plots instead of down-sampling them to screen resolution
+    'plot_full_resolution': False,
+}
+
+SETTINGS_FILENAME = 'settings.json'
+ENV_PREFIX = 'EXPENSE_TRACKER_'
+
+def get_base_path():
+    """Returns correct base path whether running from script or PyInstaller .exe"""
+    if getattr(sys, 'frozen', False):
+        return Path(sys.executable).resolve().parent
+    return Path(__file__).resolve().parents[1]
+
+# Data directories already created by this process, so get_data_dir only touches the disk once
+_created_dirs = set()
+
+# settings.json as last read, keyed on its path and (mtime, size)
+_file_settings = {'key': None, 'settings': {}}
+
+def get_data_dir():
+    """Returns the data directory (EXPENSE_TRACKER_DATA_DIR if set) and ensures it exists."""
+    data_dir = Path(os.environ.get(ENV_PREFIX + 'DATA_DIR') or get_base_path() / "data")
+    if data_dir not in _created_dirs:
+        data_dir.mkdir(parents=True, exist_ok=True)
+        _created_dirs.add(data_dir)
+    return data_dir
+
+def _read_settings_file(settings_path):
+    """Return the settings in settings.json, re-reading the file only when it has changed."""
+    try:
+        stat = settings_path.stat()
+        key = (settings_path, stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        key = (settings_path, None)
+    if key != _file_settings['key']:
+        settings = {}
+        if key[1] is not None:
+            try:
+                with open(settings_path, encoding='utf-8') as f:
+                    settings = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignoring unreadable {SETTINGS_FILENAME}: {e}")
+        _file_settings['key'], _file_settings['settings'] = key, settings
+    return _file_settings['settings']
+
+def load_settings():
+    """Return the effective settings: defaults, then settings.json, then environment."""
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update(_read_settings_file(get_data_dir() / SETTINGS_FILENAME))
+
+    for name in settings:
+        value = os.environ.get(ENV_PREFIX + name.upper())
+        if value is not None:
+            settings[name] = value
+
+    return settings
+
+def get_setting(name):
+    """Return a single effective setting."""
+    return load_settings()[name]
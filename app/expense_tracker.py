@@ -2,6 +2,7 @@ import pandas as pd
 from app.expense_utils import load_data, get_expense_details, save_expense_entry
 
 def main():
+    df, filepath = load_data()
     print("Welcome to the Expense Tracker! 📋")
 
     while True:
@@ -13,7 +14,6 @@ def main():
             print("Invalid date. Please try again.\n")
             continue
 
-        global df
         df = save_expense_entry(df, expense_entry, filepath)
 
         done = input("\nAre you done? (Y/N): ").strip().upper()
@@ -25,5 +25,4 @@ def main():
     print("\nThanks for using Expense Tracker! 👋")
 
 if __name__ == "__main__":
-    df, filepath = load_data()
     main()
\ No newline at end of file
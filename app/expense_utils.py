@@ -1,48 +1,129 @@
-from pathlib import Path
 import pandas as pd
-import os
-import sys
 
-# Fixed list of categories
-categories = [
-    'Restaurant', 'Toters', 'Entertainment', 'Groceries', 'Snacks', 
-    'Barber', 'Laundry', 'Transportation', 'Shopping', 'Phone'
-]
+from app.cache import dataset_cache
+from app.config import get_base_path
+from app.instrument import count, timed
+from app.rollups import Rollups, load_rollups, save_rollups, update_rollups
+from app.schema import CATEGORIES, concat_frames, entries_frame
+from app.search import SearchIndex, update_search_index
+from app.storage import (
+    append_entries,
+    compact_journal,
+    count_journal_rows,
+    data_lock,
+    empty_frame,
+    find_legacy_filepath,
+    get_data_signature,
+    get_storage,
+    get_storage_filepath,
+    migrate_data,
+    read_ledger,
+    sort_by_date,
+    start_background_compaction,
+    to_timestamp,
+    wait_for_compaction,
+    write_data_file,
+    JOURNAL_COMPACT_THRESHOLD,
+)
+
+# Fixed list of categories (declared with the rest of the schema in app.schema)
+categories = CATEGORIES
 
 # ========== PATH SETUP ==========
-def get_base_path():
-    """Returns correct base path whether running from script or PyInstaller .exe"""
-    if getattr(sys, 'frozen', False):
-        return Path(sys.executable).resolve().parent
-    return Path(__file__).resolve().parents[1]
-
 def get_data_filepath():
-    """Returns the full path to the Excel file and ensures the data directory exists."""
-    base_path = get_base_path()
-    data_dir = base_path / "data"
-    data_dir.mkdir(parents=True, exist_ok=True)
-    return data_dir / "Expense_Tracker.xlsx"
+    """Returns the full path to the data file of the configured backend and ensures the data directory exists."""
+    return get_storage_filepath(get_storage())
 
 # ========== DATA FUNCTIONS ==========
 
-def load_data():
-    """Load the Excel file and return the DataFrame and file path."""
+def ensure_data_file():
+    """Migrate a legacy data file or create an empty one if needed, and return the data file path."""
     filepath = get_data_filepath()
+    if filepath.exists():
+        return filepath
+
+    # Checked again under the lock: another process may be creating it right now
+    with data_lock:
+        legacy_path = find_legacy_filepath(filepath)
+        if not filepath.exists() and legacy_path is not None:
+            print(f"🔄 Migrating {legacy_path.name} to {filepath.name}...")
+            migrate_data(legacy_path, filepath)
+
+        if not filepath.exists():
+            print("⚠️ No expense tracker file found. Creating a new one...")
+            write_data_file(empty_frame(), filepath)
+            print(f"✅ New expense tracker created at {filepath}")
+
+    return filepath
+
+def _get_cached_ledger(filepath):
+    """Return the ledger from the process-wide cache, reading it from disk on a miss."""
+    key = str(filepath)
+    with data_lock:
+        signature = get_data_signature(filepath)
+        df = dataset_cache.get(key, signature)
+        if df is None:
+            df = read_ledger(filepath)
+            dataset_cache.store(key, signature, df)
+            count('rows_loaded', len(df))
+    return df
 
-    try:
-        df = pd.read_excel(filepath)
-    except FileNotFoundError:
-        print("⚠️ No expense tracker file found. Creating a new one...")
-        df = pd.DataFrame({
-            'Date': pd.Series(dtype='str'),
-            'Category': pd.Series(dtype='str'),
-            'Amount': pd.Series(dtype='float'),
-            'Notes': pd.Series(dtype='str')
-        })
-        df.to_excel(filepath, index=False)
-        print(f"✅ New expense tracker created at {filepath}")
-
-    return df, filepath
+def _peek_cached_ledger(filepath):
+    """Return the cached ledger if it is still valid, without reading from disk."""
+    with data_lock:
+        return dataset_cache.peek(str(filepath), get_data_signature(filepath))
+
+def get_cache_stats():
+    """Return hit/miss/reload counters and the data version of the dataset cache."""
+    return dataset_cache.stats()
+
+@timed('load_data')
+def load_data():
+    """Load the data file merged with the journal and return the DataFrame and file path.
+
+    Served from the in-memory cache while the files on disk are unchanged.
+    """
+    filepath = ensure_data_file()
+    df = _get_cached_ledger(filepath)
+    return df.copy(), filepath
+
+@timed('get_rollups')
+def get_rollups():
+    """Return the daily/monthly/category rollups, repairing them if the data changed outside the app."""
+    filepath = ensure_data_file()
+    with data_lock:
+        signature = get_data_signature(filepath)
+        rollups = load_rollups(filepath, signature)
+        if rollups is None:
+            print("🔄 Rebuilding spending rollups...")
+            rollups = Rollups.from_frame(_get_cached_ledger(filepath), signature)
+            save_rollups(rollups, filepath)
+    return rollups
+
+def get_search_index():
+    """Return the notes search index, rebuilding it if the data changed outside the app."""
+    filepath = ensure_data_file()
+    index = SearchIndex(filepath)
+    with data_lock:
+        signature = get_data_signature(filepath)
+        if not index.is_current(signature):
+            print("🔄 Building notes search index...")
+            index.rebuild(_get_cached_ledger(filepath), signature)
+    return index
+
+@timed('search_expenses')
+def search_expenses(query, limit=None):
+    """Return the expenses whose notes contain words starting with every term of query, by date.
+
+    Answered from the search index without loading the ledger. With limit, only the
+    most recent matches are returned.
+    """
+    return get_search_index().search(query, limit)
+
+@timed('search_notes')
+def search_notes(query):
+    """Return the distinct note texts matching every term of query (see search_expenses)."""
+    return get_search_index().matching_notes(query)
 
 def validate_date(date_str):
     """Validate input in DD/MM/YYYY format, return a string in YY/MM/DD format."""
@@ -81,19 +162,93 @@ def get_expense_details():
 
 # ========== SAVE LOGIC ==========
 
+@timed('sort_expenses_by_date')
 def sort_expenses_by_date(df):
-    """Sort the DataFrame by date and format it back to string format."""
-    df['Date'] = pd.to_datetime(df['Date'], format='%Y/%m/%d')
-    df = df.sort_values(by='Date').reset_index(drop=True)
-    df['Date'] = df['Date'].dt.strftime('%Y/%m/%d')
+    """Return the DataFrame sorted by date, with Date as a datetime64 column."""
+    return sort_by_date(df)
+
+def insert_expense_sorted(df, entry):
+    """Return df with entry inserted at its date position, found by binary search.
+
+    df must already be sorted by date. Entries with an equal date keep insertion order.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(df['Date']):
+        df = sort_by_date(df)
+    new_row = entries_frame([entry], [to_timestamp(entry['Date'])])[df.columns]
+    if df.empty:
+        return new_row
+
+    position = df['Date'].searchsorted(new_row['Date'].iloc[0], side='right')
+    if position == len(df):
+        return concat_frames([df, new_row])
+    return concat_frames([df.iloc[:position], new_row, df.iloc[position:]])
+
+def insert_expenses_sorted(df, entries):
+    """Return df with several entries added in date order."""
+    if len(entries) == 1:
+        return insert_expense_sorted(df, entries[0])
+    new_rows = entries_frame(entries, [to_timestamp(entry['Date']) for entry in entries])[df.columns]
+    if df.empty:
+        return sort_by_date(new_rows)
+    # Stable sort keeps existing rows ahead of new rows on the same date
+    return sort_by_date(concat_frames([df, new_rows]))
+
+def _persist_entries(df, entries, filepath):
+    """Write entries with a single append and keep the cache, rollups and search index in step."""
+    with data_lock:
+        old_signature = get_data_signature(filepath)
+        cached = dataset_cache.peek(str(filepath), old_signature)
+        journaled = append_entries(entries, filepath)
+        new_signature = get_data_signature(filepath)
+        if cached is not None:
+            # Update the cache in place instead of re-reading the files we just wrote
+            dataset_cache.store(str(filepath), new_signature, insert_expenses_sorted(cached, entries))
+        update_rollups(filepath, entries, old_signature, new_signature)
+        update_search_index(filepath, entries, old_signature, new_signature)
+    count('expenses_saved', len(entries))
+
+    if journaled and count_journal_rows(filepath) >= JOURNAL_COMPACT_THRESHOLD:
+        start_background_compaction(filepath)
+
+    if df is not None:
+        df = insert_expenses_sorted(df, entries)
     return df
 
+@timed('save_expense_entry')
 def save_expense_entry(df, entry, filepath):
-    """Add new expense entry, sort by date, and save to Excel."""
-    new_row = pd.DataFrame([entry])
-    df = pd.concat([df, new_row], ignore_index=True)
-
-    df = sort_expenses_by_date(df)
-    df.to_excel(filepath, index=False)
+    """Persist a new expense entry (journal or native insert) and return the updated DataFrame."""
+    df = _persist_entries(df, [entry], filepath)
     print("✅ New expense saved successfully!")
-    return df
\ No newline at end of file
+    return df
+
+@timed('save_expense_entries')
+def save_expense_entries(df, entries, filepath):
+    """Persist several expense entries with one write and return the updated DataFrame (or None if df is None)."""
+    if not entries:
+        return df
+    df = _persist_entries(df, entries, filepath)
+    print(f"✅ {len(entries)} new expenses saved successfully!")
+    return df
+
+# ========== BULK IMPORT ==========
+
+@timed('import_expenses')
+def import_expenses(path, **options):
+    """Stream a bank/CSV/XLSX statement into the ledger with one write, skipping duplicates.
+
+    Options are passed to app.importer.import_statement (column_map, date_format,
+    default_category, category_rules, debits_negative, chunksize, dry_run).
+    """
+    from app.importer import import_statement
+
+    filepath = ensure_data_file()
+    summary = import_statement(
+        path,
+        load_ledger=lambda: _get_cached_ledger(filepath),
+        save_entries=lambda entries: save_expense_entries(None, entries, filepath),
+        filepath=filepath,
+        **options,
+    )
+    print(f"📥 Read {summary['read']} rows: {summary['imported']} imported, "
+          f"{summary['duplicates']} duplicates, {summary['skipped']} skipped.")
+    return summary
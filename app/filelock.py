@@ -0,0 +1,99 @@
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# How often a blocked acquire retries where the OS cannot block for us (Windows)
+POLL_INTERVAL = 0.05
+
+def _try_lock(f):
+    """Take an exclusive lock on an open file without waiting. Returns False if it is held elsewhere."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+def _lock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    while not _try_lock(f):
+        time.sleep(POLL_INTERVAL)
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class InterProcessLock:
+    """A re-entrant lock shared by the threads of this process and by other processes.
+
+    Threads are serialized by an RLock; the outermost holder also takes an advisory
+    OS lock (flock / msvcrt.locking) on a lock file, so the GUI, main.py and the tools
+    can safely write the same data at the same time. The OS drops the lock if the
+    holding process dies, so a crash never leaves the data locked.
+
+    `path` is a callable so the lock file follows EXPENSE_TRACKER_DATA_DIR at the time
+    the lock is taken rather than at import time.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def acquire(self, blocking=True):
+        if not self._thread_lock.acquire(blocking):
+            return False
+        if self._depth == 0:
+            try:
+                f = open(self.path(), 'a+b')
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            try:
+                locked = True
+                if blocking:
+                    _lock(f)
+                else:
+                    locked = _try_lock(f)
+            except BaseException:
+                f.close()
+                self._thread_lock.release()
+                raise
+            if not locked:
+                f.close()
+                self._thread_lock.release()
+                return False
+            self._file = f
+        self._depth += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                _unlock(self._file)
+            finally:
+                self._file.close()
+                self._file = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
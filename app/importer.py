@@ -0,0 +1,284 @@
+from pathlib import Path
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.schema import CATEGORIES, as_cents, as_text
+from app.storage import DATE_FORMAT, data_lock, get_data_signature, on_files_reshuffled
+
+CHUNK_SIZE = 50_000
+
+# Lower-cased header names recognised when no explicit column mapping is given
+COLUMN_ALIASES = {
+    'Date': ['date', 'transaction date', 'posting date', 'posted', 'value date', 'booking date'],
+    'Amount': ['amount', 'debit', 'value', 'amount (usd)', 'transaction amount'],
+    'Notes': ['notes', 'description', 'memo', 'details', 'payee', 'narrative', 'reference'],
+    'Category': ['category'],
+}
+
+# ========== READING ==========
+
+def _iter_excel_chunks(path, chunksize):
+    """Stream an .xlsx sheet with openpyxl's read-only mode, chunksize rows at a time."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else f'column_{i}' for i, h in enumerate(next(rows, []))]
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunksize:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        workbook.close()
+
+def read_statement_chunks(path, chunksize=CHUNK_SIZE):
+    """Yield the rows of a CSV or XLSX statement as DataFrames of at most chunksize rows."""
+    path = Path(path)
+    if path.suffix.lower() in ('.xlsx', '.xlsm'):
+        yield from _iter_excel_chunks(path, chunksize)
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False,
+                               skipinitialspace=True)
+
+# ========== MAPPING ==========
+
+def detect_column_map(columns):
+    """Guess which statement columns hold Date/Amount/Notes/Category from their headers."""
+    lookup = {str(c).strip().lower(): c for c in columns}
+    column_map = {}
+    for target, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in lookup:
+                column_map[lookup[alias]] = target
+                break
+    return column_map
+
+def _parse_amounts(values):
+    """Parse amounts like '1,234.50', '$12', '(8.00)' or '-3' into floats."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    text = values.astype(str).str.strip()
+    negative = text.str.startswith('(') & text.str.endswith(')')
+    cleaned = text.str.replace(r'[^0-9.\-]', '', regex=True)
+    amounts = pd.to_numeric(cleaned, errors='coerce')
+    return amounts.where(~negative, -amounts.abs())
+
+def _parse_dates(values, date_format=None):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    if date_format:
+        return pd.to_datetime(values, format=date_format, errors='coerce')
+    # The app itself uses DD/MM/YYYY, so prefer day-first for ambiguous dates.
+    # A single inferred format parses vectorised; fall back to per-value parsing.
+    try:
+        return pd.to_datetime(values, dayfirst=True)
+    except (ValueError, TypeError):
+        return pd.to_datetime(values, dayfirst=True, errors='coerce', format='mixed')
+
+def _apply_category_rules(notes, rules, default_category):
+    """Pick a category per row from keyword rules on the notes, falling back to default_category."""
+    categories = pd.Series(default_category, index=notes.index, dtype=object)
+    if rules:
+        lowered = notes.str.lower()
+        # Earlier rules win, so apply them in reverse
+        for keyword, category in reversed(list(rules.items())):
+            categories = categories.mask(lowered.str.contains(keyword.lower(), regex=False), category)
+    return categories
+
+def map_statement_chunk(chunk, column_map=None, date_format=None, default_category='Shopping',
+                        category_rules=None, debits_negative=False):
+    """Turn one raw statement chunk into Date/Category/Amount/Notes rows.
+
+    A category column only supplies names from CATEGORIES; other rows get a category
+    from category_rules or default_category.
+    Returns (mapped, skipped) where skipped counts rows with an unreadable date or amount,
+    or credits when debits_negative is set.
+    """
+    column_map = column_map or detect_column_map(chunk.columns)
+    renamed = chunk.rename(columns=column_map)
+    for required in ('Date', 'Amount'):
+        if required not in renamed.columns:
+            raise ValueError(f"Could not find a {required} column. Pass a column mapping explicitly.")
+
+    dates = _parse_dates(renamed['Date'], date_format)
+    amounts = _parse_amounts(renamed['Amount'])
+    notes = renamed['Notes'].fillna('').astype(str).str.strip() if 'Notes' in renamed else pd.Series('', index=renamed.index)
+
+    if debits_negative:
+        # Bank exports: money out is negative, money in (refunds, salary) is skipped
+        keep = amounts < 0
+        amounts = -amounts
+    else:
+        keep = amounts > 0
+    keep &= dates.notna() & amounts.notna()
+
+    if 'Category' in renamed:
+        # Names are matched case-insensitively; anything else (a bank's own
+        # categories, "DEBIT", ...) is categorised like a row without one
+        known = {category.lower(): category for category in CATEGORIES}
+        categories = renamed['Category'].fillna('').astype(str).str.strip().str.lower().map(known)
+        categories = categories.fillna(_apply_category_rules(notes, category_rules, default_category))
+    else:
+        categories = _apply_category_rules(notes, category_rules, default_category)
+
+    mapped = pd.DataFrame({
+        'Date': dates[keep].dt.normalize(),
+        'Category': categories[keep].astype(str),
+        'Amount': amounts[keep].round(2).astype(float),
+        'Notes': notes[keep],
+    }).reset_index(drop=True)
+    return mapped, int((~keep).sum())
+
+# ========== DE-DUPLICATION ==========
+
+def hash_expenses(df, seen=None):
+    """Return a uint64 hash per row of (date, amount in cents, notes, occurrence).
+
+    The occurrence number keeps genuinely repeated expenses (two coffees on the same
+    day) while re-importing the same statement is still recognised as a duplicate.
+    To hash a file chunk by chunk, pass the same `seen` dict to every call: it counts
+    the occurrences of each (date, cents, notes) in the earlier chunks.
+    """
+    if df.empty:
+        return np.empty(0, dtype=np.uint64)
+    key = pd.DataFrame({
+        'Date': pd.to_datetime(df['Date']).dt.strftime(DATE_FORMAT),
+        'Cents': as_cents(df['Amount']).astype('int64'),
+        'Notes': as_text(df['Notes']).fillna('').astype(str).str.strip().str.lower(),
+    })
+    occurrence = key.groupby(['Date', 'Cents', 'Notes'], sort=False).cumcount()
+    if seen is not None:
+        base = pd.Series(pd.util.hash_pandas_object(key, index=False).to_numpy(dtype=np.uint64), index=key.index)
+        occurrence += base.map(seen).fillna(0).astype('int64')
+        for value, number in base.value_counts().items():
+            seen[value] = seen.get(value, 0) + number
+    key['Occurrence'] = occurrence
+    return pd.util.hash_pandas_object(key, index=False).to_numpy(dtype=np.uint64)
+
+def get_hash_index_filepath(filepath):
+    """Returns the path of the persistent import hash index next to the data file."""
+    filepath = Path(filepath)
+    return filepath.with_name(f"{filepath.stem}_import_hashes.npz")
+
+class HashIndex:
+    """Sorted array of expense hashes, persisted next to the data file.
+
+    Like the rollups it is tagged with the data file signature, and rebuilt from the
+    ledger when the data changed through another path.
+    """
+
+    def __init__(self, hashes, signature=None):
+        self.hashes = np.unique(hashes)
+        self.signature = signature
+
+    def contains(self, hashes):
+        """Vectorised membership test."""
+        if len(self.hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+        positions = np.searchsorted(self.hashes, hashes)
+        positions[positions == len(self.hashes)] = 0
+        return self.hashes[positions] == hashes
+
+    def add(self, hashes):
+        self.hashes = np.union1d(self.hashes, hashes)
+
+    def save(self, filepath):
+        path = get_hash_index_filepath(filepath)
+        tmp_path = path.with_name(path.stem + '.tmp.npz')
+        np.savez(tmp_path, hashes=self.hashes, signature=np.array(json.dumps(self.signature)))
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, filepath, signature):
+        """Return the saved index if it matches signature, otherwise None."""
+        path = get_hash_index_filepath(filepath)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path) as data:
+                saved_signature = json.loads(str(data['signature']))
+                hashes = data['hashes']
+        except (OSError, ValueError, KeyError):
+            return None
+        saved_signature = tuple(tuple(p) if p is not None else None for p in saved_signature)
+        if saved_signature != signature:
+            return None
+        index = cls.__new__(cls)
+        index.hashes, index.signature = hashes, signature
+        return index
+
+def _touch_hash_index(filepath, old_signature, new_signature):
+    """Keep an up-to-date index valid across compaction, which does not change the content."""
+    index = HashIndex.load(filepath, old_signature)
+    if index is not None:
+        index.signature = new_signature
+        index.save(filepath)
+
+on_files_reshuffled(_touch_hash_index)
+
+# ========== PIPELINE ==========
+
+def _load_hash_index(filepath, load_ledger):
+    """The saved hash index if it matches the data files, otherwise one built from the ledger."""
+    with data_lock:
+        signature = get_data_signature(filepath)
+        index = HashIndex.load(filepath, signature)
+        if index is None:
+            index = HashIndex(hash_expenses(load_ledger()), signature)
+    return index
+
+def import_statement(path, load_ledger, save_entries, filepath, column_map=None, date_format=None,
+                     default_category='Shopping', category_rules=None, debits_negative=False,
+                     chunksize=CHUNK_SIZE, dry_run=False):
+    """Stream a statement file into the ledger, skipping rows that were already imported.
+
+    Each chunk is checked against the hash index as it is read and only its new rows
+    are kept, so memory grows with what is imported rather than with the file.
+    load_ledger() returns the current ledger DataFrame and save_entries(entries) writes a
+    list of expense dicts in one go; both come from app.expense_utils. Returns a summary dict.
+    """
+    summary = {'read': 0, 'imported': 0, 'duplicates': 0, 'skipped': 0}
+    index = _load_hash_index(filepath, load_ledger)
+    seen = {}
+    fresh_rows, fresh_hashes = [], []
+    for chunk in read_statement_chunks(path, chunksize):
+        mapped, skipped = map_statement_chunk(chunk, column_map, date_format, default_category,
+                                              category_rules, debits_negative)
+        summary['read'] += len(chunk)
+        summary['skipped'] += skipped
+        hashes = hash_expenses(mapped, seen)
+        fresh = ~index.contains(hashes)
+        summary['duplicates'] += int((~fresh).sum())
+        if fresh.any():
+            fresh_rows.append(mapped[fresh])
+            fresh_hashes.append(hashes[fresh])
+    if not fresh_rows:
+        return summary
+
+    new_rows = pd.concat(fresh_rows, ignore_index=True)
+    hashes = np.concatenate(fresh_hashes)
+    with data_lock:
+        if get_data_signature(filepath) != index.signature:
+            # The ledger changed while the statement was read: check the new rows again
+            index = _load_hash_index(filepath, load_ledger)
+            fresh = ~index.contains(hashes)
+            summary['duplicates'] += int((~fresh).sum())
+            new_rows, hashes = new_rows[fresh], hashes[fresh]
+        summary['imported'] = len(new_rows)
+        if dry_run or new_rows.empty:
+            return summary
+
+        save_entries(new_rows.to_dict('records'))
+
+        index.add(hashes)
+        index.signature = get_data_signature(filepath)
+        index.save(filepath)
+
+    return summary
@@ -0,0 +1,200 @@
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+
+# Only modules Python has loaded anyway are imported here, since main.py and gui.py
+# import this before their first paint.
+
+# Write Chrome/Perfetto trace events (JSON) or a cProfile dump of the run to these files.
+# Both can also be given on the command line of main.py and gui.py.
+TRACE_ENV = 'EXPENSE_TRACKER_TRACE'
+PROFILE_ENV = 'EXPENSE_TRACKER_PROFILE'
+TRACE_FLAG = '--trace'
+PROFILE_FLAG = '--profile'
+
+# Trace events kept in memory; the oldest are dropped past this (a long GUI session)
+MAX_TRACE_EVENTS = 100_000
+
+class Instrumentation:
+    """Timers and counters for the hot paths (load, save, sort, plots, GUI callbacks).
+
+    Timings are always collected: a timed call costs two perf_counter reads and a dict
+    update, so stats() and last() are available in every run. Per-call trace events are
+    only kept when a trace file was asked for, and cProfile only runs with a profile file.
+    Both files are written when the process exits. cProfile follows the thread that
+    enabled it (the main thread); work on the GUI's background worker shows up in the trace.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._timings = {}   # name -> [calls, total seconds, max seconds]
+        self._counters = {}
+        self._last = None    # (sequence, name, seconds, args)
+        self._sequence = 0
+        self.trace_path = None
+        self.profile_path = None
+        self._events = []
+        self._profiler = None
+        self._exit_hook = False
+
+    # ---------- Configuration ----------
+
+    def enable_from_env(self, environ=None):
+        environ = os.environ if environ is None else environ
+        if environ.get(TRACE_ENV):
+            self.enable_trace(environ[TRACE_ENV])
+        if environ.get(PROFILE_ENV):
+            self.enable_profile(environ[PROFILE_ENV])
+
+    def enable_from_argv(self, argv=None):
+        """Handle --trace FILE and --profile FILE, removing them from argv."""
+        argv = sys.argv if argv is None else argv
+        for flag, enable in ((TRACE_FLAG, self.enable_trace), (PROFILE_FLAG, self.enable_profile)):
+            for i, arg in enumerate(argv):
+                if arg == flag and i + 1 < len(argv):
+                    enable(argv[i + 1])
+                    del argv[i:i + 2]
+                    break
+                if arg.startswith(flag + '='):
+                    enable(arg.split('=', 1)[1])
+                    del argv[i]
+                    break
+
+    def enable_trace(self, path):
+        self.trace_path = path
+        self._register_exit_hook()
+
+    def enable_profile(self, path):
+        import cProfile
+
+        self.profile_path = path
+        if self._profiler is None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._register_exit_hook()
+
+    def _register_exit_hook(self):
+        if not self._exit_hook:
+            self._exit_hook = True
+            atexit.register(self.write)
+
+    # ---------- Recording ----------
+
+    def timed(self, name, **args):
+        """Time a block (`with timed(name):`) or every call of a function (`@timed(name)`)."""
+        return _Timer(self, name, args)
+
+    def record(self, name, start, end, args=None):
+        """Record one timed call that ran from start to end (perf_counter values)."""
+        seconds = end - start
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                self._timings[name] = [1, seconds, seconds]
+            else:
+                timing[0] += 1
+                timing[1] += seconds
+                if seconds > timing[2]:
+                    timing[2] = seconds
+            self._sequence += 1
+            self._last = (self._sequence, name, seconds, args or {})
+            if self.trace_path is not None:
+                self._events.append({
+                    'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+                    'ts': round((start - self.started) * 1e6, 1), 'dur': round(seconds * 1e6, 1),
+                    **({'args': args} if args else {}),
+                })
+                if len(self._events) > MAX_TRACE_EVENTS:
+                    del self._events[:len(self._events) - MAX_TRACE_EVENTS]
+
+    def count(self, name, n=1):
+        """Add n to a counter (rows loaded, cache hits, ...)."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    # ---------- Reading ----------
+
+    def last(self):
+        """(sequence, name, seconds, args) of the most recently finished timed call, or None.
+
+        The sequence number grows with every call, so a poller can tell a repeat of the
+        same operation from no new operation at all.
+        """
+        with self._lock:
+            return self._last
+
+    def stats(self):
+        """Timings ({name: {calls, total_ms, mean_ms, max_ms}}) and counters."""
+        with self._lock:
+            timings = {
+                name: {
+                    'calls': calls,
+                    'total_ms': round(total * 1000, 3),
+                    'mean_ms': round(total / calls * 1000, 3),
+                    'max_ms': round(longest * 1000, 3),
+                }
+                for name, (calls, total, longest) in sorted(self._timings.items())
+            }
+            return {'timings': timings, 'counters': dict(sorted(self._counters.items()))}
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+            self._events.clear()
+            self._last = None
+
+    # ---------- Output ----------
+
+    def write(self):
+        """Write the trace and/or profile files that were asked for."""
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profile_path)
+            self._profiler = None
+            print(f"⏱️ cProfile data written to {self.profile_path} "
+                  f"(python -m pstats {self.profile_path})", file=sys.stderr)
+        if self.trace_path is not None:
+            import json
+
+            with self._lock:
+                events = list(self._events)
+            with open(self.trace_path, 'w', encoding='utf-8') as f:
+                json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'summary': self.stats()}, f)
+            print(f"⏱️ {len(events)} trace events written to {self.trace_path}", file=sys.stderr)
+
+class _Timer:
+    def __init__(self, instrumentation, name, args):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.instrumentation.record(self.name, self.start, time.perf_counter(), self.args)
+        return False
+
+    def __call__(self, func):
+        instrumentation, name, args = self.instrumentation, self.name, self.args
+
+        @functools.wraps(func)
+        def wrapper(*a, **kw):
+            start = time.perf_counter()
+            try:
+                return func(*a, **kw)
+            finally:
+                instrumentation.record(name, start, time.perf_counter(), args)
+        return wrapper
+
+instrumentation = Instrumentation()
+instrumentation.enable_from_env()
+
+timed = instrumentation.timed
+count = instrumentation.count
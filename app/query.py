@@ -0,0 +1,276 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from app.expense_utils import _get_cached_ledger, _peek_cached_ledger, ensure_data_file, get_rollups
+from app.instrument import timed
+from app.rollups import MONTH_FORMAT
+from app.schema import CENTS, as_text, decimal_view
+from app.storage import normalize_frame, read_ledger_range, sort_by_date, to_timestamp
+
+# Group-by keys -> result column
+GROUP_KEYS = {'day': 'Day', 'month': 'Month', 'year': 'Year', 'category': 'Category'}
+AGGREGATES = ('sum', 'count', 'mean', 'min', 'max')
+
+# Rows handed to the filters at a time when iterating lazily
+BATCH_ROWS = 10_000
+
+# How each plan gets its rows, for explain()
+PLANS = {
+    'frame': "filter the DataFrame passed in",
+    'rollups': "read the daily/monthly/category rollups, no rows are loaded",
+    'cache': "binary-search the date range in the cached ledger",
+    'range': "read only the date range from the backend (partitions, SQL or streamed Excel)",
+    'scan': "load the whole ledger",
+}
+
+def _to_date(value):
+    """Accept Timestamps, dates, 'YYYY/MM/DD' and 'YYYY-MM-DD'."""
+    if isinstance(value, str) and '-' in value:
+        return pd.Timestamp(value)
+    return to_timestamp(value)
+
+class Query:
+    """A filter over the ledger with an optional group-by/aggregate.
+
+    All filters are optional and combine with AND:
+      start, end      inclusive date range
+      categories      a category name or a collection of them
+      min_amount,
+      max_amount      inclusive amount bounds
+      notes           case-insensitive substring, compiled regex, or a callable
+                      taking the note text and returning True to keep the row
+    group_by is any of GROUP_KEYS (a name or a list) and aggregates any of AGGREGATES
+    over Amount. Without group_by the query returns rows unless aggregates are given.
+
+    Each query is planned against the cheapest source that can answer it: the
+    rollups for plain sums by day/month/year/category, then the cached ledger, then
+    the backend's date-range read, and only then a full load.
+    """
+
+    def __init__(self, start=None, end=None, categories=None, min_amount=None, max_amount=None,
+                 notes=None, group_by=(), aggregates=None):
+        self.start = _to_date(start) if start is not None else None
+        self.end = _to_date(end) if end is not None else None
+        if isinstance(categories, str):
+            categories = [categories]
+        self.categories = frozenset(categories) if categories is not None else None
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.notes = notes
+
+        if isinstance(group_by, str):
+            group_by = [group_by]
+        self.group_by = tuple(group_by)
+        unknown = [key for key in self.group_by if key not in GROUP_KEYS]
+        if unknown:
+            raise ValueError(f"Unknown group-by key '{unknown[0]}'. Choose from: {', '.join(GROUP_KEYS)}")
+
+        if aggregates is None:
+            aggregates = ('sum',) if self.group_by else ()
+        elif isinstance(aggregates, str):
+            aggregates = [aggregates]
+        self.aggregates = tuple(aggregates)
+        unknown = [name for name in self.aggregates if name not in AGGREGATES]
+        if unknown:
+            raise ValueError(f"Unknown aggregate '{unknown[0]}'. Choose from: {', '.join(AGGREGATES)}")
+
+    @property
+    def is_aggregate(self):
+        return bool(self.aggregates)
+
+    # ---------- Planning ----------
+
+    def _rollups_can_answer(self):
+        """Rollups hold sums per day, per month and per category (not per day and category)."""
+        if self.aggregates != ('sum',) or self.notes is not None:
+            return False
+        if self.min_amount is not None or self.max_amount is not None:
+            return False
+        dated = self.start is not None or self.end is not None
+        if not self.group_by:
+            return not (dated and self.categories is not None)
+        if self.group_by == ('category',):
+            return not dated
+        if len(self.group_by) == 1:
+            return self.categories is None
+        return False
+
+    def plan(self, df=None):
+        """Name of the source the query will read from (see PLANS)."""
+        if df is not None:
+            return 'frame'
+        if self._rollups_can_answer():
+            return 'rollups'
+        if _peek_cached_ledger(ensure_data_file()) is not None:
+            return 'cache'
+        if self.start is not None or self.end is not None:
+            return 'range'
+        return 'scan'
+
+    def explain(self, df=None):
+        plan = self.plan(df)
+        return f"{plan}: {PLANS[plan]}"
+
+    # ---------- Running ----------
+
+    @timed('query')
+    def run(self, df=None):
+        """Return the matching rows (sorted by date), or the aggregate table.
+
+        Pass df to query that DataFrame instead of the ledger.
+        """
+        if df is None and self._rollups_can_answer():
+            return self._from_rollups()
+        rows = self._filter(self._source(df))
+        if self.is_aggregate:
+            return self._aggregate(rows)
+        return decimal_view(rows).reset_index(drop=True)
+
+    def series(self, df=None):
+        """Result of a single-key, single-aggregate query as a Series indexed by the key."""
+        if len(self.group_by) != 1 or len(self.aggregates) != 1:
+            raise ValueError("series() needs exactly one group-by key and one aggregate")
+        result = self.run(df)
+        return pd.Series(result[self.aggregates[0]].to_numpy(),
+                         index=pd.Index(result[GROUP_KEYS[self.group_by[0]]]), name='Amount')
+
+    def iter_rows(self, df=None, batch_size=BATCH_ROWS):
+        """Yield the matching rows lazily in date-ordered batches.
+
+        Only the batches the caller asks for are filtered, so stopping early (e.g. at
+        the first match) skips the rest of the work.
+        """
+        if self.is_aggregate:
+            raise ValueError("iter_rows() is for row queries; use run() for aggregates")
+        source = self._source(df)
+        for start in range(0, len(source), batch_size):
+            rows = self._filter(source.iloc[start:start + batch_size])
+            if not rows.empty:
+                yield decimal_view(rows)
+
+    def _source(self, df):
+        """Rows within the date range, from the cheapest place that has them."""
+        if df is not None:
+            df = normalize_frame(df)
+            if not df['Date'].is_monotonic_increasing:
+                df = sort_by_date(df)
+            return self._date_slice(df)
+        filepath = ensure_data_file()
+        cached = _peek_cached_ledger(filepath)
+        if cached is not None:
+            return self._date_slice(cached)
+        if self.start is not None or self.end is not None:
+            return read_ledger_range(filepath, self.start, self.end)
+        return _get_cached_ledger(filepath)
+
+    def _date_slice(self, df):
+        """Rows of a date-sorted ledger within [start, end], found by binary search."""
+        dates = df['Date']
+        lo = dates.searchsorted(self.start, side='left') if self.start is not None else 0
+        hi = dates.searchsorted(self.end, side='right') if self.end is not None else len(df)
+        return df.iloc[lo:hi]
+
+    def _filter(self, df):
+        mask = np.ones(len(df), dtype=bool)
+        if self.categories is not None:
+            mask &= df['Category'].isin(self.categories).to_numpy()
+        # Amounts are compared in cents, like the ledger holds them
+        if self.min_amount is not None:
+            mask &= (df['Amount'] >= round(self.min_amount * CENTS)).to_numpy(dtype=bool, na_value=False)
+        if self.max_amount is not None:
+            mask &= (df['Amount'] <= round(self.max_amount * CENTS)).to_numpy(dtype=bool, na_value=False)
+        if self.notes is not None and mask.any():
+            # The notes predicate is the slowest filter, so it only sees rows that passed the others
+            mask[mask] = _notes_mask_categorical(df['Notes'][mask], self.notes)
+        return df if mask.all() else df[mask]
+
+    def _aggregate(self, rows):
+        # Whole cents are exact in float64, so sums do not drift before the final division
+        rows = rows[rows['Amount'].notna().to_numpy()]
+        amounts = rows['Amount'].astype('float64')
+        if not self.group_by:
+            values = amounts.agg(list(self.aggregates))
+            return _in_dollars(pd.DataFrame([values.to_numpy()], columns=list(self.aggregates)))
+        keys = [_group_key(rows, key).rename(GROUP_KEYS[key]) for key in self.group_by]
+        result = amounts.groupby(keys, sort=True).agg(list(self.aggregates))
+        return _in_dollars(result).reset_index()
+
+    def _from_rollups(self):
+        rollups = get_rollups()
+        if not self.group_by:
+            if self.categories is not None:
+                total = rollups.category_total(self.categories)
+            elif self.start is None and self.end is None:
+                total = rollups.total_amount
+            else:
+                total = float(rollups.daily_series(self.start, self.end).sum())
+            return pd.DataFrame({'sum': [total]})
+
+        key = self.group_by[0]
+        column = GROUP_KEYS[key]
+        if key == 'category':
+            totals = rollups.category_series()
+            if self.categories is not None:
+                totals = totals[totals.index.isin(self.categories)]
+            totals = totals.sort_index()
+        elif key == 'month' and self.start is None and self.end is None:
+            totals = rollups.monthly_series()
+        else:
+            daily = rollups.daily_series(self.start, self.end)
+            if key == 'day':
+                totals = daily
+            else:
+                totals = daily.groupby(_date_key(daily.index.to_series(), key).to_numpy()).sum()
+        return pd.DataFrame({column: totals.index, 'sum': totals.to_numpy()})
+
+def _notes_mask_categorical(notes, predicate):
+    """_notes_mask for a (categorical) Notes column: the predicate runs once per distinct
+    note rather than once per row. Missing notes are matched as ''."""
+    if not isinstance(notes.dtype, pd.CategoricalDtype):
+        return _notes_mask(notes.fillna('').astype(str), predicate)
+    distinct = pd.Series(notes.cat.categories.astype(str).tolist() + [''], dtype=object)
+    # Code -1 (missing) picks the trailing ''
+    return _notes_mask(distinct, predicate)[notes.cat.codes.to_numpy()]
+
+def _in_dollars(table):
+    """Convert aggregates computed over cents back to dollars."""
+    for name in table.columns:
+        if name == 'count':
+            table[name] = table[name].astype('int64')
+        else:
+            table[name] = table[name] / CENTS
+    return table
+
+def _notes_mask(notes, predicate):
+    if isinstance(predicate, re.Pattern):
+        return notes.str.contains(predicate).to_numpy()
+    if callable(predicate):
+        return notes.map(predicate).astype(bool).to_numpy()
+    return notes.str.contains(str(predicate), case=False, regex=False).to_numpy()
+
+def _date_key(dates, key):
+    if key == 'day':
+        return dates.dt.normalize()
+    if key == 'year':
+        return dates.dt.year
+    # Same YYYY/MM labels as the rollups; each distinct month is formatted once
+    codes, months = pd.factorize(dates.dt.year * 100 + dates.dt.month)
+    labels = np.array([pd.Timestamp(year=m // 100, month=m % 100, day=1).strftime(MONTH_FORMAT)
+                       for m in months], dtype=object)
+    return pd.Series(labels[codes], index=dates.index)
+
+def _group_key(rows, key):
+    if key == 'category':
+        # Plain names, so groups sort alphabetically rather than in category order
+        return as_text(rows['Category'])
+    return _date_key(rows['Date'], key)
+
+def query_expenses(**spec):
+    """Run a Query (see its arguments) against the ledger and return a DataFrame."""
+    return Query(**spec).run()
+
+def iter_expenses(batch_size=BATCH_ROWS, **spec):
+    """Yield the rows matching a Query in date-ordered batches."""
+    return Query(**spec).iter_rows(batch_size=batch_size)
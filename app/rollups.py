@@ -0,0 +1,219 @@
+from pathlib import Path
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from app.schema import CENTS, as_cents, as_text
+from app.storage import DATE_FORMAT, on_files_reshuffled, to_timestamp
+
+MONTH_FORMAT = '%Y/%m'
+# Bumped whenever the persisted layout changes; older files are rebuilt from the data
+FORMAT_VERSION = 2
+
+class Rollups:
+    """Daily, monthly and per-category spending totals, updated in O(1) per expense.
+
+    `signature` is the data file signature the totals correspond to; a mismatch means
+    the data changed without going through save_expense_entry and the rollups must be rebuilt.
+    Totals are held in whole cents, like the ledger's amounts; the series views return dollars.
+    Expenses without a category count towards the daily, monthly and overall totals only.
+    """
+
+    def __init__(self, signature=None):
+        self.signature = signature
+        self.daily = {}
+        self.monthly = {}
+        self.category = {}
+        self.count = 0
+        self.total = 0
+
+    def add(self, date, category, amount):
+        """Fold one expense (amount in dollars) into the totals."""
+        if amount is None or pd.isna(amount):
+            return
+        # Rounded to the cent exactly like the ledger's Int64 amounts
+        cents = round(float(amount) * CENTS)
+        date = to_timestamp(date)
+        day_key = date.strftime(DATE_FORMAT)
+        month_key = date.strftime(MONTH_FORMAT)
+        self.daily[day_key] = self.daily.get(day_key, 0) + cents
+        self.monthly[month_key] = self.monthly.get(month_key, 0) + cents
+        # Same as from_frame, whose groupby drops missing categories
+        if category is not None and not pd.isna(category):
+            category = str(category)
+            self.category[category] = self.category.get(category, 0) + cents
+        self.count += 1
+        self.total += cents
+
+    @classmethod
+    def from_frame(cls, df, signature=None):
+        """Build rollups from the raw rows. Only used to (re)build or verify."""
+        rollups = cls(signature)
+        df = df.dropna(subset=['Amount'])
+        if df.empty:
+            return rollups
+        dates, cents = df['Date'], as_cents(df['Amount'])
+        rollups.daily = _as_totals(cents.groupby(dates.dt.strftime(DATE_FORMAT)).sum())
+        rollups.monthly = _as_totals(cents.groupby(dates.dt.strftime(MONTH_FORMAT)).sum())
+        rollups.category = _as_totals(cents.groupby(as_text(df['Category'])).sum())
+        rollups.count = len(df)
+        rollups.total = int(cents.sum())
+        return rollups
+
+    @property
+    def total_amount(self):
+        """The overall total in dollars."""
+        return self.total / CENTS
+
+    def category_total(self, categories):
+        """The total in dollars of the given categories."""
+        return sum(self.category.get(c, 0) for c in categories) / CENTS
+
+    # ---------- Views used by the charts ----------
+
+    def daily_series(self, start=None, end=None):
+        """Daily totals as a Series indexed by Timestamp, optionally limited to [start, end]."""
+        keys = self.daily.keys()
+        if start is not None:
+            start_key = to_timestamp(start).strftime(DATE_FORMAT)
+            keys = [k for k in keys if k >= start_key]
+        if end is not None:
+            end_key = to_timestamp(end).strftime(DATE_FORMAT)
+            keys = [k for k in keys if k <= end_key]
+        keys = sorted(keys)
+        index = pd.to_datetime(pd.Index(keys, dtype=object), format=DATE_FORMAT)
+        return _in_dollars([self.daily[k] for k in keys], index)
+
+    def monthly_series(self):
+        keys = sorted(self.monthly)
+        return _in_dollars([self.monthly[k] for k in keys], keys)
+
+    def category_series(self):
+        return _in_dollars(list(self.category.values()), list(self.category))
+
+    def cumulative_series(self):
+        """Running total per day. Cumulating daily totals costs O(days), not O(expenses)."""
+        return self.daily_series().cumsum()
+
+    # ---------- Persistence ----------
+
+    def to_dict(self):
+        return {
+            'format': FORMAT_VERSION,
+            'signature': self.signature,
+            'daily': self.daily,
+            'monthly': self.monthly,
+            'category': self.category,
+            'count': self.count,
+            'total': self.total,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rollups from their JSON form, or None if it was written in an older format."""
+        if data.get('format') != FORMAT_VERSION:
+            return None
+        signature = data.get('signature')
+        rollups = cls(_as_signature(signature))
+        rollups.daily = data.get('daily', {})
+        rollups.monthly = data.get('monthly', {})
+        rollups.category = data.get('category', {})
+        rollups.count = data.get('count', 0)
+        rollups.total = data.get('total', 0)
+        return rollups
+
+    def differences(self, other):
+        """Return human-readable differences between two rollups (empty if they match)."""
+        problems = []
+        for name in ('daily', 'monthly', 'category'):
+            mine, theirs = getattr(self, name), getattr(other, name)
+            for key in sorted(set(mine) | set(theirs)):
+                a, b = mine.get(key, 0), theirs.get(key, 0)
+                if a != b:
+                    problems.append(f"{name}[{key}]: {a / CENTS:.2f} != {b / CENTS:.2f}")
+        if self.count != other.count:
+            problems.append(f"count: {self.count} != {other.count}")
+        return problems
+
+def _as_totals(cents):
+    """A grouped Int64 sum as a dict of plain ints, which JSON keeps exact."""
+    return {key: int(value) for key, value in cents.items()}
+
+def _in_dollars(cents, index):
+    return pd.Series(np.asarray(cents, dtype='int64') / CENTS, index=index, dtype=float, name='Amount')
+
+def _as_signature(value):
+    """JSON turns tuples into lists; turn them back so signatures compare equal."""
+    if value is None:
+        return None
+    return tuple(tuple(part) if part is not None else None for part in value)
+
+# ========== FILES ==========
+
+# Rollups loaded in this process, keyed by data file path
+_loaded = {}
+
+def get_rollups_filepath(filepath):
+    """Returns the path of the rollups file that sits next to the data file."""
+    filepath = Path(filepath)
+    return filepath.with_name(f"{filepath.stem}_rollups.json")
+
+def save_rollups(rollups, filepath):
+    """Persist rollups next to the data file (atomic replace)."""
+    path = get_rollups_filepath(filepath)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(rollups.to_dict(), f)
+    os.replace(tmp_path, path)
+    _loaded[str(filepath)] = rollups
+
+def load_rollups(filepath, signature):
+    """Return the rollups for filepath if they match signature, otherwise None."""
+    rollups = _loaded.get(str(filepath))
+    if rollups is None or rollups.signature != signature:
+        # Another process may have saved newer rollups along with its writes
+        path = get_rollups_filepath(filepath)
+        if not path.exists():
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                rollups = Rollups.from_dict(json.load(f))
+        except (OSError, ValueError):
+            return None
+        if rollups is None:
+            return None
+        _loaded[str(filepath)] = rollups
+    if rollups.signature != signature:
+        return None
+    return rollups
+
+def update_rollups(filepath, entries, old_signature, new_signature):
+    """Apply saved expenses to up-to-date rollups and persist them.
+
+    Stale rollups are left alone; the next read repairs them.
+    """
+    rollups = load_rollups(filepath, old_signature)
+    if rollups is None:
+        return None
+    for entry in entries:
+        rollups.add(entry['Date'], entry.get('Category'), entry.get('Amount'))
+    rollups.signature = new_signature
+    save_rollups(rollups, filepath)
+    return rollups
+
+def touch_rollups(filepath, old_signature, new_signature):
+    """Move up-to-date rollups to a new signature when the content did not change (compaction)."""
+    rollups = load_rollups(filepath, old_signature)
+    if rollups is not None:
+        rollups.signature = new_signature
+        save_rollups(rollups, filepath)
+
+on_files_reshuffled(touch_rollups)
+
+def delete_rollups(filepath):
+    """Remove the persisted rollups of a data file."""
+    _loaded.pop(str(filepath), None)
+    path = get_rollups_filepath(filepath)
+    if path.exists():
+        path.unlink()
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+# In memory the ledger is held in a compact, exact form:
+#   Date      datetime64[ns]
+#   Category  categorical over CATEGORIES (plus any other name found in the data)
+#   Amount    nullable Int64 cents, so totals never drift
+#   Notes     categorical; most notes repeat ("coffee", "bus")
+# Files keep their existing layout (float dollars, plain text); to_file_frame converts back.
+
+# Fixed list of categories
+CATEGORIES = [
+    'Restaurant', 'Toters', 'Entertainment', 'Groceries', 'Snacks',
+    'Barber', 'Laundry', 'Transportation', 'Shopping', 'Phone'
+]
+
+CENTS = 100
+AMOUNT_DTYPE = 'Int64'
+
+def category_dtype(values=()):
+    """Categorical dtype over CATEGORIES, extended with any other names in values.
+
+    values should be the distinct names (e.g. a categorical's categories), not a column.
+    """
+    known = set(CATEGORIES)
+    extra = sorted({v for v in values if v not in known and not pd.isna(v)}, key=str)
+    return pd.CategoricalDtype(CATEGORIES + extra)
+
+def is_cents(values):
+    return values.dtype == AMOUNT_DTYPE
+
+def as_cents(values):
+    """Amounts as Int64 cents. Int64 input is already cents; anything else is dollars."""
+    values = pd.Series(values)
+    if is_cents(values):
+        return values
+    dollars = pd.to_numeric(values).to_numpy(dtype=float, na_value=np.nan)
+    missing = np.isnan(dollars)
+    cents = np.round(np.where(missing, 0.0, dollars) * CENTS).astype(np.int64)
+    return pd.Series(pd.arrays.IntegerArray(cents, missing), index=values.index, name=values.name)
+
+def decimal_amounts(values):
+    """Amounts as float dollars (NaN where missing), for display, files and charts."""
+    values = pd.Series(values)
+    if not is_cents(values):
+        return pd.to_numeric(values).astype(float)
+    return values.astype('float64') / CENTS
+
+def total_amount(values):
+    """Exact sum of amounts in dollars."""
+    return int(as_cents(values).sum()) / CENTS
+
+def _is_category_column(values):
+    return (isinstance(values.dtype, pd.CategoricalDtype)
+            and values.dtype.categories[:len(CATEGORIES)].tolist() == CATEGORIES)
+
+def _category_column(values):
+    """Category as a categorical whose categories start with CATEGORIES, in that order."""
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype('category')  # factorize first, then only the distinct names are checked
+    return values.cat.set_categories(category_dtype(values.cat.categories).categories)
+
+def entries_frame(entries, dates):
+    """Expense dicts as a DataFrame with the in-memory schema; dates are the parsed Dates."""
+    categories = [entry.get('Category') for entry in entries]
+    return pd.DataFrame({
+        'Date': pd.DatetimeIndex(dates),
+        'Category': pd.Categorical(categories, dtype=category_dtype(categories)),
+        'Amount': as_cents([entry.get('Amount') for entry in entries]).array,
+        'Notes': pd.Categorical([entry.get('Notes') for entry in entries]),
+    })
+
+def apply_schema(df):
+    """Return df with the in-memory dtypes for Category, Amount and Notes (Date is left to the caller).
+
+    Columns that already have them are not copied, so this is cheap to call again.
+    """
+    changes = {}
+    if 'Category' in df.columns and not _is_category_column(df['Category']):
+        changes['Category'] = _category_column(df['Category'])
+    if 'Amount' in df.columns and not is_cents(df['Amount']):
+        changes['Amount'] = as_cents(df['Amount'])
+    if 'Notes' in df.columns and not isinstance(df['Notes'].dtype, pd.CategoricalDtype):
+        changes['Notes'] = df['Notes'].astype('category')
+    return df.assign(**changes) if changes else df
+
+def as_text(values):
+    """A categorical column as plain object values, NaN kept."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.astype(object)
+    return values
+
+def to_file_frame(df):
+    """Return df in the form the data files use: float dollar amounts and plain text."""
+    changes = {}
+    for column in ('Category', 'Notes'):
+        if column in df.columns and isinstance(df[column].dtype, pd.CategoricalDtype):
+            changes[column] = df[column].astype(object)
+    if 'Amount' in df.columns and is_cents(df['Amount']):
+        changes['Amount'] = decimal_amounts(df['Amount'])
+    return df.assign(**changes) if changes else df
+
+def decimal_view(df):
+    """df with Amount in dollars; the categorical columns are kept."""
+    if 'Amount' in df.columns and is_cents(df['Amount']):
+        return df.assign(Amount=decimal_amounts(df['Amount']))
+    return df
+
+def _with_categories(values, categories):
+    """Recode a categorical column to a superset of its categories."""
+    dtype = pd.CategoricalDtype(categories)
+    if categories[:len(values.cat.categories)].equals(values.cat.categories):
+        # Only new categories were appended, so the codes stay valid as they are
+        return pd.Series(pd.Categorical.from_codes(values.cat.codes.to_numpy(), dtype=dtype),
+                         index=values.index, name=values.name)
+    return values.cat.set_categories(categories)
+
+def concat_frames(frames):
+    """pd.concat that keeps Category and Notes categorical when the frames' categories differ.
+
+    The categories are merged first (the first frame's come first), so adding a few rows
+    with a new note to a large ledger does not recode the ledger.
+    """
+    frames = list(frames)
+    for column in ('Category', 'Notes'):
+        columns = [f[column] for f in frames if column in f.columns]
+        if len(columns) < 2 or not all(isinstance(c.dtype, pd.CategoricalDtype) for c in columns):
+            continue
+        categories = columns[0].cat.categories
+        for c in columns[1:]:
+            categories = categories.append(c.cat.categories.difference(categories, sort=False))
+        frames = [_recoded(f, column, categories) for f in frames]
+    return pd.concat(frames, ignore_index=True)
+
+def _recoded(df, column, categories):
+    if column not in df.columns or df[column].dtype.categories.equals(categories):
+        return df
+    # A shallow copy: only the recoded column is new, the other columns are shared
+    df = df.copy(deep=False)
+    df[column] = _with_categories(df[column], categories)
+    return df
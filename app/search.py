@@ -0,0 +1,272 @@
+from pathlib import Path
+import json
+import os
+import re
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from app.schema import AMOUNT_DTYPE, CENTS, apply_schema, as_cents, as_text
+from app.storage import COLUMNS, empty_frame, on_files_reshuffled, to_timestamp
+
+# Words are runs of letters and digits, matched case-insensitively
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Sorts after any character, so [term, term + PREFIX_END) holds every token starting with term
+PREFIX_END = '\U0010ffff'
+
+EPOCH = pd.Timestamp(0)
+
+def tokenize(text):
+    """Distinct lower-case words of a note, in order of appearance."""
+    if text is None or (not isinstance(text, str) and pd.isna(text)):
+        return []
+    return list(dict.fromkeys(TOKEN_PATTERN.findall(str(text).casefold())))
+
+def _day_number(date):
+    return (to_timestamp(date).normalize() - EPOCH).days
+
+def _entry_cents(amount):
+    if amount is None or pd.isna(amount):
+        return None
+    # Rounded to the cent exactly like the ledger's Int64 amounts
+    return int(round(float(amount) * CENTS))
+
+def get_search_index_filepath(filepath):
+    """Returns the path of the notes search index that sits next to the data file."""
+    filepath = Path(filepath)
+    return filepath.with_name(f"{filepath.stem}_search.sqlite")
+
+class SearchIndex:
+    """Inverted index from the words of the notes to the expenses, kept in SQLite next to the data file.
+
+    Tables:
+      notes     distinct note texts
+      tokens    (token, note id), clustered on the token, so a prefix is one B-tree range scan
+      postings  date, category and amount of every expense, clustered on (note id, date)
+      meta      the data file signature the index corresponds to, and the next posting id
+
+    Every query term is a prefix ("coff" finds "coffee") and all terms must match.
+    Like the rollups, the index is tagged with the data file signature, updated with
+    each save and rebuilt from the ledger when the data changed through another path.
+    """
+
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+        "CREATE TABLE IF NOT EXISTS notes (id INTEGER PRIMARY KEY, text TEXT NOT NULL UNIQUE)",
+        """CREATE TABLE IF NOT EXISTS tokens (
+            token TEXT NOT NULL,
+            note_id INTEGER NOT NULL,
+            PRIMARY KEY (token, note_id)
+        ) WITHOUT ROWID""",
+        # A note's expenses are stored together, so reading them needs no second lookup
+        """CREATE TABLE IF NOT EXISTS postings (
+            note_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            id INTEGER NOT NULL,
+            category TEXT,
+            cents INTEGER,
+            PRIMARY KEY (note_id, day, id)
+        ) WITHOUT ROWID""",
+    ]
+
+    def __init__(self, filepath):
+        self.filepath = Path(filepath)
+        self.path = get_search_index_filepath(filepath)
+
+    def _connect(self, path=None):
+        conn = sqlite3.connect(path or self.path)
+        # Derived data: a torn write is caught by the signature check and rebuilt
+        conn.execute("PRAGMA synchronous = OFF")
+        return conn
+
+    # ---------- Freshness ----------
+
+    def signature(self):
+        """The data file signature the index was built for, or None if there is no usable index."""
+        if not self.path.exists():
+            return None
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+            finally:
+                conn.close()
+        except sqlite3.DatabaseError:
+            return None
+        return row[0] if row else None
+
+    def is_current(self, signature):
+        return self.signature() == _signature_text(signature)
+
+    # ---------- Building and updating ----------
+
+    def rebuild(self, df, signature):
+        """Index every expense of df from scratch (atomic replace)."""
+        df = apply_schema(df)
+        notes = df['Notes']
+        texts = notes.cat.categories
+        note_tokens = [tokenize(text) for text in texts]
+        has_tokens = np.array([bool(tokens) for tokens in note_tokens] + [False])
+
+        # Code -1 (no note) indexes the trailing False
+        codes = notes.cat.codes.to_numpy()
+        keep = has_tokens[codes]
+        days = df['Date'].to_numpy(dtype='datetime64[D]')[keep].astype(np.int64)
+        categories = as_text(df['Category'])[keep].astype(object)
+        cents = as_cents(df['Amount'])[keep].to_numpy(dtype=object, na_value=None)
+
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        if tmp_path.exists():
+            tmp_path.unlink()
+        conn = self._connect(tmp_path)
+        try:
+            with conn:
+                for statement in self.SCHEMA:
+                    conn.execute(statement)
+                conn.executemany("INSERT INTO notes (id, text) VALUES (?, ?)",
+                                 ((i, str(texts[i])) for i, tokens in enumerate(note_tokens) if tokens))
+                conn.executemany("INSERT INTO tokens (token, note_id) VALUES (?, ?)",
+                                 ((token, i) for i, tokens in enumerate(note_tokens) for token in tokens))
+                # Inserted in clustering-key order, so SQLite appends instead of splitting pages
+                note_ids = codes[keep]
+                order = np.lexsort((days, note_ids))
+                conn.executemany(
+                    "INSERT INTO postings (note_id, day, id, category, cents) VALUES (?, ?, ?, ?, ?)",
+                    zip(note_ids[order].tolist(), days[order].tolist(), order.tolist(),
+                        categories.where(categories.notna(), None).to_numpy()[order].tolist(),
+                        cents[order].tolist()),
+                )
+                conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                                 [('signature', _signature_text(signature)), ('next_id', str(len(order)))])
+        finally:
+            conn.close()
+        os.replace(tmp_path, self.path)
+
+    def add(self, entries, old_signature, new_signature):
+        """Index saved expenses if the index is current. Returns False if it was stale (left for a rebuild)."""
+        if not self.path.exists():
+            return False
+        try:
+            conn = self._connect()
+        except sqlite3.DatabaseError:
+            return False
+        try:
+            with conn:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+                if row is None or row[0] != _signature_text(old_signature):
+                    return False
+                next_id = int(conn.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()[0])
+                for entry in entries:
+                    notes = entry.get('Notes')
+                    tokens = tokenize(notes)
+                    if not tokens:
+                        continue
+                    conn.execute("INSERT OR IGNORE INTO notes (text) VALUES (?)", (str(notes),))
+                    note_id = conn.execute("SELECT id FROM notes WHERE text = ?", (str(notes),)).fetchone()[0]
+                    conn.executemany("INSERT OR IGNORE INTO tokens (token, note_id) VALUES (?, ?)",
+                                     [(token, note_id) for token in tokens])
+                    conn.execute("INSERT INTO postings (note_id, day, id, category, cents) VALUES (?, ?, ?, ?, ?)",
+                                 (note_id, _day_number(entry['Date']), next_id, entry.get('Category'),
+                                  _entry_cents(entry.get('Amount'))))
+                    next_id += 1
+                conn.executemany("UPDATE meta SET value = ? WHERE key = ?",
+                                 [(_signature_text(new_signature), 'signature'), (str(next_id), 'next_id')])
+        except sqlite3.DatabaseError:
+            return False
+        finally:
+            conn.close()
+        return True
+
+    def touch(self, old_signature, new_signature):
+        """Move a current index to a new signature when the content did not change (compaction)."""
+        if not self.path.exists():
+            return
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("UPDATE meta SET value = ? WHERE key = 'signature' AND value = ?",
+                                 (_signature_text(new_signature), _signature_text(old_signature)))
+            finally:
+                conn.close()
+        except sqlite3.DatabaseError:
+            pass
+
+    # ---------- Queries ----------
+
+    @staticmethod
+    def _matching_note_ids(terms):
+        """SQL and parameters selecting the ids of notes that contain a word starting with every term."""
+        sql = " INTERSECT ".join(["SELECT note_id FROM tokens WHERE token >= ? AND token < ?"] * len(terms))
+        params = [bound for term in terms for bound in (term, term + PREFIX_END)]
+        return sql, params
+
+    def matching_notes(self, query):
+        """Distinct note texts matching every term of query (as prefixes)."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        sql, params = self._matching_note_ids(terms)
+        conn = self._connect()
+        try:
+            return [row[0] for row in conn.execute(f"SELECT text FROM notes WHERE id IN ({sql})", params)]
+        finally:
+            conn.close()
+
+    def search(self, query, limit=None):
+        """Expenses whose notes match every term of query, sorted by date.
+
+        With limit, only the most recent `limit` matches are returned.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return empty_frame()
+        sql, params = self._matching_note_ids(terms)
+        conn = self._connect()
+        try:
+            notes = dict(conn.execute(f"SELECT id, text FROM notes WHERE id IN ({sql})", params))
+            # Without a limit, numpy sorts the matches faster than SQLite's temporary B-tree
+            newest_first = "" if limit is None else " ORDER BY day DESC, id DESC LIMIT ?"
+            rows = conn.execute(
+                f"SELECT day, id, category, cents, note_id FROM postings WHERE note_id IN ({sql}){newest_first}",
+                params + ([] if limit is None else [limit]),
+            ).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return empty_frame()
+        days, ids, categories, cents, note_ids = zip(*rows)
+        days = np.array(days, dtype=np.int64)
+        order = np.lexsort((np.array(ids), days))
+        # Note ids map straight onto categorical codes, so the note texts are not repeated per row
+        codes = pd.Index(list(notes)).get_indexer(note_ids)
+        df = pd.DataFrame({
+            'Date': EPOCH + pd.to_timedelta(days, unit='D'),
+            'Category': list(categories),
+            'Amount': pd.array(cents, dtype=AMOUNT_DTYPE),
+            'Notes': pd.Categorical.from_codes(codes, categories=list(notes.values())),
+        }, columns=COLUMNS)
+        return apply_schema(df.take(order).reset_index(drop=True))
+
+def _signature_text(signature):
+    """Signatures are stored as JSON text; tuples and lists give the same text."""
+    return json.dumps(signature)
+
+# ========== FILES ==========
+
+def update_search_index(filepath, entries, old_signature, new_signature):
+    """Apply saved expenses to a current index. A stale or missing one is left for the next search to rebuild."""
+    return SearchIndex(filepath).add(entries, old_signature, new_signature)
+
+def touch_search_index(filepath, old_signature, new_signature):
+    SearchIndex(filepath).touch(old_signature, new_signature)
+
+on_files_reshuffled(touch_search_index)
+
+def delete_search_index(filepath):
+    """Remove the persisted search index of a data file."""
+    path = get_search_index_filepath(filepath)
+    if path.exists():
+        path.unlink()
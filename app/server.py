@@ -0,0 +1,418 @@
+import asyncio
+import ipaddress
+import json
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from app.instrument import timed
+
+# A small HTTP/JSON API for scripts and dashboards on this machine. The ledger stays
+# loaded in the process-wide dataset cache between requests, so a request costs a
+# query on memory instead of parsing the data files again.
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Largest request body accepted (a batch of about 100,000 expenses)
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+# How long an insert waits for inserts from other requests to share its write
+BATCH_DELAY = 0.05
+
+# GET responses kept per data file signature; any write to the data invalidates them
+RESPONSE_CACHE_SIZE = 256
+
+JSON_TYPE = 'application/json'
+IMAGE_TYPES = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+class ApiError(Exception):
+    """An error reported to the client with an HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def check_local_host(host):
+    """Raise ValueError unless host is a loopback address: the API has no authentication."""
+    if host == 'localhost':
+        return
+    try:
+        loopback = ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        loopback = False
+    if not loopback:
+        raise ValueError(f"refusing to listen on {host}: the API is for this machine only (use 127.0.0.1 or localhost)")
+
+# ========== REQUEST PARAMETERS ==========
+
+def _one(params, name, cast=str):
+    values = params.get(name)
+    if not values or values[-1] == '':
+        return None
+    try:
+        return cast(values[-1])
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"invalid {name} '{values[-1]}'") from None
+
+def _many(params, name):
+    """Repeated (?category=a&category=b) or comma-separated (?category=a,b) values."""
+    values = [part.strip() for value in params.get(name, []) for part in value.split(',')]
+    return [value for value in values if value] or None
+
+def _query(params, **options):
+    from app.query import Query
+    try:
+        return Query(
+            _one(params, 'start'), _one(params, 'end'), _many(params, 'category'),
+            _one(params, 'min', float), _one(params, 'max', float), _one(params, 'notes'),
+            **options,
+        )
+    except ValueError as e:
+        raise ApiError(HTTPStatus.BAD_REQUEST, str(e)) from None
+
+def _rows_json(df, params):
+    """Rows as a JSON list of records, after ?offset= and ?limit=."""
+    offset = _one(params, 'offset', int) or 0
+    limit = _one(params, 'limit', int)
+    if offset < 0 or (limit is not None and limit < 0):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "offset and limit must not be negative")
+    df = df.iloc[offset:] if limit is None else df.iloc[offset:offset + limit]
+    return df.to_json(orient='records', date_format='iso')
+
+# ========== ENDPOINTS ==========
+# Each runs on the data worker thread and returns (content type, body bytes).
+
+def get_expenses(params):
+    rows = _query(params).run()
+    return JSON_TYPE, _rows_json(rows, params).encode()
+
+def get_aggregate(params):
+    result = _query(params, group_by=_many(params, 'group_by') or (),
+                    aggregates=_many(params, 'agg') or ['sum']).run()
+    return JSON_TYPE, _rows_json(result, params).encode()
+
+def get_search(params):
+    from app.expense_utils import search_expenses
+    from app.schema import decimal_view
+    text = _one(params, 'q')
+    if text is None:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "missing q")
+    limit = _one(params, 'limit', int)
+    if limit is not None and limit < 0:
+        # SQLite would read LIMIT -1 as no limit at all
+        raise ApiError(HTTPStatus.BAD_REQUEST, "limit must not be negative")
+    rows = decimal_view(search_expenses(text, limit=limit))
+    return JSON_TYPE, rows.to_json(orient='records', date_format='iso').encode()
+
+def get_stats(params):
+    from app.expense_utils import get_cache_stats, get_rollups
+    rollups = get_rollups()
+    days = sorted(rollups.daily)
+    stats = {
+        'expenses': rollups.count,
+        'total': rollups.total_amount,
+        'first_date': days[0] if days else None,
+        'last_date': days[-1] if days else None,
+        'months': len(rollups.monthly),
+        'cache': get_cache_stats(),
+    }
+    return JSON_TYPE, json.dumps(stats).encode()
+
+def get_chart(params, name):
+    from visuals.render import CHARTS, render_chart
+    kind, _, fmt = name.partition('.')
+    fmt = fmt or 'png'
+    if kind not in CHARTS or fmt not in IMAGE_TYPES:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"no chart '{name}' (choose from: {', '.join(CHARTS)}; png or svg)")
+    chart_params = {}
+    if kind == 'monthly':
+        month, year = _one(params, 'month', int), _one(params, 'year', int)
+        if month is None or year is None:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "the monthly chart needs month and year")
+        if not 1 <= month <= 12:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"invalid month '{month}' (1-12)")
+        chart_params = {'month': month, 'year': year}
+    # render_chart keeps the rendered file until the numbers behind the chart change
+    path, _ = render_chart(kind, fmt, **chart_params)
+    if path is None:
+        raise ApiError(HTTPStatus.NOT_FOUND, "nothing to plot")
+    return IMAGE_TYPES[fmt], path.read_bytes()
+
+GET_ROUTES = {
+    '/expenses': get_expenses,
+    '/aggregate': get_aggregate,
+    '/search': get_search,
+    '/stats': get_stats,
+}
+CHART_PREFIX = '/charts/'
+
+# Answered fresh every time: /stats reports the dataset cache counters, which change on each request
+UNCACHED_ROUTES = {'/stats'}
+
+def parse_expenses(body):
+    """Validate a POST body: one expense object, a list of them, or {"expenses": [...]}."""
+    from app.cli import parse_entry
+    from app.expense_utils import categories
+    try:
+        records = json.loads(body or b'null')
+    except ValueError as e:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"invalid JSON: {e}") from None
+    if isinstance(records, dict):
+        records = records.get('expenses', [records])
+    if not isinstance(records, list) or not records:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "expected an expense object or a non-empty list of them")
+
+    entries, errors = [], []
+    for number, record in enumerate(records):
+        try:
+            if not isinstance(record, dict):
+                raise ValueError("not an object")
+            entries.append(parse_entry(record, categories))
+        except ValueError as e:
+            errors.append(f"expense {number}: {e}")
+    if errors:
+        # Like `main.py add`, nothing is saved when any expense is invalid
+        raise ApiError(HTTPStatus.UNPROCESSABLE_ENTITY, "; ".join(errors))
+    return entries
+
+# ========== WRITES ==========
+
+class InsertBatcher:
+    """Groups the inserts of concurrent requests into a single save.
+
+    The first insert waits BATCH_DELAY for others to join it; inserts that arrive
+    while a save is running go into the next one, so saves never overlap. Each request
+    is answered once the save holding its expenses is on disk.
+    """
+
+    def __init__(self, save_batch, delay=BATCH_DELAY):
+        self.save_batch = save_batch  # coroutine function taking a list of entries
+        self.delay = delay
+        self.pending = []             # (entries, future) per request
+        self._task = None
+
+    async def add(self, entries):
+        """Queue entries and wait for them to be saved. Returns the size of the write they went into."""
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((entries, future))
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return await future
+
+    async def _run(self):
+        try:
+            while self.pending:
+                await asyncio.sleep(self.delay)
+                await self.flush()
+        finally:
+            self._task = None
+
+    async def flush(self):
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        entries = [entry for request_entries, _ in batch for entry in request_entries]
+        try:
+            await self.save_batch(entries)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for _, future in batch:
+            if not future.done():
+                future.set_result(len(entries))
+
+# ========== SERVER ==========
+
+class ApiServer:
+    """asyncio HTTP/1.1 server around app.expense_utils.
+
+    Parsing and I/O happen on the event loop; all data work runs on one worker thread
+    (like the GUI's background worker), so pandas and matplotlib are never used from
+    two threads at once and reads always see completed writes.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="expense-api")
+        self._responses = OrderedDict()  # request target -> (data signature, content type, body)
+        self.batcher = InsertBatcher(self._save)
+        self.filepath = None
+        self.port = None
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _warm_up(self):
+        """Load the ledger and the rollups into memory before the first request."""
+        from app.expense_utils import _get_cached_ledger, ensure_data_file, get_rollups
+        self.filepath = ensure_data_file()
+        df = _get_cached_ledger(self.filepath)
+        get_rollups()
+        return len(df)
+
+    async def _save(self, entries):
+        from app.expense_utils import save_expense_entries
+        await self._run(save_expense_entries, None, entries, self.filepath)
+
+    # ---------- Dispatch ----------
+
+    async def dispatch(self, method, target):
+        """Return (status, content type, body) for a GET or HEAD request."""
+        url = urlsplit(target)
+        params = parse_qs(url.query, keep_blank_values=True)
+        if url.path in GET_ROUTES:
+            handler, args = GET_ROUTES[url.path], (params,)
+        elif url.path.startswith(CHART_PREFIX):
+            handler, args = get_chart, (params, url.path[len(CHART_PREFIX):])
+        else:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"no such endpoint: {url.path}")
+        if method not in ('GET', 'HEAD'):
+            raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, f"{url.path} only supports GET")
+        if url.path in UNCACHED_ROUTES:
+            content_type, body = await self._run(handler, *args)
+        else:
+            content_type, body = await self._cached(target, handler, *args)
+        return HTTPStatus.OK, content_type, body
+
+    async def _cached(self, target, handler, *args):
+        """Serve a GET from the response cache while the data files are unchanged."""
+        from app.storage import get_data_signature
+        # Taken before running the handler: a write during it only causes a recompute later
+        signature = get_data_signature(self.filepath)
+        cached = self._responses.get(target)
+        if cached is not None and cached[0] == signature:
+            self._responses.move_to_end(target)
+            return cached[1], cached[2]
+        content_type, body = await self._run(handler, *args)
+        self._responses[target] = (signature, content_type, body)
+        self._responses.move_to_end(target)
+        while len(self._responses) > RESPONSE_CACHE_SIZE:
+            self._responses.popitem(last=False)
+        return content_type, body
+
+    def check_host(self, headers):
+        """Reject requests not addressed to this server by a loopback name.
+
+        A web page can point its own domain at 127.0.0.1 (DNS rebinding); its requests
+        then carry that domain in Host, which is how they are told apart from local clients.
+        """
+        if self.port is None:
+            return
+        allowed = {f"{name}:{self.port}" for name in ('127.0.0.1', 'localhost', '[::1]')}
+        if headers.get('host', '').lower() not in allowed:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Host must be 127.0.0.1 or localhost with the server's port")
+
+    async def post(self, target, body, headers):
+        path = urlsplit(target).path
+        if path != '/expenses':
+            raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, f"{path} does not accept POST")
+        media_type = headers.get('content-type', '').partition(';')[0].strip().lower()
+        if media_type != JSON_TYPE:
+            raise ApiError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, f"expenses must be sent as {JSON_TYPE}")
+        entries = parse_expenses(body)
+        batch_size = await self.batcher.add(entries)
+        return HTTPStatus.CREATED, JSON_TYPE, json.dumps({'saved': len(entries), 'batch': batch_size}).encode()
+
+    # ---------- HTTP ----------
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, JSON_TYPE, _error("malformed request line"), False)
+                    break
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY_BYTES:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE if length > 0 else HTTPStatus.BAD_REQUEST,
+                                        JSON_TYPE, _error("bad or too large Content-Length"), False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, content_type, payload = await self._handle(method, target, body, headers)
+                await self._respond(writer, status, content_type, b'' if method == 'HEAD' else payload,
+                                    keep_alive, len(payload))
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle(self, method, target, body, headers):
+        route = urlsplit(target).path
+        if route.startswith(CHART_PREFIX):
+            route = CHART_PREFIX + '*'
+        with timed('api', label=f"{method} {route}"):
+            try:
+                self.check_host(headers)
+                if method == 'POST':
+                    return await self.post(target, body, headers)
+                return await self.dispatch(method, target)
+            except ApiError as e:
+                return e.status, JSON_TYPE, _error(str(e))
+            except Exception as e:
+                print(f"❌ {method} {target}: {type(e).__name__}: {e}", file=sys.stderr)
+                return HTTPStatus.INTERNAL_SERVER_ERROR, JSON_TYPE, _error(f"{type(e).__name__}: {e}")
+
+    @staticmethod
+    async def _respond(writer, status, content_type, body, keep_alive, length=None):
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body) if length is None else length}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def serve_forever(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        count = await self._run(self._warm_up)
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        # The bound port, which differs from port when that is 0
+        self.port = server.sockets[0].getsockname()[1]
+        print(f"🌐 Serving {count} expenses on http://{host}:{self.port} (Ctrl+C to stop)")
+        if ready is not None:
+            ready(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            # Inserts still queued are written before the process exits
+            await self.batcher.flush()
+            self._executor.shutdown(wait=True)
+
+def _error(message):
+    return json.dumps({'error': message}).encode()
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Run the API until interrupted."""
+    check_local_host(host)
+    # Charts are rendered to files, never shown
+    import matplotlib
+    matplotlib.use("Agg")
+    try:
+        asyncio.run(ApiServer().serve_forever(host, port))
+    except KeyboardInterrupt:
+        print("👋 Server stopped.")
@@ -0,0 +1,82 @@
+import builtins
+import sys
+import threading
+import time
+
+PROFILE_FLAG = "--profile-startup"
+
+class StartupProfile:
+    """Prints import and initialisation timings when the app is started with --profile-startup.
+
+    Imports are timed by wrapping builtins.__import__, so only modules that are actually
+    loaded (including the ones deferred until first use) show up. Nested imports are
+    folded into the top-level import that triggered them. When profiling is off nothing
+    is wrapped and every call is a no-op.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.started = time.perf_counter()
+        self._local = threading.local()
+        self._original_import = None
+
+    def enable_from_argv(self, argv=None):
+        """Turn profiling on if the flag is present, removing it from argv."""
+        argv = sys.argv if argv is None else argv
+        if PROFILE_FLAG in argv:
+            argv.remove(PROFILE_FLAG)
+            self.enable()
+        return self.enabled
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+        self.mark("profiling started")
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+        if level or name in sys.modules or getattr(self._local, "importing", False):
+            return original(name, globals, locals, fromlist, level)
+
+        self._local.importing = True
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            self._local.importing = False
+            self.record(f"import {name}", time.perf_counter() - start)
+
+    def record(self, label, seconds):
+        """Print a step that took `seconds`, stamped with the time since startup."""
+        if self.enabled:
+            since_start = time.perf_counter() - self.started
+            print(f"⏱️ {since_start * 1000:9.1f} ms  {label} ({seconds * 1000:.1f} ms)",
+                  file=sys.stderr, flush=True)
+
+    def mark(self, label):
+        """Print a milestone such as "window shown" with the time since startup."""
+        if self.enabled:
+            since_start = time.perf_counter() - self.started
+            print(f"⏱️ {since_start * 1000:9.1f} ms  {label}", file=sys.stderr, flush=True)
+
+    def step(self, label):
+        """Context manager timing an initialisation step."""
+        return _Step(self, label)
+
+class _Step:
+    def __init__(self, profile, label):
+        self.profile = profile
+        self.label = label
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.record(self.label, time.perf_counter() - self.start)
+        return False
+
+startup_profile = StartupProfile()
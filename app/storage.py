@@ -0,0 +1,912 @@
+from itertools import islice
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import csv
+import json
+import os
+import sqlite3
+import threading
+import uuid
+
+from app.cache import dataset_cache
+from app.config import get_data_dir, get_setting
+from app.filelock import InterProcessLock
+from app.instrument import count, timed
+from app.schema import AMOUNT_DTYPE, apply_schema, category_dtype, concat_frames, to_file_frame
+
+COLUMNS = ['Date', 'Category', 'Amount', 'Notes']
+DATA_STEM = 'Expense_Tracker'
+
+# Text form of dates in the journal, Excel workbooks and the SQLite table
+DATE_FORMAT = '%Y/%m/%d'
+
+# Number of journal rows after which a background compaction is started
+JOURNAL_COMPACT_THRESHOLD = 500
+
+# Text columns read straight into pandas categoricals by pyarrow
+CATEGORICAL_COLUMNS = ['Category', 'Notes']
+
+# Lock files in the data directory, shared by every process using it
+LOCK_FILENAME = '.expense_tracker.lock'
+COMPACTION_LOCK_FILENAME = '.expense_tracker.compact.lock'
+
+# Guards the journal file, data file writes, the rollups and the dataset cache, across
+# threads and across processes (the GUI, main.py and the tools may run at the same time)
+data_lock = InterProcessLock(lambda: get_data_dir() / LOCK_FILENAME)
+# Held for a whole compaction so only one process folds a journal at a time
+_compaction_lock = InterProcessLock(lambda: get_data_dir() / COMPACTION_LOCK_FILENAME)
+_compaction_thread = None
+
+# Called as listener(filepath, old_signature, new_signature) when compaction moves files
+# around without changing the ledger content
+_reshuffle_listeners = []
+
+def empty_frame():
+    """Return an empty expenses DataFrame with the standard columns and dtypes."""
+    return pd.DataFrame({
+        'Date': pd.Series(dtype='datetime64[ns]'),
+        'Category': pd.Series(dtype=category_dtype()),
+        'Amount': pd.Series(dtype=AMOUNT_DTYPE),
+        'Notes': pd.Series(dtype='category')
+    })
+
+# ========== DATES ==========
+
+def to_datetime_column(values):
+    """Return values as datetime64, parsing YYYY/MM/DD text only when needed."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    try:
+        return pd.to_datetime(values, format=DATE_FORMAT)
+    except (ValueError, TypeError):
+        # Workbooks edited by hand may contain real Excel dates or other formats
+        return pd.to_datetime(values)
+
+def to_timestamp(value):
+    """Return a single date (Timestamp, datetime or YYYY/MM/DD text) as a Timestamp."""
+    if value is None or isinstance(value, pd.Timestamp):
+        return value
+    if isinstance(value, str):
+        return pd.to_datetime(value, format=DATE_FORMAT)
+    return pd.Timestamp(value)
+
+def format_date(value):
+    """Return a single date as YYYY/MM/DD text."""
+    return to_timestamp(value).strftime(DATE_FORMAT)
+
+def normalize_frame(df):
+    """Return df with the in-memory schema: datetime64 Date, categorical Category and
+    Notes, and Amount in Int64 cents (see app.schema)."""
+    if 'Date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['Date']):
+        df = df.assign(Date=to_datetime_column(df['Date']))
+    return apply_schema(df)
+
+def format_date_column(dates):
+    """Format a datetime column as YYYY/MM/DD text.
+
+    Ledgers have far fewer distinct days than rows, so only the distinct values go
+    through strftime.
+    """
+    dates = to_datetime_column(dates)
+    codes, uniques = pd.factorize(dates)
+    text = np.asarray(pd.DatetimeIndex(uniques).strftime(DATE_FORMAT), dtype=object)
+    formatted = np.where(codes >= 0, text[codes] if len(text) else None, None)
+    return pd.Series(formatted, index=dates.index, dtype=object)
+
+def dates_as_text(df):
+    """Return a copy of df with Date formatted as YYYY/MM/DD text, for text-based formats."""
+    return df.assign(Date=format_date_column(df['Date']))
+
+# ========== MONTHS ==========
+
+def month_key(value):
+    """YYYY-MM key of a date."""
+    return to_timestamp(value).strftime('%Y-%m')
+
+def split_by_month(df):
+    """Yield (YYYY-MM, rows) for each month of a ledger, oldest first."""
+    if df.empty:
+        return
+    months = df['Date'].dt.year.to_numpy() * 100 + df['Date'].dt.month.to_numpy()
+    if not (np.diff(months) >= 0).all():
+        order = np.argsort(months, kind='stable')
+        df, months = df.iloc[order], months[order]
+    bounds = np.flatnonzero(np.diff(months)) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [len(df)]))
+    for start, end in zip(starts, ends):
+        month = months[start]
+        yield f"{month // 100:04d}-{month % 100:02d}", df.iloc[start:end]
+
+def month_rows(df, month):
+    """Rows of one YYYY-MM month of a date-sorted ledger, found by binary search."""
+    start = pd.Timestamp(f"{month}-01")
+    dates = df['Date']
+    lo = dates.searchsorted(start, side='left')
+    hi = dates.searchsorted(start + pd.offsets.MonthBegin(1), side='left')
+    return df.iloc[lo:hi]
+
+# ========== BACKENDS ==========
+
+def _in_range(df, start=None, end=None):
+    """Boolean mask of rows whose date falls within [start, end]."""
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= df['Date'] >= to_timestamp(start)
+    if end is not None:
+        mask &= df['Date'] <= to_timestamp(end)
+    return mask
+
+class StorageBackend:
+    """Base class for storage backends. Subclasses override read_range where they can filter in the file."""
+    name = None
+    suffix = None
+    supports_append = False
+
+    def read(self, path):
+        raise NotImplementedError
+
+    def write(self, df, path):
+        raise NotImplementedError
+
+    def write_chunks(self, chunks, path):
+        """Write an iterable of date-ordered DataFrames. Backends that can stream override this."""
+        frames = list(chunks)
+        self.write(concat_frames(frames) if frames else empty_frame(), path)
+
+    def append(self, entries, path):
+        """Insert a list of expense dicts (only for backends with supports_append)."""
+        raise NotImplementedError
+
+    def delete(self, path):
+        """Remove the stored ledger."""
+        os.remove(path)
+
+    def read_range(self, path, start=None, end=None):
+        """Rows with start <= Date <= end (either may be None)."""
+        df = normalize_frame(self.read(path))
+        return df[_in_range(df, start, end)].reset_index(drop=True)
+
+class ExcelStorage(StorageBackend):
+    """Reads and writes the ledger as an .xlsx workbook through openpyxl.
+
+    Reads stream the sheet in read-only mode, so memory stays bounded by the batch size
+    rather than the size of the workbook.
+    """
+    name = 'excel'
+    suffix = '.xlsx'
+    BATCH_ROWS = 10_000
+
+    def iter_batches(self, path, start=None, end=None, batch_size=BATCH_ROWS):
+        """Yield the rows with start <= Date <= end as typed DataFrames of at most batch_size rows.
+
+        The app keeps the sheet sorted by date, so reading stops at the first batch that
+        runs past end. If rows turn out to be out of order (a hand-edited workbook) the
+        whole sheet is scanned instead.
+        """
+        from openpyxl import load_workbook
+
+        start, end = to_timestamp(start), to_timestamp(end)
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(h).strip() if h is not None else f'column_{i}' for i, h in enumerate(next(rows, []))]
+            in_order, last_date = True, None
+            while True:
+                raw = [row for row in islice(rows, batch_size) if any(v is not None for v in row)]
+                if not raw:
+                    break
+                batch = self._typed_batch(raw, header)
+                dates = batch['Date']
+                if in_order:
+                    in_order = dates.is_monotonic_increasing and (last_date is None or dates.iloc[0] >= last_date)
+                    last_date = dates.iloc[-1]
+                if start is not None or end is not None:
+                    batch = batch[_in_range(batch, start, end)]
+                if len(batch):
+                    yield batch.reset_index(drop=True)
+                if in_order and end is not None and last_date > end:
+                    break
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _typed_batch(raw, header):
+        batch = pd.DataFrame(raw, columns=header).reindex(columns=COLUMNS)
+        batch = batch.astype({'Category': object, 'Notes': object})
+        batch = batch.assign(
+            Date=to_datetime_column(batch['Date']),
+            Amount=pd.to_numeric(batch['Amount']).astype(float),
+            Notes=batch['Notes'].where(batch['Notes'].notna(), np.nan),
+        )
+        return batch
+
+    def read(self, path):
+        return self.read_range(path)
+
+    def read_range(self, path, start=None, end=None):
+        batches = list(self.iter_batches(path, start, end))
+        if not batches:
+            return empty_frame()
+        return normalize_frame(concat_frames(batches))
+
+    def write(self, df, path):
+        # Excel is the one place dates are stored as text
+        dates_as_text(to_file_frame(df)).to_excel(path, index=False)
+
+    def write_chunks(self, chunks, path):
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(COLUMNS)
+        for chunk in chunks:
+            chunk = dates_as_text(to_file_frame(chunk[COLUMNS])).astype(object)
+            for row in chunk.where(chunk.notna(), None).itertuples(index=False):
+                sheet.append(list(row))
+        workbook.save(path)
+
+class ParquetStorage(StorageBackend):
+    """Columnar binary storage through pyarrow. Much faster than Excel to read and write."""
+    name = 'parquet'
+    suffix = '.parquet'
+
+    def read(self, path):
+        return pd.read_parquet(path, read_dictionary=CATEGORICAL_COLUMNS)
+
+    def write(self, df, path):
+        to_file_frame(df).to_parquet(path, index=False)
+
+    def write_chunks(self, chunks, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(to_file_frame(chunk[COLUMNS]), preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)  # one row group per chunk
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            self.write(empty_frame(), path)
+
+    def read_range(self, path, start=None, end=None):
+        # Let pyarrow skip row groups outside the range using column statistics
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        date_type = pq.read_schema(path).field('Date').type
+        as_filter_value = to_timestamp if pa.types.is_timestamp(date_type) else format_date
+        filters = []
+        if start is not None:
+            filters.append(('Date', '>=', as_filter_value(start)))
+        if end is not None:
+            filters.append(('Date', '<=', as_filter_value(end)))
+        return normalize_frame(pd.read_parquet(path, filters=filters or None, read_dictionary=CATEGORICAL_COLUMNS))
+
+class FeatherStorage(StorageBackend):
+    """Arrow IPC (Feather) storage. Fastest to load, slightly larger on disk than Parquet."""
+    name = 'feather'
+    suffix = '.feather'
+
+    def read(self, path):
+        return pd.read_feather(path)
+
+    def write(self, df, path):
+        to_file_frame(df).reset_index(drop=True).to_feather(path)
+
+    def write_chunks(self, chunks, path):
+        import pyarrow as pa
+
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(to_file_frame(chunk[COLUMNS]), preserve_index=False)
+                if writer is None:
+                    writer = pa.ipc.new_file(str(path), table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            self.write(empty_frame(), path)
+
+class SQLiteStorage(StorageBackend):
+    """SQLite database with indexes on Date and Category.
+
+    Range and aggregate queries run inside SQLite so they only touch the rows they need,
+    and inserts are single-row transactions instead of full-file rewrites.
+    """
+    name = 'sqlite'
+    suffix = '.db'
+    supports_append = True
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS expenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            Date TEXT NOT NULL,
+            Category TEXT,
+            Amount REAL,
+            Notes TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses (Date)",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses (Category, Amount)",
+    ]
+
+    def _connect(self, path, create=False):
+        if not create and not Path(path).exists():
+            raise FileNotFoundError(path)
+        conn = sqlite3.connect(path)
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+        return conn
+
+    def _query(self, path, sql, params=()):
+        conn = self._connect(path)
+        try:
+            return pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+
+    def read(self, path):
+        return self._query(path, "SELECT Date, Category, Amount, Notes FROM expenses ORDER BY Date, id")
+
+    def write(self, df, path):
+        self.write_chunks([df], path)
+
+    def write_chunks(self, chunks, path):
+        conn = self._connect(path, create=True)
+        try:
+            with conn:
+                # Bulk load without the indexes, then build them once at the end
+                conn.execute("DROP INDEX IF EXISTS idx_expenses_date")
+                conn.execute("DROP INDEX IF EXISTS idx_expenses_category")
+                conn.execute("DELETE FROM expenses")
+                for chunk in chunks:
+                    conn.executemany(
+                        "INSERT INTO expenses (Date, Category, Amount, Notes) VALUES (?, ?, ?, ?)",
+                        _rows_for_sql(chunk),
+                    )
+                for statement in self.SCHEMA[1:]:
+                    conn.execute(statement)
+        finally:
+            conn.close()
+
+    def append(self, entries, path):
+        conn = self._connect(path, create=True)
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO expenses (Date, Category, Amount, Notes) VALUES (?, ?, ?, ?)",
+                    [_row_for_sql(entry) for entry in entries],
+                )
+        finally:
+            conn.close()
+
+    def _where(self, start, end):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("Date >= ?")
+            params.append(format_date(start))
+        if end is not None:
+            clauses.append("Date <= ?")
+            params.append(format_date(end))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def read_range(self, path, start=None, end=None):
+        where, params = self._where(start, end)
+        return normalize_frame(self._query(path, f"SELECT Date, Category, Amount, Notes FROM expenses{where} ORDER BY Date, id", params))
+
+def _row_for_sql(entry):
+    """Convert an entry dict into an INSERT parameter tuple."""
+    notes = entry.get('Notes')
+    return (
+        format_date(entry['Date']),
+        entry.get('Category'),
+        float(entry['Amount']),
+        None if notes is None or pd.isna(notes) else str(notes),
+    )
+
+def _rows_for_sql(df):
+    """Vectorised version of _row_for_sql for a whole DataFrame."""
+    df = dates_as_text(to_file_frame(df[COLUMNS]))
+    notes = df['Notes'].astype(object)
+    return zip(
+        df['Date'].tolist(),
+        df['Category'].astype(object).where(df['Category'].notna(), None).tolist(),
+        df['Amount'].astype(float).tolist(),
+        notes.where(notes.notna(), None).tolist(),
+    )
+
+class PartitionedStorage(StorageBackend):
+    """One Parquet file per month plus a small JSON manifest listing them.
+
+    The data file path is the manifest (Expense_Tracker.manifest); the partitions live in
+    Expense_Tracker_partitions/. Partition files are never overwritten: a write creates
+    new files for the months it changes and then swaps the manifest atomically, so readers
+    always see a consistent set. Inserts only rewrite their own month, range reads only
+    open the months they overlap, and full reads load the partitions in parallel.
+    """
+    name = 'partitioned'
+    suffix = '.manifest'
+    supports_append = True
+
+    # ---------- Manifest ----------
+
+    @staticmethod
+    def partition_dir(path):
+        path = Path(path)
+        return path.parent / f"{_strip_tmp(path.stem)}_partitions"
+
+    def load_manifest(self, path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest, path):
+        path = Path(path)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def _new_manifest(self, path):
+        return {'directory': self.partition_dir(path).name, 'partitions': {}}
+
+    def _remove_orphans(self, directory):
+        """Delete partition files that no manifest next to the directory refers to any more."""
+        if not directory.exists():
+            return
+        referenced = set()
+        for manifest_path in directory.parent.glob(f"*{self.suffix}"):
+            try:
+                manifest = self.load_manifest(manifest_path)
+            except (OSError, ValueError):
+                continue
+            if manifest.get('directory') == directory.name:
+                referenced.update(p['file'] for p in manifest['partitions'].values())
+        for file in directory.glob('*.parquet'):
+            if file.name not in referenced:
+                file.unlink()
+
+    # ---------- Partitions ----------
+
+    @staticmethod
+    def schema():
+        """Arrow schema every partition is written and read with.
+
+        Without it a month whose notes are all empty would store Notes as type null, and
+        pyarrow could not combine that file with months that have notes. Reading with it
+        also casts such files written before the schema was fixed.
+        """
+        import pyarrow as pa
+        return pa.schema([
+            ('Date', pa.timestamp('ns')),
+            ('Category', pa.string()),
+            ('Amount', pa.float64()),
+            ('Notes', pa.string()),
+        ])
+
+    def _write_partition(self, directory, month, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"{month}-{uuid.uuid4().hex[:12]}.parquet"
+        rows = rows[COLUMNS].reset_index(drop=True)
+        table = pa.Table.from_pandas(to_file_frame(rows), schema=self.schema(), preserve_index=False)
+        pq.write_table(table, directory / name)
+        return {
+            'file': name,
+            'rows': int(len(rows)),
+            'first': format_date(rows['Date'].iloc[0]),
+            'last': format_date(rows['Date'].iloc[-1]),
+        }
+
+    def _read_partitions(self, path, months=None):
+        """Read the given months (default: all) in parallel and return them in date order."""
+        import pyarrow.dataset as ds
+
+        manifest = self.load_manifest(path)
+        directory = Path(path).parent / manifest['directory']
+        partitions = manifest['partitions']
+        months = sorted(partitions if months is None else (m for m in months if m in partitions))
+        if not months:
+            return empty_frame()
+
+        # pyarrow's dataset scanner reads the files in parallel on its own thread pool
+        files = [str(directory / partitions[month]['file']) for month in months]
+        table = ds.dataset(files, format='parquet', schema=self.schema()).to_table()
+        return sort_by_date(table.to_pandas(categories=CATEGORICAL_COLUMNS))
+
+    # ---------- Backend interface ----------
+
+    def read(self, path):
+        return self._read_partitions(path)
+
+    def write(self, df, path):
+        self.write_chunks([df], path)
+
+    def write_chunks(self, chunks, path):
+        directory = self.partition_dir(path)
+        self._remove_orphans(directory)
+        manifest = self._new_manifest(path)
+
+        # Chunks are date-ordered, so a month is complete once a later month shows up
+        current, pending = None, []
+        for chunk in chunks:
+            for month, rows in split_by_month(normalize_frame(chunk)):
+                if month != current and pending:
+                    manifest['partitions'][current] = self._write_partition(
+                        directory, current, sort_by_date(concat_frames(pending)))
+                    pending = []
+                current = month
+                pending.append(rows)
+        if pending:
+            manifest['partitions'][current] = self._write_partition(
+                directory, current, sort_by_date(concat_frames(pending)))
+        self._save_manifest(manifest, path)
+
+    def append(self, entries, path):
+        manifest = self.load_manifest(path)
+        directory = Path(path).parent / manifest['directory']
+        new_rows = normalize_frame(pd.DataFrame(entries, columns=COLUMNS))
+        for month, rows in split_by_month(new_rows):
+            if month in manifest['partitions']:
+                rows = merge_frames(self._read_partitions(path, [month]), rows)
+            else:
+                rows = sort_by_date(rows)
+            manifest['partitions'][month] = self._write_partition(directory, month, rows)
+        self._save_manifest(manifest, path)
+        self._remove_orphans(directory)
+
+    def read_range(self, path, start=None, end=None):
+        # Partition pruning: only open the months that overlap [start, end]
+        manifest = self.load_manifest(path)
+        months = [m for m in manifest['partitions']
+                  if (start is None or m >= month_key(start)) and (end is None or m <= month_key(end))]
+        df = self._read_partitions(path, months)
+        return df[_in_range(df, start, end)].reset_index(drop=True)
+
+    def delete(self, path):
+        directory = Path(path).parent / self.load_manifest(path)['directory']
+        os.remove(path)
+        self._remove_orphans(directory)
+        if directory.exists() and not any(directory.iterdir()):
+            directory.rmdir()
+
+BACKENDS = {
+    'excel': ExcelStorage,
+    'parquet': ParquetStorage,
+    'feather': FeatherStorage,
+    'sqlite': SQLiteStorage,
+    'partitioned': PartitionedStorage,
+}
+
+def _pyarrow_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def get_storage(name=None):
+    """Return the storage backend chosen by name or by the storage_backend setting."""
+    name = (name or get_setting('storage_backend')).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    if name in ('parquet', 'feather', 'partitioned') and not _pyarrow_available():
+        print(f"⚠️ pyarrow is not installed, falling back to Excel storage instead of {name}.")
+        name = 'excel'
+    return BACKENDS[name]()
+
+def get_storage_for_path(path):
+    """Return the backend that handles a file based on its extension."""
+    suffix = Path(path).suffix.lower()
+    for backend in BACKENDS.values():
+        if backend.suffix == suffix:
+            return backend()
+    raise ValueError(f"Unsupported file type '{suffix}'")
+
+def get_storage_filepath(storage=None):
+    """Return the path of the main data file for the given (or configured) backend."""
+    storage = storage or get_storage()
+    return get_data_dir() / f"{DATA_STEM}{storage.suffix}"
+
+def read_data_file(path):
+    """Read a data file with the backend that matches its extension."""
+    return normalize_frame(get_storage_for_path(path).read(path))
+
+def _tmp_path(path):
+    """A unique temporary name next to path, so concurrent writers never share one."""
+    return path.with_name(f"{path.stem}.tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}{path.suffix}")
+
+def _strip_tmp(stem):
+    """The stem of the file a _tmp_path stands in for."""
+    return stem.split('.tmp-')[0]
+
+def _write_atomically(write, path):
+    """Write to a temporary file and rename it over path, so readers and a crash mid-write
+    only ever see the old or the new file."""
+    path = Path(path)
+    tmp_path = _tmp_path(path)
+    with data_lock:
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if tmp_path.exists():
+                delete_data_file(tmp_path)
+            raise
+
+@timed('write_data_file')
+def write_data_file(df, path):
+    """Write a data file atomically with the backend that matches its extension."""
+    _write_atomically(lambda tmp_path: get_storage_for_path(tmp_path).write(df, tmp_path), path)
+
+def delete_data_file(path):
+    """Delete a data file (and whatever else its backend stores alongside it)."""
+    get_storage_for_path(path).delete(path)
+
+@timed('write_data_file_chunks')
+def write_data_file_chunks(chunks, path):
+    """Like write_data_file, but streams date-ordered chunks so memory stays bounded."""
+    _write_atomically(lambda tmp_path: get_storage_for_path(tmp_path).write_chunks(chunks, tmp_path), path)
+
+# ========== JOURNAL ==========
+
+def get_journal_filepath(filepath=None):
+    """Returns the path of the append-only journal that sits next to the data file."""
+    filepath = Path(filepath or get_storage_filepath())
+    return filepath.with_name(f"{filepath.stem}_journal.csv")
+
+def _get_pending_filepath(filepath):
+    """Returns the path a journal is moved to while it is being compacted."""
+    return get_journal_filepath(filepath).with_suffix('.compacting')
+
+def append_many_to_journal(entries, filepath):
+    """Append several expenses to the journal with a single open and write."""
+    journal_path = get_journal_filepath(filepath)
+    with data_lock:
+        is_new = not journal_path.exists()
+        with open(journal_path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if is_new:
+                writer.writerow(COLUMNS)
+            writer.writerows(
+                [format_date(entry['Date'])] + [entry.get(col, '') for col in COLUMNS[1:]]
+                for entry in entries
+            )
+
+def _read_journal_file(path):
+    """Read a journal file into a DataFrame (empty if the file does not exist)."""
+    if not path.exists():
+        return empty_frame()
+    df = pd.read_csv(path, dtype={'Date': str, 'Category': str, 'Notes': str},
+                     keep_default_na=False)
+    return normalize_frame(df)
+
+def load_journal(filepath):
+    """Return all journal rows not yet folded into the data file."""
+    with data_lock:
+        pending = _read_journal_file(_get_pending_filepath(filepath))
+        journal = _read_journal_file(get_journal_filepath(filepath))
+    frames = [f for f in (pending, journal) if not f.empty]
+    if not frames:
+        return empty_frame()
+    return concat_frames(frames)
+
+def get_data_signature(filepath):
+    """Return (mtime, size) of the data file and its journals, used to detect changes on disk."""
+    signature = []
+    for path in (Path(filepath), _get_pending_filepath(filepath), get_journal_filepath(filepath)):
+        try:
+            stat = path.stat()
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+def count_journal_rows(filepath):
+    """Count journal rows without parsing them."""
+    total = 0
+    for path in (_get_pending_filepath(filepath), get_journal_filepath(filepath)):
+        if path.exists():
+            with open(path, 'rb') as f:
+                total += max(sum(1 for _ in f) - 1, 0)
+    return total
+
+def sort_by_date(df):
+    """Stable sort by date. The input is left untouched."""
+    df = normalize_frame(df)
+    if df['Date'].is_monotonic_increasing:
+        return df.reset_index(drop=True)
+    return df.sort_values(by='Date', kind='stable').reset_index(drop=True)
+
+def merge_frames(df, journal):
+    """Merge journal rows into the stored rows, keeping date order."""
+    if journal.empty:
+        return df
+    df = concat_frames([df, journal]) if not df.empty else journal
+    return sort_by_date(df)
+
+@timed('read_ledger')
+def read_ledger(filepath):
+    """Read the data file merged with its journal. Raises FileNotFoundError if the file is missing."""
+    with data_lock:
+        df = read_data_file(filepath)
+        journal = load_journal(filepath)
+    return merge_frames(df, journal)
+
+@timed('append_entries')
+def append_entries(entries, filepath):
+    """Persist several expenses in one write. Returns True if they went to the journal."""
+    storage = get_storage_for_path(filepath)
+    if storage.supports_append:
+        storage.append(entries, filepath)
+        return False
+    append_many_to_journal(entries, filepath)
+    return True
+
+@timed('read_ledger_range')
+def read_ledger_range(filepath, start=None, end=None):
+    """Like read_ledger, but only the rows with start <= Date <= end."""
+    storage = get_storage_for_path(filepath)
+    with data_lock:
+        df = storage.read_range(filepath, start, end)
+        journal = load_journal(filepath)
+    return merge_frames(df, journal[_in_range(journal, start, end)])
+
+# ========== COMPACTION ==========
+
+def _replace_keeping_cache(src, dst, filepath, remove=None):
+    """Move src over dst (and delete remove) without invalidating a fresh cached copy.
+
+    Compaction only reshuffles files, the ledger content stays the same.
+    """
+    key = str(filepath)
+    old_signature = get_data_signature(filepath)
+    cache_fresh = dataset_cache.peek(key, old_signature) is not None
+    os.replace(src, dst)
+    if remove is not None:
+        remove.unlink()
+    new_signature = get_data_signature(filepath)
+    if cache_fresh:
+        dataset_cache.touch(key, new_signature)
+    for listener in _reshuffle_listeners:
+        listener(filepath, old_signature, new_signature)
+
+def on_files_reshuffled(listener):
+    """Register a callback for compaction, which changes file signatures but not content."""
+    if listener not in _reshuffle_listeners:
+        _reshuffle_listeners.append(listener)
+
+def _file_stat(path):
+    try:
+        stat = Path(path).stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def compact_journal(filepath=None):
+    """Fold the journal back into the data file and remove it. Returns the number of rows folded.
+
+    Only one process compacts at a time; if another one already is, this returns None.
+    """
+    filepath = Path(filepath or get_storage_filepath())
+    if not _compaction_lock.acquire(blocking=False):
+        return None
+    try:
+        with timed('compact_journal'):
+            return _compact(filepath)
+    finally:
+        _compaction_lock.release()
+
+def _compact(filepath):
+    journal_path = get_journal_filepath(filepath)
+    pending_path = _get_pending_filepath(filepath)
+
+    # Move the live journal aside so new inserts keep appending while we rewrite
+    with data_lock:
+        if journal_path.exists() and not pending_path.exists():
+            _replace_keeping_cache(journal_path, pending_path, filepath)
+        if not pending_path.exists():
+            return 0
+        pending = _read_journal_file(pending_path)
+
+    storage = get_storage_for_path(filepath)
+    while True:
+        # The slow read and rewrite run outside the lock; the swap below checks that the
+        # data file is still the version that was read
+        data_stat = _file_stat(filepath)
+        try:
+            df = read_data_file(filepath)
+        except FileNotFoundError:
+            df = empty_frame()
+        tmp_path = _tmp_path(filepath)
+        storage.write(merge_frames(df, pending), tmp_path)
+
+        with data_lock:
+            if not pending_path.exists():
+                # The data was restored or deleted meanwhile, along with the journal
+                tmp_path.unlink()
+                return 0
+            if _file_stat(filepath) != data_stat:
+                # Another process rewrote the data file: merge into its latest version
+                tmp_path.unlink()
+                continue
+            _replace_keeping_cache(tmp_path, filepath, filepath, remove=pending_path)
+            break
+
+    count('journal_rows_compacted', len(pending))
+    print(f"✅ Compacted {len(pending)} journal entries into {filepath.name}")
+    return len(pending)
+
+def start_background_compaction(filepath=None):
+    """Run compact_journal on a daemon thread unless one is already running."""
+    global _compaction_thread
+    if _compaction_thread is not None and _compaction_thread.is_alive():
+        return _compaction_thread
+    _compaction_thread = threading.Thread(target=compact_journal, args=(filepath,), daemon=True)
+    _compaction_thread.start()
+    return _compaction_thread
+
+def wait_for_compaction():
+    """Block until a running background compaction has finished."""
+    if _compaction_thread is not None:
+        _compaction_thread.join()
+
+# ========== IMPORT / EXPORT ==========
+
+def export_data(target_path, filepath=None):
+    """Write the full ledger (data file plus journal) to target_path in the format of its extension."""
+    filepath = Path(filepath or get_storage_filepath())
+    df = read_ledger(filepath)
+    write_data_file(df, target_path)
+    return len(df)
+
+def migrate_data(source_path, filepath=None):
+    """Convert an existing data file (e.g. the old Excel workbook) into the configured backend.
+
+    The source file is renamed to <name>_pre_migration<suffix> so it is not migrated twice.
+    Journal rows are folded into the migrated file and the journal removed: a backend that
+    appends natively never compacts, so a journal left behind would be merged into every read.
+    """
+    source_path = Path(source_path)
+    filepath = Path(filepath or get_storage_filepath())
+    if source_path.resolve() == filepath.resolve():
+        return 0
+
+    with data_lock:
+        if not source_path.exists():
+            return 0  # another process migrated it first
+        df = sort_by_date(read_data_file(source_path))
+        if filepath.exists():
+            df = merge_frames(read_data_file(filepath), df)
+        journal_owners = [source_path]
+        if get_journal_filepath(filepath) != get_journal_filepath(source_path):
+            journal_owners.append(filepath)  # both files share one journal unless their names differ
+        for owner in journal_owners:
+            df = merge_frames(df, load_journal(owner))
+        write_data_file(df, filepath)
+
+        for owner in journal_owners:
+            # A compaction still running finds its pending file gone and drops its rewrite
+            for path in (_get_pending_filepath(owner), get_journal_filepath(owner)):
+                path.unlink(missing_ok=True)
+        os.replace(source_path, source_path.with_name(f"{source_path.stem}_pre_migration{source_path.suffix}"))
+    print(f"✅ Migrated {len(df)} expenses from {source_path.name} to {filepath.name}")
+    return len(df)
+
+def find_legacy_filepath(filepath=None):
+    """Return a data file written by a different backend than the configured one, if any."""
+    filepath = Path(filepath or get_storage_filepath())
+    for backend in BACKENDS.values():
+        candidate = filepath.with_suffix(backend.suffix)
+        if candidate != filepath and candidate.exists():
+            return candidate
+    return None
@@ -1,17 +1,29 @@
-import pandas as pd
+import sys
+from app.instrument import instrumentation, timed
+from app.startup import startup_profile
+
+if __name__ == "__main__":
+    startup_profile.enable_from_argv()
+    instrumentation.enable_from_argv()
+
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 from datetime import datetime
-from app.expense_utils import load_data, save_expense_entry
-from visuals.plot_utils import plot_monthly_spending, plot_spending_per_category, plot_cumulative_spending
-from tools.manual_backup import create_manual_backup
-from tools.delete_data import delete_main_expense_tracker
+from app.background import SaveCoalescer, TkWorker
+from app.autocomplete import NotesIndex
+
+# pandas, matplotlib and the data layer are imported where they are first used (mostly
+# on the background worker) so the window shows up without waiting for them.
 
 class AutocompleteDropdown:
-    def __init__(self, entry, suggestions):
+    DEBOUNCE_MS = 120
+
+    def __init__(self, entry, notes_index, get_category):
         self.entry = entry
-        self.suggestions = suggestions
+        self.notes_index = notes_index
+        self.get_category = get_category
         self.listbox = None
+        self._pending = None
         self.entry.bind("<KeyRelease>", self.on_keyrelease)
 
     def on_keyrelease(self, event):
@@ -20,12 +32,19 @@ class AutocompleteDropdown:
                 self.navigate_listbox(event)
             return
 
+        # Wait for a pause in typing before looking up suggestions
+        if self._pending is not None:
+            self.entry.after_cancel(self._pending)
+        self._pending = self.entry.after(self.DEBOUNCE_MS, self.update_suggestions)
+
+    def update_suggestions(self):
+        self._pending = None
         typed = self.entry.get()
         if typed == "":
             self.hide_dropdown()
             return
 
-        matches = [s for s in self.suggestions if s.lower().startswith(typed.lower())]
+        matches = self.notes_index.lookup(self.get_category(), typed)
         if matches:
             self.show_dropdown(matches)
         else:
@@ -83,10 +102,177 @@ class AutocompleteDropdown:
         elif event.keysym == "Escape":
             self.hide_dropdown()
 
+class VirtualTable:
+    """Treeview over a DataFrame that only holds the visible rows plus a small buffer.
+
+    The scrollbar tracks a position in the backing data, and scrolling refills the
+    existing Treeview items with the next page of rows. Sorting and filtering work on
+    the DataFrame, never on Treeview items.
+    """
+    BUFFER_ROWS = 5
+    FILTER_DELAY_MS = 200
+
+    def __init__(self, master, df, row_height=25):
+        import numpy as np
+        self.df = df.reset_index(drop=True)
+        self.row_height = row_height
+        self.offset = 0
+        self.items = []
+        self.on_change = None
+
+        self.order = np.arange(len(self.df))          # natural or sorted row positions
+        self.mask = np.ones(len(self.df), dtype=bool)  # rows passing the filter
+        self.search_mask = self.mask                   # rows whose notes match the search
+        self.rows = self.order
+        self.sort_column = None
+        self.sort_descending = False
+        self._haystack = None
+        self._pending_filter = None
+
+        self.vsb = ttk.Scrollbar(master, orient="vertical", command=self.on_scrollbar)
+        hsb = ttk.Scrollbar(master, orient="horizontal")
+        self.tree = ttk.Treeview(master, xscrollcommand=hsb.set, show="headings",
+                                 columns=list(self.df.columns))
+        self.vsb.pack(side="right", fill="y")
+        hsb.pack(side="bottom", fill="x")
+        self.tree.pack(expand=True, fill="both")
+        hsb.config(command=self.tree.xview)
+
+        for col in self.df.columns:
+            self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
+            self.tree.column(col, anchor="center", width=100)
+
+        self.tree.bind("<Configure>", lambda e: self.render())
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.visible_rows()))
+        self.tree.bind("<Next>", lambda e: self.scroll(self.visible_rows()))
+
+    # ---------- Scrolling ----------
+
+    def row_count(self):
+        return len(self.rows)
+
+    def visible_rows(self):
+        height = self.tree.winfo_height()
+        if height <= 1:
+            height = int(self.tree.cget("height")) * self.row_height
+        # Leave room for the heading row
+        return max(1, height // self.row_height - 1)
+
+    def max_offset(self):
+        return max(0, self.row_count() - self.visible_rows())
+
+    def scroll(self, rows):
+        self.offset += rows
+        self.render()
+
+    def scroll_to_end(self):
+        self.offset = self.max_offset()
+        self.render()
+
+    def on_mousewheel(self, event):
+        if event.delta:
+            self.scroll(-3 if event.delta > 0 else 3)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.offset = int(float(amount) * self.row_count())
+        elif unit == "pages":
+            self.offset += int(amount) * self.visible_rows()
+        else:
+            self.offset += int(amount)
+        self.render()
+
+    def render(self):
+        """Fill the Treeview items with the rows of the current page."""
+        import pandas as pd
+        from app.schema import decimal_view
+        from app.storage import dates_as_text
+        visible = self.visible_rows()
+        self.offset = min(max(self.offset, 0), self.max_offset())
+        positions = self.rows[self.offset:self.offset + visible + self.BUFFER_ROWS]
+        page = dates_as_text(decimal_view(self.df.iloc[positions])) if len(positions) else self.df.iloc[:0]
+
+        # Reuse the existing items; only create or drop the difference
+        while len(self.items) < len(page):
+            self.items.append(self.tree.insert("", tk.END))
+        while len(self.items) > len(page):
+            self.tree.delete(self.items.pop())
+        for item, values in zip(self.items, page.itertuples(index=False)):
+            self.tree.item(item, values=["" if pd.isna(v) else v for v in values])
+
+        total = self.row_count()
+        if total:
+            self.vsb.set(self.offset / total, min(1.0, (self.offset + visible) / total))
+        else:
+            self.vsb.set(0, 1)
+        if self.on_change:
+            self.on_change()
+
+    # ---------- Sorting and filtering ----------
+
+    @timed('gui.sort')
+    def sort_by(self, column):
+        """Sort the backing data by column; clicking the same heading again reverses it."""
+        self.sort_descending = (column == self.sort_column) and not self.sort_descending
+        self.sort_column = column
+        from app.schema import as_text
+        # Categories and notes sort by name, not by their categorical order
+        sorted_df = self.df.sort_values(column, ascending=not self.sort_descending,
+                                        kind="stable", na_position="last", key=as_text)
+        self.order = sorted_df.index.to_numpy()
+
+        arrow = " ▼" if self.sort_descending else " ▲"
+        for col in self.df.columns:
+            self.tree.heading(col, text=col + (arrow if col == column else ""))
+        self.apply()
+
+    def set_filter_later(self, text):
+        if self._pending_filter is not None:
+            self.tree.after_cancel(self._pending_filter)
+        self._pending_filter = self.tree.after(self.FILTER_DELAY_MS, lambda: self.set_filter(text))
+
+    @timed('gui.filter')
+    def set_filter(self, text):
+        """Keep only rows whose date, category or notes contain text (case-insensitive)."""
+        import numpy as np
+        from app.storage import dates_as_text
+        self._pending_filter = None
+        text = text.strip().lower()
+        if not text:
+            self.mask = np.ones(len(self.df), dtype=bool)
+        else:
+            if self._haystack is None:
+                shown = dates_as_text(self.df[["Date", "Category", "Notes"]]).astype(object).fillna("").astype(str)
+                self._haystack = (shown["Date"] + " " + shown["Category"] + " " + shown["Notes"]).str.lower()
+            self.mask = self._haystack.str.contains(text, regex=False).to_numpy()
+        self.apply()
+
+    @timed('gui.search')
+    def set_note_matches(self, notes):
+        """Keep only rows whose note is one of notes (found by the search index); None keeps every row."""
+        import numpy as np
+        if notes is None:
+            self.search_mask = np.ones(len(self.df), dtype=bool)
+        else:
+            # Notes is categorical, so this compares codes rather than strings
+            self.search_mask = self.df["Notes"].isin(notes).to_numpy()
+        self.apply()
+
+    def apply(self):
+        self.rows = self.order[(self.mask & self.search_mask)[self.order]]
+        self.offset = 0
+        self.render()
+
+# How often the status bar picks up the latency of the last operation
+LATENCY_REFRESH_MS = 250
+
 def launch_gui():
     root = tk.Tk()
     root.title("Expense Tracker")
-    window_width, window_height = 825, 350
+    window_width, window_height = 825, 375
     x = (root.winfo_screenwidth() // 2) - (window_width // 2)
     y = (root.winfo_screenheight() // 2) - (window_height // 2) - 75
     root.geometry(f"{window_width}x{window_height}+{x}+{y}")
@@ -98,6 +284,45 @@ def launch_gui():
     root.columnconfigure(0, weight=1)
     root.rowconfigure(0, weight=1)
 
+    # STATUS BAR: progress of background loads and saves
+    status_bar = tk.Frame(root, bd=1, relief="sunken")
+    status_bar.pack(side="bottom", fill="x")
+    status_label = tk.Label(status_bar, text="Ready", font=LABEL_FONT, anchor="w")
+    status_label.pack(side="left", padx=5)
+    progress = ttk.Progressbar(status_bar, mode="indeterminate", length=120)
+    progress.pack(side="right", padx=5, pady=2)
+    latency_label = tk.Label(status_bar, font=LABEL_FONT, anchor="e", fg="gray30")
+    latency_label.pack(side="right", padx=5)
+    last_message = {"text": "Ready"}
+    shown_latency = {"sequence": None}
+
+    def show_latency():
+        # Latency of the last timed operation (a background job, a plot, a sort...)
+        last = instrumentation.last()
+        if last is not None and last[0] != shown_latency["sequence"]:
+            sequence, name, seconds, args = last
+            shown_latency["sequence"] = sequence
+            latency_label.config(text=f"⏱️ {args.get('label', name)}: {seconds * 1000:.0f} ms")
+        root.after(LATENCY_REFRESH_MS, show_latency)
+
+    def set_message(text):
+        last_message["text"] = text
+        if not worker.is_busy():
+            status_label.config(text=text)
+
+    def on_status(label):
+        if label:
+            status_label.config(text=f"⏳ {label}...")
+            progress.start(10)
+        else:
+            status_label.config(text=last_message["text"])
+            progress.stop()
+
+    def show_error(message, error):
+        messagebox.showerror("Error", f"❌ {message}\n\n{str(error)}", parent=root)
+
+    worker = TkWorker(root, max_workers=1, on_status=on_status)
+
     container = tk.Frame(root)
     container.pack(expand=True, fill="both")
     for i in range(3):
@@ -108,28 +333,44 @@ def launch_gui():
     visualize_panel.grid(row=0, column=0, padx=20, sticky="nsew")
     tk.Label(visualize_panel, text="📊 Visualize Data", font=HEADER_FONT).pack(pady=10)
 
+    def load_rollups():
+        from app.expense_utils import get_rollups
+        return get_rollups()
+
+    def plot_in_background(label, plot, error_message):
+        # Load/refresh the rollups off the Tk thread; matplotlib must be imported and draw on it
+        def draw(_):
+            try:
+                import visuals.plot_utils as plot_utils
+                plot(plot_utils)
+            except Exception as e: show_error(error_message, e)
+        worker.submit(label, load_rollups, on_done=draw, on_error=lambda e: show_error(error_message, e))
+
     def show_monthly():
-        try:
-            year = simpledialog.askinteger("Year", "Enter Year (e.g., 2025):", parent=root)
-            month = simpledialog.askinteger("Month", "Enter Month (1-12):", parent=root)
-            if None in (month, year): return
-            root.after(50, lambda: plot_monthly_spending(load_data()[0], month, year))
-        except Exception as e:
-            messagebox.showerror("Error", f"❌ Failed to plot monthly spending.\n\n{str(e)}", parent=root)
+        year = simpledialog.askinteger("Year", "Enter Year (e.g., 2025):", parent=root)
+        month = simpledialog.askinteger("Month", "Enter Month (1-12):", parent=root)
+        if None in (month, year): return
+        plot_in_background("Loading monthly spending", lambda p: p.plot_monthly_spending(None, month, year),
+                           "Failed to plot monthly spending.")
 
     def show_category():
-        try: plot_spending_per_category(load_data()[0])
-        except Exception as e:
-            messagebox.showerror("Error", f"❌ Failed to plot category spending.\n\n{str(e)}", parent=root)
+        plot_in_background("Loading category spending", lambda p: p.plot_spending_per_category(),
+                           "Failed to plot category spending.")
 
     def show_cumulative():
-        try: plot_cumulative_spending(load_data()[0])
-        except Exception as e:
-            messagebox.showerror("Error", f"❌ Failed to plot cumulative spending.\n\n{str(e)}", parent=root)
+        plot_in_background("Loading cumulative spending", lambda p: p.plot_cumulative_spending(),
+                           "Failed to plot cumulative spending.")
+
+    def load_ledger():
+        from app.expense_utils import load_data
+        return load_data()[0]
 
     def view_data():
+        worker.submit("Loading data", load_ledger, on_done=open_data_window,
+                      on_error=lambda e: show_error("Failed to load data.", e))
+
+    def open_data_window(df):
         try:
-            df, _ = load_data()
             if df.empty:
                 messagebox.showinfo("Info", "No data available.", parent=root)
                 return
@@ -142,33 +383,51 @@ def launch_gui():
             style.configure("Treeview", rowheight=25)
             style.configure("Treeview.Heading", font=("Segoe UI", 10, "bold"))
 
+            filter_bar = tk.Frame(win, padx=5, pady=5)
+            filter_bar.pack(fill="x")
+            tk.Label(filter_bar, text="Filter:", font=LABEL_FONT).pack(side="left")
+            filter_entry = tk.Entry(filter_bar)
+            filter_entry.pack(side="left", fill="x", expand=True, padx=5)
+            tk.Label(filter_bar, text="Search notes:", font=LABEL_FONT).pack(side="left")
+            search_entry = tk.Entry(filter_bar)
+            search_entry.pack(side="left", fill="x", expand=True, padx=5)
+            count_label = tk.Label(filter_bar, font=LABEL_FONT)
+            count_label.pack(side="right")
+
             frame = tk.Frame(win)
             frame.pack(expand=True, fill="both")
 
-            vsb = ttk.Scrollbar(frame, orient="vertical")
-            hsb = ttk.Scrollbar(frame, orient="horizontal")
-            tree = ttk.Treeview(frame, yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+            table = VirtualTable(frame, df, row_height=25)
+            table.on_change = lambda: count_label.config(text=f"{table.row_count()} of {len(df)} rows")
+            table.scroll_to_end()
 
-            vsb.pack(side="right", fill="y")
-            hsb.pack(side="bottom", fill="x")
-            tree.pack(expand=True, fill="both")
-            vsb.config(command=tree.yview)
-            hsb.config(command=tree.xview)
+            filter_entry.bind("<KeyRelease>", lambda e: table.set_filter_later(filter_entry.get()))
 
-            tree["columns"] = list(df.columns)
-            tree["show"] = "headings"
+            # Every word typed must start a word of the note; answered by the notes search index
+            pending_search = {"id": None}
 
-            for col in df.columns:
-                tree.heading(col, text=col)
-                tree.column(col, anchor="center", width=100)
+            def find_notes(text):
+                from app.expense_utils import search_notes
+                return search_notes(text) if text.strip() else None
 
-            for _, row in df.iterrows():
-                tree.insert("", tk.END, values=list(row))
+            def show_matches(notes):
+                if win.winfo_exists():
+                    table.set_note_matches(notes)
 
-            tree.see(tree.get_children()[-1])
+            def run_search():
+                pending_search["id"] = None
+                worker.submit("Searching notes", find_notes, search_entry.get(), on_done=show_matches,
+                              on_error=lambda e: show_error("Search failed.", e))
+
+            def search_later(event):
+                if pending_search["id"] is not None:
+                    win.after_cancel(pending_search["id"])
+                pending_search["id"] = win.after(VirtualTable.FILTER_DELAY_MS, run_search)
+
+            search_entry.bind("<KeyRelease>", search_later)
 
         except Exception as e:
-            messagebox.showerror("Error", f"❌ Failed to load data.\n\n{str(e)}", parent=root)
+            show_error("Failed to load data.", e)
 
     for label, func in [
         ("Monthly Spending", show_monthly),
@@ -205,9 +464,46 @@ def launch_gui():
     notes_entry = tk.Entry(insert_panel)
     notes_entry.pack(pady=2, fill="x")
 
-    df, _ = load_data()
-    restaurant_notes = df[df["Category"] == "Restaurant"]["Notes"].dropna().unique().tolist()
-    AutocompleteDropdown(notes_entry, restaurant_notes)
+    # Autocomplete starts empty and is filled from the ledger by the worker, which also
+    # warms the dataset cache for View Data. Notes typed in the meantime are replayed.
+    notes_index = NotesIndex()
+    early_notes = []
+    autocomplete = AutocompleteDropdown(notes_entry, notes_index, category_combo.get)
+    category_combo.bind("<<ComboboxSelected>>", lambda e: autocomplete.hide_dropdown())
+
+    # Early entries already written. Loads and saves share the worker, so those saved
+    # before the ledger load are in the index and must not be counted twice.
+    saved_early = set()
+
+    def build_notes_index():
+        with startup_profile.step("load ledger"):
+            df = load_ledger()
+        with startup_profile.step("build autocomplete index"):
+            return NotesIndex.from_frame(df), frozenset(saved_early)
+
+    def on_notes_index(result):
+        nonlocal notes_index, early_notes
+        index, already_loaded = result
+        for entry in early_notes:
+            if id(entry) not in already_loaded:
+                index.add(entry["Category"], entry["Notes"])
+        notes_index, early_notes = index, None
+        saved_early.clear()
+        autocomplete.notes_index = index
+        startup_profile.mark("autocomplete ready")
+
+
+    def save_batch(entries):
+        from app.expense_utils import ensure_data_file, save_expense_entries
+        save_expense_entries(None, entries, ensure_data_file())
+        if early_notes is not None:
+            saved_early.update(map(id, entries))
+
+    def on_saved(batch):
+        set_message(f"✅ Saved {len(batch)} expense{'s' if len(batch) != 1 else ''} at {datetime.now():%H:%M:%S}")
+
+    saver = SaveCoalescer(root, worker, save_batch, on_saved=on_saved,
+                          on_error=lambda e: show_error("Failed to save expenses. They will be retried with the next save.", e))
 
     def submit_expense():
         date_str = date_entry.get().strip()
@@ -216,7 +512,7 @@ def launch_gui():
         notes = notes_entry.get().strip()
 
         try:
-            pd.to_datetime(date_str, format='%d/%m/%Y')
+            date = datetime.strptime(date_str, '%d/%m/%Y')
         except ValueError:
             messagebox.showerror("Invalid Input", "❌ Date format must be DD/MM/YYYY.", parent=root)
             return
@@ -227,16 +523,19 @@ def launch_gui():
             messagebox.showerror("Invalid Input", "❌ Amount must be a number.", parent=root)
             return
 
-        df, filepath = load_data()
         entry = {
-            "Date": pd.to_datetime(date_str, format='%d/%m/%Y').strftime('%Y/%m/%d'),
+            "Date": date.strftime('%Y/%m/%d'),
             "Category": category,
             "Amount": amount,
             "Notes": notes
         }
 
-        save_expense_entry(df, entry, filepath)
-        messagebox.showinfo("Success", "✅ Expense entry saved!", parent=root)
+        # Bursts of submissions are written together by the background worker
+        saver.add(entry)
+        if early_notes is not None:
+            early_notes.append(entry)
+        notes_index.add(category, notes)
+        set_message(f"📝 Queued {category} expense of {amount:.2f} USD")
 
         date_entry.delete(0, tk.END)
         amount_entry.delete(0, tk.END)
@@ -250,14 +549,48 @@ def launch_gui():
     tools_panel.grid(row=0, column=2, padx=20, sticky="nsew")
     tk.Label(tools_panel, text="🔧 Additional Tools", font=HEADER_FONT).pack(pady=10)
 
+    def run_backup():
+        from tools.manual_backup import create_manual_backup
+        create_manual_backup()
+
+    def run_delete():
+        from tools.delete_data import delete_main_expense_tracker
+        delete_main_expense_tracker()
+
+    def create_backup():
+        saver.flush()  # queued expenses are submitted first and the worker runs one job at a time
+        worker.submit("Creating backup", run_backup,
+                      on_done=lambda _: messagebox.showinfo("Backup", "✅ Backup created!", parent=root),
+                      on_error=lambda e: show_error("Failed to create backup.", e))
+
+    def delete_data():
+        if not messagebox.askyesno("⚠️ Confirm", "Delete all expense data?", parent=root):
+            return
+        saver.flush()
+        worker.submit("Deleting data", run_delete,
+                      on_done=lambda _: set_message("🗑️ Data deleted"),
+                      on_error=lambda e: show_error("Failed to delete data.", e))
+
     for label, func in [
-        ("Create Backup", lambda: (create_manual_backup(), messagebox.showinfo("Backup", "✅ Backup created!", parent=root))),
-        ("Delete Data", lambda: delete_main_expense_tracker() if messagebox.askyesno("⚠️ Confirm", "Delete Excel file?", parent=root) else None),
+        ("Create Backup", create_backup),
+        ("Delete Data", delete_data),
         ("Exit", root.quit)
     ]:
         tk.Button(tools_panel, text=label, font=BUTTON_FONT, command=func).pack(pady=5, fill="x")
 
+    def on_window_shown():
+        startup_profile.mark("window shown")
+        worker.submit("Loading autocomplete", build_notes_index, on_done=on_notes_index,
+                      on_error=lambda e: show_error("Failed to load data.", e))
+
+    root.after_idle(on_window_shown)
+    root.after(LATENCY_REFRESH_MS, show_latency)
     root.mainloop()
+    saver.flush_now()
+    # Compaction only ever starts once the storage module has been used
+    if 'app.storage' in sys.modules:
+        from app.storage import wait_for_compaction
+        wait_for_compaction()
 
 if __name__ == "__main__":
     launch_gui()
\ No newline at end of file
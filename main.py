@@ -1,15 +1,39 @@
-from app.expense_utils import get_expense_details, save_expense_entry, load_data
-from visuals.visualize import main as visualize_menu
-from tools.manual_backup import create_manual_backup
-from tools.delete_data import delete_main_expense_tracker
+import sys
+from app.instrument import instrumentation
+from app.startup import startup_profile
+
+# pandas and matplotlib take most of a second to import, so they are only loaded
+# by the menu option that needs them.
 
 def insert_new_expense():
     """Handles inserting a new expense into the dataset."""
-    df, filepath = load_data()
+    from app.expense_utils import ensure_data_file, get_expense_details, save_expense_entry
     new_expense = get_expense_details()
-    save_expense_entry(df, new_expense, filepath)
+    if new_expense in (None, 'exit'):
+        return
+    # Saving only appends, so the ledger itself doesn't need to be loaded
+    save_expense_entry(None, new_expense, ensure_data_file())
+
+def visualize_menu():
+    from visuals.visualize import main
+    main()
+
+def create_manual_backup():
+    from tools.manual_backup import create_manual_backup
+    create_manual_backup()
+
+def delete_main_expense_tracker():
+    from tools.delete_data import delete_main_expense_tracker
+    delete_main_expense_tracker()
+
+def exit_tracker():
+    # Compaction only ever starts once the storage module has been used
+    if 'app.storage' in sys.modules:
+        from app.storage import wait_for_compaction
+        wait_for_compaction()
 
 def main():
+    startup_profile.mark("menu shown")
     while True:
         print("\n📋 Welcome to Expense Tracker")
         print("1. Add a New Expense")
@@ -30,9 +54,16 @@ def main():
             delete_main_expense_tracker()
         elif choice == '5':
             print("👋 Goodbye!")
+            exit_tracker()
             break
         else:
             print("❌ Invalid choice. Please select a valid option.")
 
 if __name__ == "__main__":
+    startup_profile.enable_from_argv()
+    instrumentation.enable_from_argv()
+    if len(sys.argv) > 1:
+        # `python main.py <command> ...` runs one batch command instead of the menu
+        from app.cli import run
+        sys.exit(run())
     main()
\ No newline at end of file
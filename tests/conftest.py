@@ -0,0 +1,21 @@
+import pytest
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """An empty data directory used by every part of the app for the length of a test."""
+    from app import rollups
+    from app.cache import dataset_cache
+
+    monkeypatch.setenv('EXPENSE_TRACKER_DATA_DIR', str(tmp_path))
+    # Process-wide state would otherwise carry one test's ledger into the next
+    dataset_cache.invalidate()
+    rollups._loaded.clear()
+    yield tmp_path
+    dataset_cache.invalidate()
+    rollups._loaded.clear()
+
+@pytest.fixture
+def backend(data_dir, monkeypatch, request):
+    """Use the storage backend named by the test's parameter."""
+    monkeypatch.setenv('EXPENSE_TRACKER_STORAGE_BACKEND', request.param)
+    return request.param
@@ -0,0 +1,13 @@
+from app.autocomplete import NotesIndex
+
+def test_lookup_ranks_by_use_then_recency():
+    index = NotesIndex(limit=2)
+    for note in ['Coffee', 'Cola', 'Coffee', 'Cookies']:
+        index.add('Snacks', note)
+    assert index.lookup('Snacks', 'co') == ['Coffee', 'Cookies']
+    assert index.lookup('Groceries', 'co') == []
+
+def test_lookup_finds_notes_beyond_the_basic_plane():
+    index = NotesIndex()
+    index.add('Snacks', 'Coffee \U0001F600')
+    assert index.lookup('Snacks', 'coffee ') == ['Coffee \U0001F600']
@@ -0,0 +1,62 @@
+import threading
+
+from app.background import SaveCoalescer, TkWorker
+
+class FakeRoot:
+    """Just enough of a Tk root: after() callbacks run when run_pending() is called."""
+
+    def __init__(self):
+        self.callbacks = {}
+        self.next_id = 0
+
+    def after(self, ms, func):
+        self.next_id += 1
+        self.callbacks[self.next_id] = func
+        return self.next_id
+
+    def after_cancel(self, timer):
+        self.callbacks.pop(timer, None)
+
+    def run_pending(self):
+        callbacks, self.callbacks = self.callbacks, {}
+        for func in callbacks.values():
+            func()
+
+def test_flush_during_a_save_is_ordered_before_later_jobs():
+    root = FakeRoot()
+    worker = TkWorker(root, max_workers=1)
+    release = threading.Event()
+    saved = []
+
+    def save_batch(batch):
+        release.wait(5)
+        saved.extend(batch)
+
+    saver = SaveCoalescer(root, worker, save_batch)
+    saver.add('a')
+    saver.flush()
+    saver.add('b')  # arrives while 'a' is being saved
+    saver.flush()
+    backup = worker.submit("Creating backup", lambda: list(saved))
+    release.set()
+    assert backup.result(5) == ['a', 'b']
+    worker.shutdown()
+
+def test_flush_now_retries_a_batch_that_failed_after_the_main_loop():
+    root = FakeRoot()
+    worker = TkWorker(root, max_workers=1)
+    saved = []
+    failures = ['disk full']
+
+    def save_batch(batch):
+        if failures:
+            raise OSError(failures.pop())
+        saved.extend(batch)
+
+    saver = SaveCoalescer(root, worker, save_batch)
+    saver.add('a')
+    saver.flush()
+    saver.add('b')
+    # The main loop has stopped: the worker's callbacks are never polled
+    saver.flush_now()
+    assert saved == ['a', 'b']
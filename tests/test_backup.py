@@ -0,0 +1,51 @@
+import warnings
+
+import pandas as pd
+import pytest
+
+from app.cache import dataset_cache
+from app.expense_utils import ensure_data_file, save_expense_entries
+from app.storage import PartitionedStorage, read_ledger
+from tools import manual_backup
+from tools.manual_backup import create_manual_backup, get_backup_store
+
+def expense(date, amount, notes=None):
+    return {'Date': date, 'Category': 'Snacks', 'Amount': amount, 'Notes': notes}
+
+def test_snapshot_with_a_month_without_notes_loads_cleanly(data_dir):
+    save_expense_entries(None, [expense('2024/01/03', 1.0), expense('2024/02/03', 2.0, 'Gum')], ensure_data_file())
+    manifest = create_manual_backup(prune=False)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        df = get_backup_store().load(manifest)
+    assert df['Notes'].tolist()[1] == 'Gum'
+    assert pd.isna(df['Notes'].iloc[0])
+
+@pytest.mark.parametrize('backend', ['partitioned', 'parquet'], indirect=True)
+def test_incremental_backup_reads_only_the_changed_months(backend, monkeypatch):
+    filepath = ensure_data_file()
+    save_expense_entries(None, [expense('2024/01/03', 1.0, 'Gum'), expense('2024/02/03', 2.0, 'Tea')], filepath)
+    create_manual_backup(prune=False)
+
+    save_expense_entries(None, [expense('2024/02/10', 3.5, 'Cake')], filepath)
+    dataset_cache.invalidate()
+
+    def full_load(filepath):
+        raise AssertionError("the whole ledger was loaded")
+
+    read_months = []
+    read_partitions = PartitionedStorage._read_partitions
+
+    def spy(self, path, months=None):
+        read_months.append(months)
+        return read_partitions(self, path, months)
+
+    monkeypatch.setattr(manual_backup, '_get_cached_ledger', full_load)
+    monkeypatch.setattr(PartitionedStorage, '_read_partitions', spy)
+    manifest = create_manual_backup(prune=False)
+
+    assert manifest['rows'] == 3
+    assert manifest['total'] == 6.5
+    assert all(months == ['2024-02'] for months in read_months)
+    pd.testing.assert_frame_equal(get_backup_store().load(manifest), read_ledger(filepath), check_categorical=False)
@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from app.cache import dataset_cache
+from app.expense_utils import _get_cached_ledger, ensure_data_file, load_data, save_expense_entries
+from app.storage import append_many_to_journal, write_data_file
+
+def ledger(notes):
+    return pd.DataFrame({
+        'Date': ['2024/01/03', '2024/01/15'],
+        'Category': ['Groceries', 'Snacks'],
+        'Amount': [10.5, 2.25],
+        'Notes': notes,
+    })
+
+@pytest.fixture
+def filepath(data_dir):
+    filepath = ensure_data_file()
+    write_data_file(ledger(['Milk', 'Gum']), filepath)
+    return filepath
+
+def test_repeated_reads_are_hits(filepath):
+    before = dataset_cache.stats()
+    df, _ = load_data()
+    again, _ = load_data()
+    after = dataset_cache.stats()
+    assert again.equals(df)
+    assert after['misses'] == before['misses'] + 1
+    assert after['hits'] == before['hits'] + 1
+
+def test_a_file_rewritten_elsewhere_is_reloaded(filepath):
+    _get_cached_ledger(filepath)
+    reloads = dataset_cache.stats()['reloads']
+
+    # As another process would: straight to the file, bypassing the cache
+    write_data_file(ledger(['Bread', 'Chocolate bar']), filepath)
+    assert _get_cached_ledger(filepath)['Notes'].tolist() == ['Bread', 'Chocolate bar']
+    assert dataset_cache.stats()['reloads'] == reloads + 1
+
+@pytest.mark.parametrize('backend', ['excel'], indirect=True)
+def test_a_journal_append_elsewhere_is_reloaded(backend):
+    filepath = ensure_data_file()
+    write_data_file(ledger(['Milk', 'Gum']), filepath)
+    assert len(_get_cached_ledger(filepath)) == 2
+
+    append_many_to_journal([{'Date': '2024/02/01', 'Category': 'Phone', 'Amount': 5.0, 'Notes': 'Top-up'}], filepath)
+    assert _get_cached_ledger(filepath)['Notes'].tolist() == ['Milk', 'Gum', 'Top-up']
+
+def test_saves_in_this_process_keep_the_cache_warm(filepath):
+    _get_cached_ledger(filepath)
+    save_expense_entries(None, [{'Date': '2024/01/10', 'Category': 'Phone', 'Amount': 5.0, 'Notes': 'Top-up'}],
+                         filepath)
+    misses = dataset_cache.stats()['misses']
+    assert _get_cached_ledger(filepath)['Notes'].tolist() == ['Milk', 'Top-up', 'Gum']
+    assert dataset_cache.stats()['misses'] == misses
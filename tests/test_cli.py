@@ -0,0 +1,31 @@
+import io
+
+import pytest
+
+from app.cli import EXIT_INVALID_INPUT, EXIT_OK, EXIT_USAGE, run
+
+@pytest.mark.parametrize('argv', [
+    ['report', '--month', '2025-13'],
+    ['report', '--month', '2025-03', '--end', '2025-04-01'],
+    ['report', '--end', '2025-04-01', '--month', '2025-03'],
+    ['report', '--month', '2025-03', '--start', '2025-03-01'],
+])
+def test_bad_report_period_is_a_usage_error(data_dir, argv):
+    with pytest.raises(SystemExit) as exit_info:
+        run(argv)
+    assert exit_info.value.code == EXIT_USAGE
+
+def test_report_for_a_month(data_dir, capsys):
+    assert run(['add', '--date', '2025-03-04', '--category', 'Snacks', '--amount', '2.5']) == EXIT_OK
+    assert run(['report', '--month', '2025-03', '--format', 'json']) == EXIT_OK
+    assert '"sum":2.5' in capsys.readouterr().out
+
+def add_from_stdin(monkeypatch, text, *options):
+    monkeypatch.setattr('sys.stdin', io.StringIO(text))
+    return run(['add', '--from-stdin', *options])
+
+def test_skip_invalid_saves_the_valid_rows(data_dir, monkeypatch):
+    text = "Date,Category,Amount,Notes\n2025-03-01,Snacks,2,Gum\n2025-03-01,Nope,2,Gum\n"
+    assert add_from_stdin(monkeypatch, text) == EXIT_INVALID_INPUT
+    assert add_from_stdin(monkeypatch, text, '--skip-invalid') == EXIT_OK
+    assert add_from_stdin(monkeypatch, "Date,Category,Amount\n2025-03-01,Nope,2\n", '--skip-invalid') == EXIT_INVALID_INPUT
@@ -0,0 +1,26 @@
+import json
+import os
+
+from app import config
+
+def test_settings_file_is_reread_only_when_it_changes(data_dir, monkeypatch):
+    path = data_dir / config.SETTINGS_FILENAME
+    path.write_text(json.dumps({'backup_keep_latest': 3}), encoding='utf-8')
+    assert config.get_setting('backup_keep_latest') == 3
+
+    reads = []
+    real_open = open
+    monkeypatch.setattr('builtins.open', lambda *a, **kw: reads.append(a[0]) or real_open(*a, **kw))
+    assert config.get_setting('backup_keep_latest') == 3
+    assert reads == []
+
+    path.write_text(json.dumps({'backup_keep_latest': 7}), encoding='utf-8')
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert config.get_setting('backup_keep_latest') == 7
+
+def test_environment_overrides_settings_file(data_dir, monkeypatch):
+    (data_dir / config.SETTINGS_FILENAME).write_text(json.dumps({'storage_backend': 'excel'}), encoding='utf-8')
+    assert config.get_setting('storage_backend') == 'excel'
+    monkeypatch.setenv('EXPENSE_TRACKER_STORAGE_BACKEND', 'sqlite')
+    assert config.get_setting('storage_backend') == 'sqlite'
@@ -0,0 +1,51 @@
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+import pandas as pd
+import pytest
+from matplotlib.figure import Figure
+
+from visuals.downsample import ZoomResampler, lttb_indices, min_max_indices
+
+N = 10_000
+
+def series():
+    rng = np.random.default_rng(0)
+    return np.arange(N, dtype=float), rng.gamma(2.0, 10.0, N).cumsum()
+
+@pytest.mark.parametrize('points', [3, 10, 500])
+def test_lttb_keeps_the_endpoints(points):
+    x, y = series()
+    keep = lttb_indices(x, y, points)
+    assert len(keep) == points
+    assert keep[0] == 0 and keep[-1] == N - 1
+    assert (np.diff(keep) > 0).all()
+
+@pytest.mark.parametrize('points', [2, 10, 500])
+def test_min_max_keeps_the_endpoints_and_every_spike(points):
+    y = np.zeros(N)
+    y[1234], y[8765] = 500.0, -500.0
+    keep = min_max_indices(y, points)
+    assert len(keep) <= points + 2
+    assert keep[0] == 0 and keep[-1] == N - 1
+    assert {1234, 8765} <= set(keep.tolist())
+
+def test_short_series_are_kept_whole():
+    x, y = series()
+    assert lttb_indices(x[:50], y[:50], 100).tolist() == list(range(50))
+    assert min_max_indices(y[:50], 100).tolist() == list(range(50))
+
+def test_zooming_resamples_the_visible_range():
+    dates = pd.date_range('2000-01-01', periods=N, freq='D')
+    _, y = series()
+    fig = Figure()
+    ax = fig.subplots()
+    line = ZoomResampler(ax, dates, y, 200).plot()
+    assert len(line.get_xdata()) == 200
+
+    ax.set_xlim(dates[100], dates[199])
+    shown = pd.DatetimeIndex(line.get_xdata())
+    # Every point of the view plus one on each side
+    assert len(shown) == 102
+    assert shown[0] == dates[99] and shown[-1] == dates[200]
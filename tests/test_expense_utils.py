@@ -0,0 +1,39 @@
+import pandas as pd
+
+from app.expense_utils import insert_expense_sorted, insert_expenses_sorted
+from app.schema import apply_schema
+
+def ledger():
+    return apply_schema(pd.DataFrame({
+        'Date': pd.to_datetime(['2024-01-03', '2024-01-15', '2024-01-15', '2024-02-01']),
+        'Category': ['Groceries', 'Snacks', 'Snacks', 'Phone'],
+        'Amount': [10.5, 2.25, 3.0, 15.0],
+        'Notes': ['first', 'second', 'third', 'fourth'],
+    }))
+
+def expense(date, notes):
+    return {'Date': date, 'Category': 'Snacks', 'Amount': 1.0, 'Notes': notes}
+
+def test_equal_dates_keep_insertion_order():
+    df = insert_expense_sorted(ledger(), expense('2024/01/15', 'new'))
+    assert df['Notes'].tolist() == ['first', 'second', 'third', 'new', 'fourth']
+    df = insert_expense_sorted(df, expense('2024/01/15', 'newer'))
+    assert df['Notes'].tolist() == ['first', 'second', 'third', 'new', 'newer', 'fourth']
+    assert df['Date'].is_monotonic_increasing
+    assert df.index.tolist() == list(range(6))
+
+def test_inserts_at_either_end():
+    df = insert_expense_sorted(ledger(), expense('2023/12/31', 'before'))
+    df = insert_expense_sorted(df, expense('2024/03/01', 'after'))
+    assert df['Notes'].tolist() == ['before', 'first', 'second', 'third', 'fourth', 'after']
+    assert df['Amount'].dtype == 'Int64'
+
+def test_an_empty_ledger_takes_the_entry():
+    df = insert_expense_sorted(ledger().iloc[:0], expense('2024/01/15', 'only'))
+    assert df['Notes'].tolist() == ['only']
+    assert df['Date'].tolist() == [pd.Timestamp('2024-01-15')]
+
+def test_several_entries_go_after_existing_rows_of_their_date():
+    entries = [expense('2024/02/01', 'a'), expense('2024/01/15', 'b'), expense('2024/01/15', 'c')]
+    df = insert_expenses_sorted(ledger(), entries)
+    assert df['Notes'].tolist() == ['first', 'second', 'third', 'b', 'c', 'fourth', 'a']
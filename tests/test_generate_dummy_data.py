@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+from app.storage import get_storage, read_ledger
+from tools.generate_dummy_data import generate_dummy_data, iter_dummy_chunks
+
+def dummy(**options):
+    return pd.concat(iter_dummy_chunks(**options), ignore_index=True)
+
+def test_same_seed_same_ledger():
+    options = dict(rows=5_000, start='2024-01-01', end='2024-12-31', chunksize=1_000)
+    first = dummy(seed=7, **options)
+    pd.testing.assert_frame_equal(first, dummy(seed=7, **options))
+    assert not first.equals(dummy(seed=8, **options))
+
+def test_chunks_are_whole_days_in_date_order():
+    chunks = list(iter_dummy_chunks(rows=5_000, start='2024-01-01', end='2024-12-31', seed=1, chunksize=1_000))
+    assert sum(len(c) for c in chunks) == 5_000
+    assert len(chunks) > 1
+    df = pd.concat(chunks, ignore_index=True)
+    assert df['Date'].is_monotonic_increasing
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous['Date'].iloc[-1] < chunk['Date'].iloc[0]
+    assert (df['Amount'] >= 0.01).all()
+
+def test_options_shape_the_data():
+    df = dummy(rows=1_000, seed=3, category_weights={'Phone': 1, 'Barber': 1},
+               notes_vocabulary={'Phone': ['Bill']}, empty_notes_ratio=0.0)
+    assert set(df['Category']) == {'Phone', 'Barber'}
+    assert set(df.loc[df['Category'] == 'Phone', 'Notes']) == {'Bill'}
+    with pytest.raises(ValueError):
+        dummy(rows=10, category_weights={'Phone': 0})
+
+@pytest.mark.parametrize('backend', ['partitioned', 'sqlite'], indirect=True)
+def test_seeded_file_is_reproducible(backend, data_dir):
+    first, second = data_dir / 'first', data_dir / 'second'
+    first.mkdir()
+    second.mkdir()
+    suffix = get_storage().suffix
+    generate_dummy_data(500, output=first / f"dummy{suffix}", seed=11)
+    generate_dummy_data(500, output=second / f"dummy{suffix}", seed=11)
+    df = read_ledger(first / f"dummy{suffix}")
+    assert len(df) == 500
+    pd.testing.assert_frame_equal(df, read_ledger(second / f"dummy{suffix}"))
@@ -0,0 +1,64 @@
+import pandas as pd
+
+from app.expense_utils import ensure_data_file, import_expenses, save_expense_entries
+from app.importer import get_hash_index_filepath, map_statement_chunk
+from app.storage import read_ledger
+
+STATEMENT = """Date,Description,Amount,Type
+03/01/2024,Coffee,-2.50,DEBIT
+03/01/2024,Coffee,-2.50,DEBIT
+04/01/2024,Salary,1000.00,CREDIT
+05/01/2024,Supermarket,-40.10,DEBIT
+"""
+
+def write_statement(tmp_path, text=STATEMENT):
+    path = tmp_path / 'statement.csv'
+    path.write_text(text)
+    return path
+
+def test_reimport_skips_duplicates(data_dir):
+    path = write_statement(data_dir)
+
+    first = import_expenses(path, debits_negative=True)
+    assert first == {'read': 4, 'imported': 3, 'duplicates': 0, 'skipped': 1}
+    assert get_hash_index_filepath(ensure_data_file()).exists()
+
+    second = import_expenses(path, debits_negative=True)
+    assert second['imported'] == 0
+    assert second['duplicates'] == 3
+
+    df = read_ledger(ensure_data_file())
+    assert len(df) == 3
+    # Two coffees on the same day are two expenses, not a duplicate
+    assert (df['Notes'] == 'Coffee').sum() == 2
+    # The bank's Type column is not taken for the category
+    assert set(df['Category'].astype(str)) == {'Shopping'}
+
+def test_small_chunks_give_the_same_result(data_dir):
+    path = write_statement(data_dir, STATEMENT + "03/01/2024,Coffee,-2.50,DEBIT\n")
+
+    first = import_expenses(path, debits_negative=True, chunksize=1)
+    assert first == {'read': 5, 'imported': 4, 'duplicates': 0, 'skipped': 1}
+    # Repeats are counted across chunks, so the third coffee is not a duplicate of the first
+    assert import_expenses(path, debits_negative=True, chunksize=2)['duplicates'] == 4
+    assert import_expenses(path, debits_negative=True)['duplicates'] == 4
+
+def test_duplicates_of_expenses_added_by_hand(data_dir):
+    save_expense_entries(None, [{'Date': pd.Timestamp('2024-01-05'), 'Category': 'Groceries',
+                                 'Amount': 40.1, 'Notes': 'supermarket'}], ensure_data_file())
+
+    summary = import_expenses(write_statement(data_dir), debits_negative=True)
+    assert summary['imported'] == 2
+    assert summary['duplicates'] == 1
+
+def test_unknown_categories_fall_back():
+    chunk = pd.DataFrame({
+        'Date': ['03/01/2024', '04/01/2024', '05/01/2024'],
+        'Amount': ['2.50', '3.00', '4.00'],
+        'Notes': ['Uber home', 'Cinema', 'Shop'],
+        'Category': ['DEBIT', 'groceries', ''],
+    })
+    mapped, skipped = map_statement_chunk(chunk, default_category='Shopping',
+                                          category_rules={'uber': 'Transportation'})
+    assert skipped == 0
+    assert mapped['Category'].tolist() == ['Transportation', 'Groceries', 'Shopping']
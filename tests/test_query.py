@@ -0,0 +1,102 @@
+import re
+
+import pandas as pd
+import pytest
+
+from app.cache import dataset_cache
+from app.expense_utils import _get_cached_ledger, ensure_data_file, get_rollups
+from app.query import Query
+from app.storage import read_ledger, write_data_file
+
+def ledger():
+    return pd.DataFrame({
+        'Date': pd.to_datetime(['2024-01-03', '2024-01-15', '2024-02-01', '2024-02-01', '2024-03-20', '2024-04-02']),
+        'Category': ['Groceries', 'Snacks', 'Restaurant', 'Snacks', 'Groceries', 'Phone'],
+        'Amount': [10.5, 2.25, 30.0, 4.75, 0.1, 15.0],
+        'Notes': ['Milk', None, 'Lunch with Sam', 'Coffee beans', 'milk', 'Top-up'],
+    })
+
+@pytest.fixture
+def filepath(data_dir):
+    filepath = ensure_data_file()
+    write_data_file(ledger(), filepath)
+    dataset_cache.invalidate()
+    return filepath
+
+def expected_rows(start=None, end=None, categories=None, min_amount=None, max_amount=None, notes=None):
+    """The same filters written as a plain pandas mask over the ledger in dollars."""
+    df = ledger()
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= df['Date'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df['Date'] <= pd.Timestamp(end)
+    if categories is not None:
+        mask &= df['Category'].isin(categories)
+    if min_amount is not None:
+        mask &= df['Amount'] >= min_amount
+    if max_amount is not None:
+        mask &= df['Amount'] <= max_amount
+    if notes is not None:
+        mask &= df['Notes'].fillna('').map(notes)
+    return df[mask].reset_index(drop=True)
+
+def as_records(df):
+    df = df.assign(Category=df['Category'].astype(str), Notes=df['Notes'].astype(object))
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+FILTERS = [
+    {},
+    {'start': '2024-01-10', 'end': '2024-03-31'},
+    {'min_amount': 2.25, 'max_amount': 15.0},
+    {'categories': ['Groceries', 'Snacks']},
+    {'notes': lambda text: 'milk' in text.lower()},
+    {'start': '2024-01-01', 'end': '2024-02-29', 'categories': ['Snacks'], 'min_amount': 3},
+]
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_every_plan_returns_the_same_rows(filepath, filters):
+    expected = as_records(expected_rows(**filters))
+    query = Query(**filters)
+
+    assert query.plan(ledger()) == 'frame'
+    assert as_records(query.run(ledger())) == expected
+
+    dated = 'start' in filters
+    dataset_cache.invalidate()
+    assert query.plan() == ('range' if dated else 'scan')
+    assert as_records(query.run()) == expected
+
+    _get_cached_ledger(filepath)
+    assert query.plan() == 'cache'
+    assert as_records(query.run()) == expected
+
+def test_notes_filters(filepath):
+    assert Query(notes='MILK').run()['Amount'].tolist() == [10.5, 0.1]
+    assert Query(notes=re.compile(r'^Coffee')).run()['Notes'].tolist() == ['Coffee beans']
+
+def test_sums_come_from_the_rollups(filepath):
+    get_rollups()
+    query = Query(group_by='category')
+    assert query.plan() == 'rollups'
+    by_rollups = query.run()
+    by_rows = query.run(read_ledger(filepath))
+
+    expected = ledger().groupby('Category')['Amount'].sum()
+    assert by_rollups['Category'].tolist() == expected.index.tolist()
+    assert by_rollups['sum'].tolist() == pytest.approx(expected.tolist())
+    assert by_rows['sum'].tolist() == pytest.approx(expected.tolist())
+
+def test_monthly_totals_agree_between_plans(filepath):
+    get_rollups()
+    query = Query('2024-01-01', '2024-03-31', group_by='month')
+    assert query.plan() == 'rollups'
+    assert query.run().to_dict('list') == query.run(read_ledger(filepath)).to_dict('list')
+
+def test_aggregates_with_a_category_set(filepath):
+    query = Query(categories={'Groceries', 'Snacks'}, group_by='category', aggregates=['sum', 'count', 'max'])
+    assert query.plan() != 'rollups'
+    result = query.run()
+    assert result.to_dict('list') == {
+        'Category': ['Groceries', 'Snacks'], 'sum': [10.6, 7.0], 'count': [2, 2], 'max': [10.5, 4.75],
+    }
@@ -0,0 +1,39 @@
+import pytest
+
+from app.expense_utils import ensure_data_file, save_expense_entries
+from visuals.render import get_chart_dir, render_chart
+
+def expense(date, amount, category='Snacks'):
+    return {'Date': date, 'Category': category, 'Amount': amount, 'Notes': None}
+
+@pytest.fixture
+def filepath(data_dir):
+    filepath = ensure_data_file()
+    save_expense_entries(None, [expense('2024/01/03', 1.5), expense('2024/02/10', 4.0, 'Phone')], filepath)
+    return filepath
+
+def test_unchanged_data_is_a_cache_hit(filepath):
+    path, rendered = render_chart('monthly', month=1, year=2024)
+    assert rendered
+    assert path.parent == get_chart_dir(filepath)
+    assert path.name.startswith('monthly-2024-01.')
+
+    assert render_chart('monthly', month=1, year=2024) == (path, False)
+    svg, rendered = render_chart('monthly', 'svg', month=1, year=2024)
+    assert rendered and svg.suffix == '.svg'
+
+def test_only_charts_of_changed_data_are_redrawn(filepath):
+    january, _ = render_chart('monthly', month=1, year=2024)
+    category, _ = render_chart('category')
+
+    save_expense_entries(None, [expense('2024/02/11', 2.0)], filepath)
+    assert render_chart('monthly', month=1, year=2024) == (january, False)
+    new_category, rendered = render_chart('category')
+    assert rendered and new_category != category
+    # The stale image is replaced, not kept next to the new one
+    assert not category.exists()
+
+def test_nothing_to_plot(filepath):
+    assert render_chart('monthly', month=6, year=2024) == (None, False)
+    with pytest.raises(ValueError):
+        render_chart('yearly')
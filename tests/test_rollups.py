@@ -0,0 +1,63 @@
+import json
+
+import pandas as pd
+import pytest
+
+from app import rollups as rollups_module
+from app.expense_utils import ensure_data_file, get_rollups, save_expense_entries
+from app.rollups import Rollups, get_rollups_filepath
+from app.storage import read_ledger
+
+EXPENSES = [
+    {'Date': '2024/01/03', 'Category': 'Groceries', 'Amount': 0.1, 'Notes': 'Milk'},
+    {'Date': '2024/01/03', 'Category': 'Groceries', 'Amount': 0.2, 'Notes': 'Bread'},
+    {'Date': '2024/01/15', 'Category': 'Snacks', 'Amount': 2.25, 'Notes': None},
+    {'Date': '2024/02/01', 'Category': 'Restaurant', 'Amount': 30.0, 'Notes': 'Lunch'},
+    {'Date': '2024/02/01', 'Category': 'Snacks', 'Amount': 0.7, 'Notes': 'Gum'},
+]
+
+def test_totals_are_whole_cents():
+    rollups = Rollups()
+    for _ in range(10):
+        rollups.add('2024/01/03', 'Snacks', 0.1)
+    assert rollups.total == 100
+    assert rollups.daily == {'2024/01/03': 100}
+    assert rollups.total_amount == 1.0
+    assert rollups.category_series().tolist() == [1.0]
+
+def test_missing_category_counts_only_towards_the_dated_totals():
+    rollups = Rollups()
+    rollups.add('2024/01/03', None, 1.5)
+    rollups.add('2024/01/03', float('nan'), 1.0)
+    assert rollups.category == {}
+    assert rollups.monthly == {'2024/01': 250}
+    assert rollups.count == 2
+
+    df = pd.DataFrame({'Date': pd.to_datetime(['2024-01-03', '2024-01-03']), 'Category': [None, None],
+                       'Amount': [1.5, 1.0], 'Notes': [None, None]})
+    assert rollups.differences(Rollups.from_frame(df)) == []
+
+@pytest.mark.parametrize('backend', ['partitioned', 'excel'], indirect=True)
+def test_incremental_updates_match_a_rebuild(backend):
+    filepath = ensure_data_file()
+    get_rollups()
+    for expense in EXPENSES:
+        save_expense_entries(None, [expense], filepath)
+
+    rollups = get_rollups()
+    rebuilt = Rollups.from_frame(read_ledger(filepath), rollups.signature)
+    assert rollups.differences(rebuilt) == []
+    assert rollups.to_dict() == rebuilt.to_dict()
+    assert rollups.monthly_series().tolist() == [2.55, 30.7]
+
+def test_older_files_are_rebuilt(data_dir):
+    filepath = ensure_data_file()
+    save_expense_entries(None, EXPENSES, filepath)
+    current = get_rollups()
+
+    old = {**current.to_dict(), 'total': current.total_amount}
+    del old['format']
+    get_rollups_filepath(filepath).write_text(json.dumps(old), encoding='utf-8')
+    rollups_module._loaded.clear()
+    assert rollups_module.load_rollups(filepath, current.signature) is None
+    assert get_rollups().total == 3325
@@ -0,0 +1,45 @@
+import pandas as pd
+
+from app.schema import CATEGORIES, apply_schema, as_cents, concat_frames, decimal_amounts, to_file_frame
+
+def file_frame():
+    """A ledger as the data files hold it: float dollars and plain text."""
+    return pd.DataFrame({
+        'Date': pd.to_datetime(['2024-01-03', '2024-01-15', '2024-02-01', '2024-03-20']),
+        'Category': ['Groceries', 'Snacks', 'Pets', None],
+        'Amount': [0.1, 2.25, None, 1234567.89],
+        'Notes': ['Milk', None, 'Food', 'Milk'],
+    })
+
+def as_records(df):
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+def test_file_values_survive_a_round_trip():
+    df = apply_schema(file_frame())
+    assert df['Amount'].dtype == 'Int64'
+    assert df['Amount'].tolist() == [10, 225, pd.NA, 123456789]
+    assert df['Category'].cat.categories.tolist() == CATEGORIES + ['Pets']
+    assert isinstance(df['Notes'].dtype, pd.CategoricalDtype)
+
+    back = to_file_frame(df)
+    assert back['Amount'].dtype == 'float64'
+    assert back['Category'].dtype == object
+    assert as_records(back) == as_records(file_frame())
+
+def test_apply_schema_is_cheap_to_repeat():
+    df = apply_schema(file_frame())
+    assert apply_schema(df) is df
+
+def test_cents_are_rounded_not_truncated():
+    # 0.29 * 100 is 28.999999999999996 in floating point
+    assert as_cents([0.29, 1.005, -0.07]).tolist() == [29, 100, -7]
+    assert decimal_amounts(as_cents([0.29, None])).tolist()[0] == 0.29
+    assert as_cents([0.1] * 10).sum() == 100
+
+def test_concat_keeps_the_first_frames_codes():
+    df = apply_schema(file_frame())
+    extra = apply_schema(file_frame().iloc[:1].assign(Notes=['Bread']))
+    merged = concat_frames([df, extra])
+    assert isinstance(merged['Notes'].dtype, pd.CategoricalDtype)
+    assert merged['Notes'].cat.categories.tolist() == df['Notes'].cat.categories.tolist() + ['Bread']
+    assert merged['Notes'].tolist()[-1] == 'Bread'
@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from app.expense_utils import ensure_data_file, save_expense_entry, search_expenses, search_notes
+from app.search import SearchIndex, tokenize
+from app.storage import get_data_signature, write_data_file
+
+def ledger():
+    return pd.DataFrame({
+        'Date': ['2024/01/03', '2024/01/15', '2024/02/01', '2024/03/20'],
+        'Category': ['Groceries', 'Snacks', 'Restaurant', 'Snacks'],
+        'Amount': [10.5, 2.25, 30.0, 3.0],
+        'Notes': ['Coffee beans', 'Coffee', 'Lunch, beans salad', 'Iced coffee'],
+    })
+
+@pytest.fixture
+def filepath(data_dir):
+    filepath = ensure_data_file()
+    write_data_file(ledger(), filepath)
+    return filepath
+
+def test_tokenize():
+    assert tokenize("Coffee, coffee & Beans!") == ['coffee', 'beans']
+    assert tokenize(None) == []
+
+def test_terms_match_as_prefixes(filepath):
+    assert search_expenses('coff')['Notes'].tolist() == ['Coffee beans', 'Coffee', 'Iced coffee']
+    assert search_notes('sal') == ['Lunch, beans salad']
+    assert search_expenses('tea').empty
+
+def test_every_term_must_match(filepath):
+    assert search_expenses('coff bea')['Notes'].tolist() == ['Coffee beans']
+    assert search_expenses('bea lun')['Amount'].tolist() == [3000]  # in cents, like the ledger
+
+def test_limit_keeps_the_most_recent(filepath):
+    rows = search_expenses('coffee', limit=2)
+    assert rows['Notes'].tolist() == ['Coffee', 'Iced coffee']
+
+def test_saves_update_the_index_in_place(filepath, monkeypatch):
+    search_expenses('coffee')
+
+    def rebuild(self, df, signature):
+        raise AssertionError("the index was rebuilt")
+
+    monkeypatch.setattr(SearchIndex, 'rebuild', rebuild)
+    save_expense_entry(None, {'Date': '2024/04/01', 'Category': 'Snacks', 'Amount': 4.0, 'Notes': 'Coffee cake'},
+                       filepath)
+    assert SearchIndex(filepath).is_current(get_data_signature(filepath))
+    assert search_expenses('cof cak')['Date'].tolist() == [pd.Timestamp('2024-04-01')]
+
+def test_index_is_rebuilt_after_an_outside_change(filepath):
+    assert len(search_expenses('coffee')) == 3
+
+    write_data_file(ledger().assign(Notes=['Tea', 'Tea', 'Coffee', 'Tea']), filepath)
+    assert not SearchIndex(filepath).is_current(get_data_signature(filepath))
+    assert search_expenses('coffee')['Amount'].tolist() == [3000]  # in cents, like the ledger
+    assert len(search_expenses('tea')) == 3
@@ -0,0 +1,70 @@
+import asyncio
+import json
+from http import HTTPStatus
+
+import pytest
+
+from app.server import ApiServer
+
+PORT = 8765
+HEADERS = {'host': f'127.0.0.1:{PORT}'}
+EXPENSE = json.dumps({'Date': '2024-03-04', 'Category': 'Snacks', 'Amount': 2.5, 'Notes': 'Coffee'}).encode()
+
+@pytest.fixture
+def server(data_dir):
+    server = ApiServer()
+    server.port = PORT
+    server._warm_up()
+    yield server
+    server._executor.shutdown(wait=True)
+
+def request(server, method, target, body=b'', **headers):
+    headers = {**HEADERS, **{name.replace('_', '-'): value for name, value in headers.items()}}
+    status, content_type, payload = asyncio.run(server._handle(method, target, body, headers))
+    return status, json.loads(payload) if content_type == 'application/json' else payload
+
+def test_post_saves_json_expenses(server):
+    status, body = request(server, 'POST', '/expenses', EXPENSE, content_type='application/json; charset=utf-8')
+    assert status == HTTPStatus.CREATED
+    assert body['saved'] == 1
+
+    status, rows = request(server, 'GET', '/expenses')
+    assert [row['Notes'] for row in rows] == ['Coffee']
+
+def test_post_needs_json_content_type(server):
+    status, _ = request(server, 'POST', '/expenses', EXPENSE, content_type='application/x-www-form-urlencoded')
+    assert status == HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+    status, _ = request(server, 'POST', '/expenses', EXPENSE)
+    assert status == HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+
+@pytest.mark.parametrize('host', ['evil.example:8765', '127.0.0.1:9999', ''])
+def test_foreign_host_is_rejected(server, host):
+    status, _ = request(server, 'GET', '/stats', host=host)
+    assert status == HTTPStatus.BAD_REQUEST
+    status, _ = request(server, 'POST', '/expenses', EXPENSE, host=host, content_type='application/json')
+    assert status == HTTPStatus.BAD_REQUEST
+
+def test_localhost_is_accepted(server):
+    status, _ = request(server, 'GET', '/stats', host=f'localhost:{PORT}')
+    assert status == HTTPStatus.OK
+
+@pytest.mark.parametrize('target', [
+    '/charts/monthly.png?month=13&year=2024',
+    '/charts/monthly.png?month=0&year=2024',
+    '/expenses?offset=-1',
+    '/expenses?limit=-5',
+    '/search?q=coffee&limit=-1',
+])
+def test_out_of_range_parameters_are_bad_requests(server, target):
+    status, body = request(server, 'GET', target)
+    assert status == HTTPStatus.BAD_REQUEST
+    assert 'error' in body
+
+def test_stats_report_the_dataset_cache(server):
+    from app.expense_utils import _get_cached_ledger
+
+    _, before = request(server, 'GET', '/stats')
+    _get_cached_ledger(server.filepath)
+    _, after = request(server, 'GET', '/stats')
+    # Not served from the response cache, so the counters are current
+    assert after['cache']['hits'] == before['cache']['hits'] + 1
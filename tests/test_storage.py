@@ -0,0 +1,183 @@
+import pandas as pd
+import pytest
+
+from app.schema import CATEGORIES, to_file_frame
+from app.storage import (
+    ExcelStorage, PartitionedStorage, append_entries, compact_journal, get_data_signature, get_journal_filepath, get_storage,
+    get_storage_filepath, migrate_data, read_ledger, write_data_file,
+)
+
+BACKENDS = ['excel', 'parquet', 'feather', 'sqlite', 'partitioned']
+
+def ledger():
+    return pd.DataFrame({
+        'Date': ['2024/01/03', '2024/01/15', '2024/02/01', '2024/03/20'],
+        'Category': ['Groceries', 'Snacks', 'Restaurant', 'Groceries'],
+        'Amount': [10.5, 2.25, 30.0, 0.1],
+        'Notes': ['Milk', None, 'Lunch', 'Milk'],
+    })
+
+def as_file_values(df):
+    """Compare ledgers as the files see them: float dollars and plain text."""
+    df = to_file_frame(df).reset_index(drop=True)
+    return df.astype(object).where(df.notna(), None)
+
+@pytest.mark.parametrize('backend', BACKENDS, indirect=True)
+def test_round_trip(backend):
+    filepath = get_storage_filepath(get_storage())
+    write_data_file(ledger(), filepath)
+
+    df = read_ledger(filepath)
+    assert df['Date'].dtype == 'datetime64[ns]'
+    assert df['Category'].cat.categories[:len(CATEGORIES)].tolist() == CATEGORIES
+    assert df['Amount'].dtype == 'Int64'
+    expected = ledger().assign(Date=pd.to_datetime(ledger()['Date'], format='%Y/%m/%d'))
+    assert as_file_values(df).equals(as_file_values(expected))
+
+@pytest.mark.parametrize('backend', BACKENDS, indirect=True)
+def test_appends_keep_date_order(backend):
+    filepath = get_storage_filepath(get_storage())
+    write_data_file(ledger(), filepath)
+    append_entries([
+        {'Date': '2024/01/10', 'Category': 'Phone', 'Amount': 5.0, 'Notes': 'Top-up'},
+        {'Date': '2024/04/01', 'Category': 'Barber', 'Amount': 12.0, 'Notes': ''},
+    ], filepath)
+
+    df = read_ledger(filepath)
+    assert len(df) == 6
+    assert df['Date'].is_monotonic_increasing
+    assert df.loc[1, 'Notes'] == 'Top-up'
+    assert int(df['Amount'].sum()) == 5985
+
+@pytest.mark.parametrize('backend', ['excel', 'parquet', 'feather'], indirect=True)
+def test_compaction_folds_the_journal_into_the_data_file(backend):
+    from app.expense_utils import _peek_cached_ledger, get_rollups, save_expense_entries
+    from app.rollups import load_rollups
+
+    filepath = get_storage_filepath(get_storage())
+    write_data_file(ledger(), filepath)
+    save_expense_entries(None, [
+        {'Date': '2024/01/10', 'Category': 'Phone', 'Amount': 5.0, 'Notes': 'Top-up'},
+        {'Date': '2024/04/01', 'Category': 'Barber', 'Amount': 12.0, 'Notes': 'Haircut'},
+    ], filepath)
+    assert get_journal_filepath(filepath).exists()
+    before = read_ledger(filepath)
+    get_rollups()
+
+    assert compact_journal(filepath) == 2
+    assert not get_journal_filepath(filepath).exists()
+    assert as_file_values(read_ledger(filepath)).equals(as_file_values(before))
+    # Compaction does not change the content, so data derived from the old files stays valid
+    signature = get_data_signature(filepath)
+    assert load_rollups(filepath, signature) is not None
+    assert _peek_cached_ledger(filepath) is not None
+
+@pytest.mark.parametrize('backend', ['parquet'], indirect=True)
+def test_compaction_reports_a_busy_lock(backend):
+    import threading
+    from app.storage import _compaction_lock
+
+    filepath = get_storage_filepath(get_storage())
+    write_data_file(ledger(), filepath)
+    append_entries([{'Date': '2024/01/10', 'Category': 'Phone', 'Amount': 5.0, 'Notes': 'Top-up'}], filepath)
+
+    held, done = threading.Event(), threading.Event()
+
+    def hold():
+        with _compaction_lock:
+            held.set()
+            done.wait(5)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    held.wait(5)
+    try:
+        assert compact_journal(filepath) is None
+    finally:
+        done.set()
+        thread.join()
+    assert compact_journal(filepath) == 1
+    assert compact_journal(filepath) == 0
+
+@pytest.mark.parametrize('backend', ['partitioned'], indirect=True)
+def test_partition_without_notes_reads_with_later_notes(backend):
+    # A month whose notes are all empty must not fix the Notes type for the other months
+    filepath = get_storage_filepath(get_storage())
+    write_data_file(pd.DataFrame({
+        'Date': ['2024/01/01', '2024/01/02'], 'Category': ['Snacks', 'Snacks'],
+        'Amount': [1.0, 2.0], 'Notes': [None, None],
+    }), filepath)
+    append_entries([{'Date': '2024/02/01', 'Category': 'Snacks', 'Amount': 3.0, 'Notes': 'coffee'}], filepath)
+
+    df = read_ledger(filepath)
+    assert df['Notes'].isna().tolist() == [True, True, False]
+    assert df['Notes'].iloc[-1] == 'coffee'
+
+@pytest.mark.parametrize('backend', ['partitioned'], indirect=True)
+def test_partition_written_with_null_notes_is_still_readable(backend):
+    # Files from before the partition schema was fixed stored empty Notes as type null
+    storage = PartitionedStorage()
+    filepath = get_storage_filepath(storage)
+    write_data_file(ledger().iloc[:2], filepath)
+    manifest = storage.load_manifest(filepath)
+    partition = manifest['partitions']['2024-01']
+    pd.DataFrame({
+        'Date': pd.to_datetime(['2024-01-03']), 'Category': ['Snacks'], 'Amount': [1], 'Notes': [None],
+    }).to_parquet(filepath.parent / manifest['directory'] / partition['file'], index=False)
+
+    append_entries([{'Date': '2024/02/01', 'Category': 'Snacks', 'Amount': 3.0, 'Notes': 'coffee'}], filepath)
+
+    df = read_ledger(filepath)
+    assert df['Amount'].tolist() == [100, 300]
+    assert df['Notes'].iloc[-1] == 'coffee'
+
+@pytest.mark.parametrize('backend', ['partitioned'], indirect=True)
+def test_migration_folds_the_journal(backend):
+    workbook = get_storage_filepath(get_storage('excel'))
+    write_data_file(ledger(), workbook)
+    append_entries([{'Date': '2024/01/10', 'Category': 'Phone', 'Amount': 5.0, 'Notes': 'Top-up'}], workbook)
+    assert get_journal_filepath(workbook).exists()
+
+    filepath = get_storage_filepath()
+    assert migrate_data(workbook, filepath) == 5
+    assert not workbook.exists()
+    assert not get_journal_filepath(filepath).exists()
+    df = read_ledger(filepath)
+    assert df['Notes'].tolist()[1] == 'Top-up'
+    assert int(df['Amount'].sum()) == 4785
+
+def year_of_expenses():
+    dates = pd.date_range('2024-01-01', '2024-12-31', freq='D')
+    return pd.DataFrame({'Date': dates, 'Category': 'Snacks', 'Amount': 1.0, 'Notes': None})
+
+def count_batches(monkeypatch):
+    typed = []
+    typed_batch = ExcelStorage._typed_batch
+
+    def spy(raw, header):
+        typed.append(len(raw))
+        return typed_batch(raw, header)
+
+    monkeypatch.setattr(ExcelStorage, '_typed_batch', staticmethod(spy))
+    return typed
+
+def test_excel_batches_stop_after_the_end_date(data_dir, monkeypatch):
+    path = data_dir / 'ledger.xlsx'
+    write_data_file(year_of_expenses(), path)
+    typed = count_batches(monkeypatch)
+
+    batches = list(ExcelStorage().iter_batches(path, '2024/01/10', '2024/02/15', batch_size=30))
+    assert [len(b) for b in batches] == [21, 16]
+    assert batches[-1]['Date'].iloc[-1] == pd.Timestamp('2024-02-15')
+    # Two batches reach February 15th; the rest of the year is never parsed
+    assert typed == [30, 30]
+
+def test_excel_batches_scan_an_unsorted_sheet(data_dir, monkeypatch):
+    path = data_dir / 'ledger.xlsx'
+    df = year_of_expenses()
+    write_data_file(pd.concat([df.iloc[40:], df.iloc[:40]], ignore_index=True), path)
+    typed = count_batches(monkeypatch)
+
+    df = ExcelStorage().read_range(path, None, '2024/01/31')
+    assert len(df) == 31
+    assert sum(typed) == 366
@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")  # render headless; plt.show() becomes a no-op
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from app.config import DEFAULT_SETTINGS
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+REGRESSION_THRESHOLD = 0.20
+
+def measure(func, repeat=3):
+    """Return (median seconds over repeat runs, peak traced MB of one extra run).
+
+    Memory is traced in a separate run because tracemalloc slows allocation-heavy code
+    by an order of magnitude and would skew the timings.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+        plt.close("all")
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        plt.close("all")
+    return statistics.median(timings), peak / 1024 ** 2
+
+def _view_data_benchmark(df):
+    """Build the View Data table for df, or None if there is no display to create Tk on."""
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+    root.withdraw()
+    from gui import VirtualTable
+
+    def populate():
+        win = tk.Toplevel(root)
+        table = VirtualTable(win, df)
+        table.scroll_to_end()
+        win.update_idletasks()
+        win.destroy()
+    return populate, root
+
+@contextmanager
+def bench_environment(size, backend):
+    """Point the app at a temporary data directory and backend, and undo it afterwards."""
+    from app import rollups
+    from app.cache import dataset_cache
+    from app.expense_utils import wait_for_compaction
+
+    names = ("EXPENSE_TRACKER_DATA_DIR", "EXPENSE_TRACKER_STORAGE_BACKEND")
+    saved = {name: os.environ.get(name) for name in names}
+    with tempfile.TemporaryDirectory(prefix=f"expense-bench-{size}-", ignore_cleanup_errors=True) as data_dir:
+        os.environ["EXPENSE_TRACKER_DATA_DIR"] = data_dir
+        os.environ["EXPENSE_TRACKER_STORAGE_BACKEND"] = backend
+        try:
+            yield data_dir
+        finally:
+            # Nothing may still write into the directory, or be served from it later
+            wait_for_compaction()
+            dataset_cache.invalidate()
+            rollups._loaded.clear()
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+def run_size(size, backend, repeat, seed):
+    """Benchmark every hot path on a fresh synthetic ledger of `size` rows."""
+    with bench_environment(size, backend):
+        return _run_size(size, repeat, seed)
+
+def _run_size(size, repeat, seed):
+    from app import expense_utils
+    from app.cache import dataset_cache
+    from tools.generate_dummy_data import generate_dummy_data
+    from visuals.plot_utils import plot_cumulative_spending, plot_monthly_spending, plot_spending_per_category
+
+    filepath = expense_utils.get_data_filepath()
+    generate_dummy_data(size, output=filepath, seed=seed, start="2015-01-01", end="2025-12-31")
+    df, _ = expense_utils.load_data()
+    expense_utils.get_rollups()  # build once so plot timings are steady-state
+    shuffled = df.sample(frac=1, random_state=seed)
+    last = df["Date"].iloc[-1]
+    entry = {"Date": last.strftime("%Y/%m/%d"), "Category": "Snacks", "Amount": 3.5, "Notes": "Benchmark"}
+
+    def load_cold():
+        dataset_cache.invalidate()
+        expense_utils.load_data()
+
+    operations = [
+        ("load_data (cold)", load_cold),
+        ("load_data (cached)", expense_utils.load_data),
+        ("sort_expenses_by_date", lambda: expense_utils.sort_expenses_by_date(shuffled)),
+        ("save_expense_entry", lambda: expense_utils.save_expense_entry(df, entry, filepath)),
+        ("rollups rebuild", lambda: expense_utils.Rollups.from_frame(df)),
+        ("plot_monthly_spending", lambda: plot_monthly_spending(None, last.month, last.year)),
+        ("plot_spending_per_category", plot_spending_per_category),
+        ("plot_cumulative_spending", plot_cumulative_spending),
+        ("plot_cumulative_spending (rows)", lambda: plot_cumulative_spending(df)),
+    ]
+
+    view = _view_data_benchmark(df)
+    if view is not None:
+        operations.append(("view_data populate", view[0]))
+
+    results = []
+    for name, func in operations:
+        seconds, peak_mb = measure(func, repeat)
+        results.append({"size": size, "operation": name, "seconds": seconds, "peak_mb": peak_mb})
+        print(f"  {name:<34} {seconds * 1000:>10.2f} ms {peak_mb:>9.1f} MB")
+    if view is None:
+        print("  view_data populate                 skipped (no display)")
+    else:
+        view[1].destroy()
+    return results
+
+def compare(results, baseline_path, threshold=REGRESSION_THRESHOLD):
+    """Print operations that got slower than the baseline by more than threshold. Returns the count."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["size"], r["operation"]): r for r in json.load(f)["results"]}
+
+    regressions = 0
+    print(f"\n📈 Compared with {baseline_path} (threshold {threshold:.0%}):")
+    for result in results:
+        old = baseline.get((result["size"], result["operation"]))
+        if old is None or old["seconds"] <= 0:
+            continue
+        change = result["seconds"] / old["seconds"] - 1
+        flag = "❌ REGRESSION" if change > threshold else ("✅ faster" if change < -threshold else "")
+        if change > threshold:
+            regressions += 1
+        print(f"  {result['size']:>9} {result['operation']:<34} {change:+7.1%} {flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Time load/insert/aggregate/plot paths on synthetic ledgers.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--backend", default=DEFAULT_SETTINGS["storage_backend"], help="storage backend to benchmark")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON results file (default: benchmark_<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier JSON results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", message=".*non-interactive.*")
+
+    results = []
+    for size in args.sizes:
+        print(f"\n⏱️ {size:,} rows ({args.backend})")
+        results.extend(run_size(size, args.backend, args.repeat, args.seed))
+
+    output = Path(args.output or f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "backend": args.backend,
+                "repeat": args.repeat,
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "platform": platform.platform(),
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"\n✅ Results saved to {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+from app.expense_utils import compact_journal, get_data_filepath
+
+def run_compaction():
+    """Fold the append-only journal back into the data file, whatever its backend."""
+    filepath = get_data_filepath()
+    folded = compact_journal(filepath)
+    if folded is None:
+        print("⏳ Another compaction is already running; try again once it has finished.")
+    elif folded == 0:
+        print("ℹ️ Journal is empty, nothing to compact.")
+
+if __name__ == "__main__":
+    run_compaction()
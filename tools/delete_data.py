@@ -1,24 +1,29 @@
-import os
-from pathlib import Path
-import sys
-
-def get_base_path():
-    """Returns correct base path whether running from script or PyInstaller .exe"""
-    if getattr(sys, 'frozen', False):
-        return Path(sys.executable).resolve().parent
-    return Path(__file__).resolve().parents[1]
+from app.expense_utils import get_data_filepath, wait_for_compaction
+from app.rollups import delete_rollups
+from app.search import delete_search_index
+from app.storage import data_lock, delete_data_file
 
 def delete_main_expense_tracker():
-    """Delete the main expense tracker Excel file after user confirmation."""
-    base_path = get_base_path()
-    filepath = base_path / 'data' / 'Expense_Tracker.xlsx'
+    """Delete the main expense tracker data file after user confirmation."""
+    filepath = get_data_filepath()
 
     if not filepath.exists():
         print("⚠️ No expense tracker file found to delete.")
         return
 
-    os.remove(filepath)
+    # Don't let a running compaction write the file back after we delete it
+    wait_for_compaction()
+
+    with data_lock:
+        delete_data_file(filepath)
+
+        # Remove the append-only journal too, otherwise its rows would reappear
+        for journal in filepath.parent.glob(f'{filepath.stem}_journal.*'):
+            journal.unlink()
+
+        delete_rollups(filepath)
+        delete_search_index(filepath)
     print(f"✅ Deleted the main expense tracker file: {filepath}")
 
 if __name__ == "__main__":
-    delete_main_expense_tracker()
\ No newline at end of file
+    delete_main_expense_tracker()
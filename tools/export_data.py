@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+from app.expense_utils import get_data_filepath
+from app.storage import data_lock, export_data, read_data_file, merge_frames, sort_by_date, write_data_file
+
+def export_to_file(target_path=None):
+    """Export the full ledger, by default to data/Expense_Tracker_export.xlsx."""
+    filepath = get_data_filepath()
+    target_path = Path(target_path or filepath.with_name(f"{filepath.stem}_export.xlsx"))
+    count = export_data(target_path, filepath)
+    print(f"✅ Exported {count} expenses to {target_path}")
+
+def import_from_file(source_path):
+    """Merge the expenses of an Excel/Parquet/Feather file into the ledger."""
+    filepath = get_data_filepath()
+    incoming = sort_by_date(read_data_file(source_path))
+    # Merge into the version on disk at write time, not one another process may since have changed
+    with data_lock:
+        df = merge_frames(read_data_file(filepath), incoming) if filepath.exists() else incoming
+        write_data_file(df, filepath)
+    print(f"✅ Imported {len(incoming)} expenses from {source_path}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == 'import':
+        import_from_file(sys.argv[2])
+    else:
+        export_to_file(sys.argv[1] if len(sys.argv) > 1 else None)
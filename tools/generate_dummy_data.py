@@ -1,48 +1,148 @@
+import argparse
+import json
+
+import numpy as np
 import pandas as pd
-import random
-from pathlib import Path
-import sys
-
-def get_base_path():
-    """Returns correct base path whether running from script or PyInstaller .exe"""
-    if getattr(sys, 'frozen', False):
-        return Path(sys.executable).resolve().parent
-    return Path(__file__).resolve().parents[1]
-
-def generate_dummy_data():
-    base_path = get_base_path()
-    filepath = base_path / 'data' / 'Expense_Tracker.xlsx'
-
-    categories = [
-        'Restaurant', 'Toters', 'Entertainment', 'Groceries', 'Snacks',
-        'Barber', 'Laundry', 'Transportation', 'Shopping', 'Phone'
-    ]
-
-    # Prepare date range once
-    dates = pd.date_range(start="2025-01-01", end="2025-04-30", freq='D')
-
-    # Generate 200 random entries
-    expenses = [
-        {
-            'Date': random.choice(dates),
-            'Category': random.choice(categories),
-            'Amount': round(random.uniform(5, 200), 2),
-            'Notes': ""
-        }
-        for _ in range(200)
-    ]
-
-    # Create DataFrame
-    df = pd.DataFrame(expenses)
-
-    # Sort and format
-    df = df.sort_values(by='Date').reset_index(drop=True)
-    df['Date'] = df['Date'].dt.strftime('%Y/%m/%d')
-
-    # Ensure directory exists and save
-    filepath.parent.mkdir(parents=True, exist_ok=True)
-    df.to_excel(filepath, index=False)
+
+from app.expense_utils import categories, get_data_filepath
+from app.storage import BACKENDS, COLUMNS, DATA_STEM, write_data_file_chunks
+
+CHUNK_SIZE = 100_000
+
+# (distribution, parameters) per category; see _draw_amounts
+DEFAULT_AMOUNT_DISTRIBUTIONS = {
+    'Restaurant': ('lognormal', 3.0, 0.5),
+    'Toters': ('lognormal', 2.7, 0.4),
+    'Entertainment': ('lognormal', 3.2, 0.6),
+    'Groceries': ('lognormal', 3.6, 0.5),
+    'Snacks': ('uniform', 1, 15),
+    'Barber': ('normal', 20, 5),
+    'Laundry': ('uniform', 5, 25),
+    'Transportation': ('exponential', 12),
+    'Shopping': ('lognormal', 3.8, 0.8),
+    'Phone': ('normal', 30, 3),
+}
+
+DEFAULT_NOTES = {
+    'Restaurant': ['Pizza', 'Burger', 'Sushi', 'Lunch with team', 'Dinner', 'Shawarma'],
+    'Toters': ['Toters order', 'Late night delivery', 'Breakfast delivery'],
+    'Entertainment': ['Cinema', 'Concert', 'Bowling', 'Streaming subscription'],
+    'Groceries': ['Supermarket', 'Vegetables', 'Bakery', 'Butcher'],
+    'Snacks': ['Coffee', 'Chips', 'Ice cream', 'Juice'],
+    'Barber': ['Haircut', 'Beard trim'],
+    'Laundry': ['Dry cleaning', 'Laundromat'],
+    'Transportation': ['Taxi', 'Uber', 'Fuel', 'Parking', 'Bus'],
+    'Shopping': ['Clothes', 'Electronics', 'Books', 'Gifts', 'Home supplies'],
+    'Phone': ['Monthly bill', 'Top-up'],
+}
+
+def _draw_amounts(rng, size, distribution):
+    kind, *params = distribution
+    if kind == 'uniform':
+        amounts = rng.uniform(params[0], params[1], size)
+    elif kind == 'normal':
+        amounts = rng.normal(params[0], params[1], size)
+    elif kind == 'lognormal':
+        amounts = rng.lognormal(params[0], params[1], size)
+    elif kind == 'exponential':
+        amounts = rng.exponential(params[0], size)
+    else:
+        raise ValueError(f"Unknown amount distribution '{kind}'")
+    return np.maximum(amounts, 0.01).round(2)
+
+def iter_dummy_chunks(rows=200, start="2025-01-01", end="2025-04-30", seed=None,
+                      category_weights=None, amount_distributions=None, notes_vocabulary=None,
+                      empty_notes_ratio=0.3, chunksize=CHUNK_SIZE):
+    """Yield date-ordered DataFrames of random expenses, chunksize rows at a time (vectorised with NumPy).
+
+    category_weights maps category -> relative weight (uniform by default),
+    amount_distributions maps category -> ('uniform', low, high) / ('normal', mean, sd) /
+    ('lognormal', mean, sigma) / ('exponential', scale), and notes_vocabulary maps
+    category -> list of notes. The same seed always produces the same ledger.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(categories)
+    weights = np.array([(category_weights or {}).get(c, 1.0 if not category_weights else 0.0) for c in names], dtype=float)
+    if weights.sum() <= 0:
+        raise ValueError("At least one category needs a positive weight.")
+    weights /= weights.sum()
+    distributions = {**DEFAULT_AMOUNT_DISTRIBUTIONS, **(amount_distributions or {})}
+    vocabulary = {**DEFAULT_NOTES, **(notes_vocabulary or {})}
+
+    # Spread the rows over the days first, so chunks cover consecutive days and the
+    # stream as a whole is already sorted by date
+    days = pd.date_range(start=start, end=end, freq='D')
+    per_day = rng.multinomial(rows, np.full(len(days), 1 / len(days)))
+    day_ends = np.cumsum(per_day)
+
+    first_day = 0
+    while first_day < len(days):
+        # Take whole days until the chunk is full
+        done_before = day_ends[first_day - 1] if first_day else 0
+        last_day = int(np.searchsorted(day_ends, done_before + chunksize, side='right'))
+        last_day = min(max(last_day, first_day + 1), len(days))
+        counts = per_day[first_day:last_day]
+        size = int(counts.sum())
+        if size:
+            dates = np.repeat(days[first_day:last_day].values, counts)
+            codes = rng.choice(len(names), size=size, p=weights)
+            amounts = np.empty(size)
+            notes = np.full(size, "", dtype=object)
+            for code, name in enumerate(names):
+                mask = codes == code
+                count = int(mask.sum())
+                if not count:
+                    continue
+                amounts[mask] = _draw_amounts(rng, count, distributions[name])
+                words = vocabulary.get(name) or [""]
+                notes[mask] = np.asarray(words, dtype=object)[rng.integers(0, len(words), count)]
+            notes[rng.random(size) < empty_notes_ratio] = ""
+
+            yield pd.DataFrame({
+                'Date': dates,
+                'Category': np.asarray(names, dtype=object)[codes],
+                'Amount': amounts,
+                'Notes': notes,
+            }, columns=COLUMNS)
+        first_day = last_day
+
+def generate_dummy_data(rows=200, output=None, **options):
+    """Generate random expenses and stream them to output (the configured data file by default).
+
+    The format follows the output extension (.xlsx, .parquet, .feather or .db).
+    """
+    filepath = output or get_data_filepath()
+    write_data_file_chunks(iter_dummy_chunks(rows, **options), filepath)
     print(f"✅ Dummy data generated and saved to {filepath}")
 
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic expense ledger for testing.")
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--start", default="2025-01-01", help="first date (YYYY-MM-DD)")
+    parser.add_argument("--end", default="2025-04-30", help="last date (YYYY-MM-DD)")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--format", choices=list(BACKENDS), help="write data/Expense_Tracker_dummy.<ext> in this format")
+    parser.add_argument("--output", help="explicit output file (format from extension)")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--config", help="JSON file with category_weights, amount_distributions, "
+                                         "notes_vocabulary and/or empty_notes_ratio")
+    args = parser.parse_args()
+
+    if args.rows > 1_048_575 and (args.format == 'excel' or (args.output or '').endswith('.xlsx')):
+        parser.error("Excel sheets hold at most 1,048,575 rows; use another format.")
+
+    options = {}
+    if args.config:
+        with open(args.config, encoding='utf-8') as f:
+            options = json.load(f)
+        options['amount_distributions'] = {k: tuple(v) for k, v in options.get('amount_distributions', {}).items()}
+
+    output = args.output
+    if output is None and args.format:
+        output = get_data_filepath().with_name(f"{DATA_STEM}_dummy{BACKENDS[args.format].suffix}")
+
+    generate_dummy_data(args.rows, output=output, start=args.start, end=args.end, seed=args.seed,
+                        chunksize=args.chunksize, **options)
+
 if __name__ == "__main__":
-    generate_dummy_data()
\ No newline at end of file
+    main()
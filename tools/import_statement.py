@@ -0,0 +1,44 @@
+import argparse
+import json
+
+from app.expense_utils import categories, import_expenses
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a bank/CSV/XLSX statement into the expense tracker.")
+    parser.add_argument("path", help="CSV or XLSX statement file")
+    parser.add_argument("--date-col", help="column holding the date")
+    parser.add_argument("--amount-col", help="column holding the amount")
+    parser.add_argument("--notes-col", help="column holding the description/notes")
+    parser.add_argument("--category-col", help="column holding the category")
+    parser.add_argument("--date-format", help="strptime format of the dates, e.g. %%d/%%m/%%Y")
+    parser.add_argument("--category", default="Shopping", choices=categories,
+                        help="category for rows without one (default: Shopping)")
+    parser.add_argument("--rules", help='JSON file mapping note keywords to categories, e.g. {"uber": "Transportation"}')
+    parser.add_argument("--debits-negative", action="store_true",
+                        help="amounts spent are negative (typical bank export); positive rows are skipped")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be imported")
+    args = parser.parse_args()
+
+    column_map = {
+        source: target
+        for source, target in [(args.date_col, 'Date'), (args.amount_col, 'Amount'),
+                               (args.notes_col, 'Notes'), (args.category_col, 'Category')]
+        if source
+    }
+    category_rules = None
+    if args.rules:
+        with open(args.rules, encoding='utf-8') as f:
+            category_rules = json.load(f)
+
+    import_expenses(
+        args.path,
+        column_map=column_map or None,
+        date_format=args.date_format,
+        default_category=args.category,
+        category_rules=category_rules,
+        debits_negative=args.debits_negative,
+        dry_run=args.dry_run,
+    )
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,187 @@
-import shutil
-from pathlib import Path
-from datetime import datetime
+import argparse
 import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from app.backup import RETENTION_PERIODS, BackupStore, get_backup_dir, partition_files
+from app.cache import dataset_cache
+from app.config import get_setting
+from app.expense_utils import (
+    _get_cached_ledger, _peek_cached_ledger, get_data_filepath, wait_for_compaction,
+)
+from app.rollups import delete_rollups
+from app.search import delete_search_index
+from app.storage import (
+    data_lock, empty_frame, get_data_signature, load_journal, read_ledger_range, write_data_file,
+)
+
+def get_backup_store(filepath=None):
+    return BackupStore(get_backup_dir(filepath or get_data_filepath()))
 
-def get_base_path():
-    """Returns correct base path whether running from script or PyInstaller .exe"""
-    if getattr(sys, 'frozen', False):
-        return Path(sys.executable).resolve().parent
-    return Path(__file__).resolve().parents[1]
+def get_retention():
+    """Retention policy from the backup_keep_<tier> settings."""
+    return {tier: int(get_setting(f'backup_keep_{tier}')) for tier in RETENTION_PERIODS}
 
-def create_manual_backup():
-    """Create a manual backup of the expense tracker file."""
-    base_path = get_base_path()
-    data_dir = base_path / 'data'
-    filepath = data_dir / 'Expense_Tracker.xlsx'
+def _changed_months(filepath, store, saved_signature, signature, partitions):
+    """Months that can differ from the newest snapshot, or None if any month can.
+
+    When the data file is untouched since that snapshot, only the journal has grown, so
+    only the months of journal rows need to be looked at. A partitioned ledger also tells
+    which months were rewritten since, by their partition files.
+    """
+    if saved_signature is None:
+        return None
+    if saved_signature[:2] == signature[:2]:
+        rewritten = set()
+    else:
+        saved_partitions = store.saved_partitions()
+        if partitions is None or saved_partitions is None:
+            return None
+        rewritten = {month for month in saved_partitions.keys() | partitions.keys()
+                     if saved_partitions.get(month) != partitions.get(month)}
+    journal = load_journal(filepath)
+    return rewritten | set(journal['Date'].dt.strftime('%Y-%m'))
+
+def _rows_to_back_up(filepath, changed):
+    """The ledger, or just the span of the changed months when the others come from the last snapshot."""
+    if changed is None:
+        return _get_cached_ledger(filepath)
+    cached = _peek_cached_ledger(filepath)
+    if cached is not None:
+        return cached
+    if not changed:
+        return empty_frame()
+    # One date-range read: partitioned and SQLite ledgers only read the months it covers
+    months = sorted(changed)
+    start = pd.Timestamp(f"{months[0]}-01")
+    end = pd.Timestamp(f"{months[-1]}-01") + pd.offsets.MonthEnd(0)
+    return read_ledger_range(filepath, start, end)
+
+def create_manual_backup(prune=True):
+    """Snapshot the ledger into the incremental backup store, then apply retention."""
+    filepath = get_data_filepath()
 
     if not filepath.exists():
         print("⚠️ No expense tracker file found to backup.")
-        return
+        return None
+
+    started = time.perf_counter()
+    store = get_backup_store(filepath)
+    with data_lock:
+        signature = get_data_signature(filepath)
+        saved_signature = store.saved_signature()
+        if signature == saved_signature:
+            manifest, written = None, 0
+        else:
+            partitions = partition_files(filepath)
+            changed = _changed_months(filepath, store, saved_signature, signature, partitions)
+            df = _rows_to_back_up(filepath, changed)
+            manifest, written = store.create(df, signature, changed_months=changed, partitions=partitions)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if manifest is None:
+        print(f"✅ No changes since the last backup ({elapsed_ms:.0f} ms).")
+    else:
+        print(f"✅ Backup {manifest['id']} created: {manifest['rows']} expenses, "
+              f"{written} of {len(manifest['chunks'])} month chunks written ({elapsed_ms:.0f} ms).")
+        print(f"🕒 Backup creation time: {datetime.fromisoformat(manifest['created']):%Y-%m-%d %H:%M:%S}")
+
+    if prune:
+        # Under the lock so another process's half-written snapshot is not garbage-collected
+        with data_lock:
+            removed = store.prune(get_retention())
+        if removed:
+            print(f"🧹 Removed {len(removed)} backup{'s' if len(removed) != 1 else ''} outside the retention policy.")
+    return manifest
+
+def list_backups():
+    store = get_backup_store()
+    snapshots = store.snapshots()
+    if not snapshots:
+        print("⚠️ No backups found.")
+    for manifest in snapshots:
+        created = datetime.fromisoformat(manifest['created'])
+        print(f"{manifest['id']}  {created:%Y-%m-%d %H:%M:%S}  {manifest['rows']:>9} expenses  "
+              f"{manifest['total']:>14.2f} USD")
+    return snapshots
+
+def restore_backup(at=None, snapshot_id=None, output=None):
+    """Restore the newest snapshot taken at or before `at` (or a given snapshot).
+
+    With output the snapshot is written to that file instead. Otherwise the current data
+    is backed up first, so a restore can itself be undone.
+    """
+    filepath = get_data_filepath()
+    store = get_backup_store(filepath)
+    manifest = store.get(snapshot_id) if snapshot_id else store.find(at)
+    if manifest is None:
+        print("⚠️ No backup found for that point in time.")
+        return False
+
+    df = store.load(manifest)
+    created = datetime.fromisoformat(manifest['created'])
+    if output:
+        write_data_file(df, output)
+        print(f"✅ Backup from {created:%Y-%m-%d %H:%M:%S} written to {output}")
+        return True
+
+    # Don't let a running compaction write the old rows back after the restore
+    wait_for_compaction()
+    with data_lock:
+        if filepath.exists():
+            create_manual_backup(prune=False)
+        write_data_file(df, filepath)
+        for journal in filepath.parent.glob(f'{filepath.stem}_journal.*'):
+            journal.unlink()
+        delete_rollups(filepath)
+        delete_search_index(filepath)
+        dataset_cache.invalidate(str(filepath))
+
+    print(f"✅ Restored {len(df)} expenses from the backup of {created:%Y-%m-%d %H:%M:%S}")
+    return True
+
+def verify_backups(deep=False):
+    """Check every snapshot can be restored. Returns True if all are intact."""
+    store = get_backup_store()
+    problems = store.verify(deep=deep)
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print(f"✅ All {len(store.snapshots())} backups are intact.")
+    return not problems
 
-    # Delete existing backup for today
-    for file in data_dir.glob('Expense_Tracker_backup_*.xlsx'):
-        file.unlink()
+def prune_backups():
+    with data_lock:
+        removed = get_backup_store().prune(get_retention())
+    print(f"🧹 Removed {len(removed)} backup{'s' if len(removed) != 1 else ''}.")
+    return removed
 
-    now = datetime.now()
-    today_str = now.strftime('%Y-%m-%d')
-    timestamp_str = now.strftime('%Y-%m-%d %H:%M:%S')
-    backup_filename = f'Expense_Tracker_backup_{today_str}.xlsx'
-    backup_path = data_dir / backup_filename
+def main():
+    parser = argparse.ArgumentParser(description="Incremental backups of the expense data.")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("create", help="snapshot the current data (default)")
+    commands.add_parser("list", help="list snapshots")
+    restore = commands.add_parser("restore", help="restore a snapshot")
+    restore.add_argument("--at", help="restore the data as it was at this time, e.g. '2025-03-01 18:00'")
+    restore.add_argument("--snapshot", help="snapshot id from `list`")
+    restore.add_argument("--output", help="write the snapshot to this file instead of replacing the data")
+    verify = commands.add_parser("verify", help="check backup integrity")
+    verify.add_argument("--deep", action="store_true", help="also re-read every chunk and check its content hash")
+    commands.add_parser("prune", help="apply the retention policy")
+    args = parser.parse_args()
 
-    shutil.copy(filepath, backup_path)
-    print(f"✅ Manual backup created: {backup_filename}")
-    print(f"🕒 Backup creation time: {timestamp_str}")
+    if args.command == "list":
+        list_backups()
+    elif args.command == "restore":
+        sys.exit(0 if restore_backup(args.at, args.snapshot, args.output) else 1)
+    elif args.command == "verify":
+        sys.exit(0 if verify_backups(args.deep) else 1)
+    elif args.command == "prune":
+        prune_backups()
+    else:
+        create_manual_backup()
 
 if __name__ == "__main__":
-    create_manual_backup()
\ No newline at end of file
+    main()
@@ -0,0 +1,18 @@
+import sys
+
+from app.expense_utils import get_data_filepath
+from app.storage import find_legacy_filepath, migrate_data
+
+def migrate_storage(source_path=None):
+    """Convert an existing data file (by default the old Excel workbook) to the configured backend."""
+    filepath = get_data_filepath()
+    source_path = source_path or find_legacy_filepath(filepath)
+
+    if source_path is None:
+        print(f"ℹ️ Nothing to migrate, data is already stored in {filepath.name}.")
+        return
+
+    migrate_data(source_path, filepath)
+
+if __name__ == "__main__":
+    migrate_storage(sys.argv[1] if len(sys.argv) > 1 else None)
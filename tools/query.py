@@ -0,0 +1,57 @@
+import argparse
+import sys
+import time
+
+from app.query import AGGREGATES, GROUP_KEYS, Query
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Filter and aggregate expenses.",
+        epilog="examples:\n"
+               "  python -m tools.query --start 2025-01-01 --group-by month\n"
+               "  python -m tools.query --category Groceries --category Snacks --min 20 --notes market\n"
+               "  python -m tools.query --group-by year category --agg sum count mean --format csv",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--start", help="first date, YYYY-MM-DD or YYYY/MM/DD")
+    parser.add_argument("--end", help="last date (inclusive)")
+    parser.add_argument("--category", action="append", dest="categories", help="repeat for several categories")
+    parser.add_argument("--min", type=float, dest="min_amount", help="smallest amount")
+    parser.add_argument("--max", type=float, dest="max_amount", help="largest amount")
+    parser.add_argument("--notes", help="case-insensitive text the notes must contain")
+    parser.add_argument("--group-by", nargs="+", default=[], choices=list(GROUP_KEYS))
+    parser.add_argument("--agg", nargs="+", choices=AGGREGATES, help="aggregates over Amount (default: sum when grouping)")
+    parser.add_argument("--format", choices=["table", "csv", "json"], default="table")
+    parser.add_argument("--limit", type=int, help="print at most this many rows")
+    parser.add_argument("--explain", action="store_true", help="print how the query will be answered")
+    args = parser.parse_args()
+
+    try:
+        query = Query(args.start, args.end, args.categories, args.min_amount, args.max_amount,
+                      args.notes, args.group_by, args.agg)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(2)
+
+    if args.explain:
+        print(f"🧭 Plan: {query.explain()}", file=sys.stderr)
+
+    started = time.perf_counter()
+    result = query.run()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if args.limit is not None:
+        result = result.head(args.limit)
+
+    if args.format == "csv":
+        result.to_csv(sys.stdout, index=False)
+    elif args.format == "json":
+        print(result.to_json(orient="records", date_format="iso"))
+    elif result.empty:
+        print("No matching expenses.")
+    else:
+        print(result.to_string(index=False))
+    print(f"⏱️ {len(result)} rows in {elapsed_ms:.0f} ms", file=sys.stderr)
+    sys.exit(0 if not result.empty else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import sys
+
+from app.expense_utils import ensure_data_file, load_data
+from app.rollups import Rollups, load_rollups, save_rollups
+from app.storage import data_lock, get_data_signature
+
+def rebuild_rollups(verify_only=False):
+    """Recompute the spending rollups from the raw expenses, or only check them with --verify."""
+    filepath = ensure_data_file()
+    with data_lock:
+        df, _ = load_data()
+        signature = get_data_signature(filepath)
+        expected = Rollups.from_frame(df, signature)
+        current = load_rollups(filepath, signature)
+
+        if current is None:
+            print("⚠️ Rollups are missing or out of date.")
+            problems = None
+        else:
+            problems = current.differences(expected)
+            for problem in problems:
+                print(f"❌ {problem}")
+
+        if verify_only:
+            if problems == []:
+                print(f"✅ Rollups match the data ({expected.count} expenses).")
+            return problems == []
+
+        save_rollups(expected, filepath)
+        print(f"✅ Rollups rebuilt from {expected.count} expenses.")
+        return True
+
+if __name__ == "__main__":
+    ok = rebuild_rollups(verify_only='--verify' in sys.argv)
+    sys.exit(0 if ok else 1)
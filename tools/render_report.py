@@ -0,0 +1,71 @@
+import argparse
+import html
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from app.expense_utils import get_rollups
+
+def _init_worker():
+    # Worker processes never open a window
+    import matplotlib
+    matplotlib.use("Agg")
+
+def _render(job):
+    from visuals.render import render_chart
+    kind, params, fmt, directory = job
+    path, rendered = render_chart(kind, fmt, directory, **params)
+    return kind, params, path, rendered
+
+def report_jobs(rollups):
+    """Every month's chart, then the category and cumulative charts."""
+    jobs = []
+    for key in sorted(rollups.monthly):
+        year, month = (int(part) for part in key.split('/'))
+        jobs.append(('monthly', {'month': month, 'year': year}))
+    jobs.append(('category', {}))
+    jobs.append(('cumulative', {}))
+    return jobs
+
+def write_index(directory, results):
+    """A small HTML page showing the report's charts, newest month first."""
+    charts = [(kind, params, path) for kind, params, path, _ in results if path is not None]
+    charts.sort(key=lambda c: (c[0] == 'monthly', -(c[1].get('year', 0) * 100 + c[1].get('month', 0))))
+    lines = ["<!DOCTYPE html>", "<meta charset='utf-8'>", "<title>Expense Report</title>", "<h1>Expense Report</h1>"]
+    for kind, params, path in charts:
+        title = f"{params['month']:02d}/{params['year']}" if kind == 'monthly' else kind.title()
+        lines.append(f"<h2>{html.escape(title)}</h2><img src='{html.escape(path.name)}' width='800'>")
+    index = Path(directory) / "index.html"
+    index.write_text("\n".join(lines), encoding="utf-8")
+    return index
+
+def render_report(output=None, fmt="png", workers=None):
+    """Render all charts headless across a process pool. Unchanged charts come from the cache."""
+    from visuals.render import get_chart_dir
+
+    started = time.perf_counter()
+    # Bring the rollups up to date once here, so the workers only read them
+    jobs = report_jobs(get_rollups())
+    directory = Path(output) if output else get_chart_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        results = list(pool.map(_render, [(kind, params, fmt, directory) for kind, params in jobs]))
+
+    index = write_index(directory, results)
+    rendered = sum(1 for *_, was_rendered in results if was_rendered)
+    print(f"✅ {len(results)} charts ready in {directory} ({rendered} rendered, "
+          f"{len(results) - rendered} cached) in {time.perf_counter() - started:.1f} s")
+    print(f"📄 Open {index}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Render every chart to PNG/SVG files.")
+    parser.add_argument("--output", help="directory for the charts (default: data/charts/<ledger>/)")
+    parser.add_argument("--format", choices=["png", "svg"], default="png")
+    parser.add_argument("--workers", type=int, help="number of processes (default: one per CPU)")
+    args = parser.parse_args()
+    render_report(args.output, args.format, args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import matplotlib.dates as mdates
+
+# ========== ALGORITHMS ==========
+# Both return the sorted positions of the points to keep, so any x/y arrays can be
+# indexed with the result. The first and last points are always kept.
+
+def lttb_indices(x, y, points):
+    """Largest-Triangle-Three-Buckets: keep the point of each bucket that spans the
+    largest triangle with the previously kept point and the next bucket's average.
+    Good for smooth series such as running totals."""
+    n = len(y)
+    if points >= n or points < 3:
+        return np.arange(n)
+
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    keep = np.empty(points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(area.argmax())
+        keep[i + 1] = previous
+    return keep
+
+def min_max_indices(y, points):
+    """Keep the lowest and highest point of each of points/2 buckets, so no spike is lost.
+    Good for spiky series such as daily totals."""
+    n = len(y)
+    buckets = points // 2
+    if buckets < 1 or 2 * buckets >= n:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    keep = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            keep.append(start + int(y[start:end].argmin()))
+            keep.append(start + int(y[start:end].argmax()))
+    return np.unique(keep)
+
+METHODS = {
+    'lttb': lambda x, y, points: lttb_indices(x, y, points),
+    'minmax': lambda x, y, points: min_max_indices(y, points),
+}
+
+def as_numbers(x):
+    """x as floats: matplotlib date numbers for dates, the values themselves otherwise."""
+    if isinstance(x, pd.DatetimeIndex) or pd.api.types.is_datetime64_any_dtype(x):
+        return mdates.date2num(np.asarray(x, dtype='datetime64[ns]'))
+    return np.asarray(x, dtype=float)
+
+def screen_points(fig):
+    """Roughly one point per horizontal pixel of the figure."""
+    return int(fig.get_figwidth() * fig.dpi)
+
+# ========== ZOOM ==========
+
+class ZoomResampler:
+    """Keeps a plotted line at about screen resolution while zooming and panning.
+
+    The full series stays in memory; whenever the x-limits change, the visible part is
+    down-sampled again and swapped into the line (and its filled area, if any), so
+    zooming in reveals the detail that was dropped at full scale.
+    """
+
+    def __init__(self, ax, x, y, points, method='lttb'):
+        self.ax = ax
+        self.x = x
+        self.y = np.asarray(y, dtype=float)
+        self.x_numbers = as_numbers(x)
+        self.points = points
+        self.method = METHODS[method]
+        self.line = None
+        self.fill = None
+        self.updating = False
+
+    def sample(self, lo=None, hi=None):
+        """Positions of the points to draw for the x-range [lo, hi] (default: everything)."""
+        start, end = 0, len(self.y)
+        if lo is not None:
+            # One extra point on each side so the line runs to the edges of the view
+            start = max(int(np.searchsorted(self.x_numbers, lo, side='left')) - 1, 0)
+            end = min(int(np.searchsorted(self.x_numbers, hi, side='right')) + 1, len(self.y))
+        return start + self.method(self.x_numbers[start:end], self.y[start:end], self.points)
+
+    def plot(self, fill=None, **style):
+        """Draw the down-sampled series (and fill_between it when fill is given), then
+        follow the x-limits."""
+        keep = self.sample()
+        self.line, = self.ax.plot(self.x[keep], self.y[keep], **style)
+        if fill is not None:
+            self.fill = self.ax.fill_between(self.x[keep], self.y[keep], **fill)
+        # A plain function rather than a bound method: matplotlib only keeps weak
+        # references to bound methods, which would let this object be collected
+        self.ax.callbacks.connect('xlim_changed', lambda ax: self.update(ax))
+        return self.line
+
+    def update(self, ax):
+        if self.updating:
+            return
+        self.updating = True
+        try:
+            keep = self.sample(*ax.get_xlim())
+            self.line.set_data(self.x[keep], self.y[keep])
+            if self.fill is not None:
+                # Reshape the existing polygon rather than calling fill_between again,
+                # which would ask for an autoscale in the middle of a zoom
+                x, y = self.x_numbers[keep], self.y[keep]
+                self.fill.set_verts([np.column_stack([
+                    np.concatenate([x[:1], x, x[-1:]]),
+                    np.concatenate([[0.0], y, [0.0]]),
+                ])])
+            ax.figure.canvas.draw_idle()
+        finally:
+            self.updating = False
@@ -1,69 +1,141 @@
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from pathlib import Path
 
-def plot_monthly_spending(df, month, year):
-    """
-    Plot daily spending for a given month and year.
-    """
-    df['Date'] = pd.to_datetime(df['Date'], format='%Y/%m/%d')
-    filtered_df = df[(df['Date'].dt.month == month) & (df['Date'].dt.year == year)]
+from app.config import get_setting
+from app.instrument import timed
+from app.query import Query
+from .downsample import ZoomResampler, screen_points
 
-    if filtered_df.empty:
-        print(f"No expenses found for {month:02d}/{year}.")
-        return
+FIGSIZE = (10, 6)
+
+# ========== DATA ==========
+# Built on app.query: with df=None the totals come from the rollups, otherwise df is filtered.
+
+def monthly_spending_data(df, month, year):
+    """Daily totals of one month indexed by day. df=None reads them from the rollups."""
+    start = pd.Timestamp(year=year, month=month, day=1)
+    daily = Query(start=start, end=start + pd.offsets.MonthEnd(0), group_by='day').series(df)
+    daily.index = daily.index.day
+    return daily
 
-    daily_spending = filtered_df.groupby(filtered_df['Date'].dt.day)['Amount'].sum()
+def category_spending_data(df=None):
+    """Totals per category, smallest first. df=None reads them from the rollups."""
+    return Query(group_by='category').series(df).sort_values()
 
-    plt.figure(figsize=(10, 6))
-    plt.plot(daily_spending.index, daily_spending.values, marker='o')
+def cumulative_spending_data(df=None):
+    """Running total indexed by date. df=None gives the per-day running total from the rollups."""
+    if df is None:
+        return Query(group_by='day').series().cumsum()
+    rows = Query().run(df)
+    return pd.Series(rows['Amount'].cumsum().to_numpy(), index=pd.DatetimeIndex(rows['Date']), name='Amount')
+
+def full_resolution_setting():
+    """The plot_full_resolution setting; env vars arrive as strings such as '1' or 'true'."""
+    value = get_setting('plot_full_resolution')
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+# ========== DRAWING ==========
+# The draw_* functions only use the Figure/Axes API, so they work both on pyplot figures
+# shown on screen and on plain Agg figures saved to PNG/SVG.
+# Long series are down-sampled to about one point per pixel (and re-sampled on zoom);
+# full_resolution=True draws every point.
+
+def plot_series(fig, ax, x, y, full_resolution, method, fill=None, **style):
+    """ax.plot(x, y) (plus fill_between when fill is given), down-sampled unless full_resolution."""
+    if full_resolution:
+        line, = ax.plot(x, y, **style)
+        if fill is not None:
+            ax.fill_between(x, y, **fill)
+        return line
+    return ZoomResampler(ax, x, y, screen_points(fig), method).plot(fill, **style)
+
+def draw_monthly_spending(fig, daily_spending, month, year, full_resolution=False):
+    ax = fig.add_subplot()
+    # Min/max buckets keep every spike of the daily totals
+    plot_series(fig, ax, daily_spending.index, daily_spending.to_numpy(), full_resolution, 'minmax', marker='o')
+    ax.set_title(f"Daily Spending - {month:02d}/{year}")
+    ax.set_xlabel("Day of Month")
+    ax.set_ylabel("Amount Spent (USD)")
+    ax.set_xticks(daily_spending.index)  # ✅ only show actual days, tilted
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.grid(True)
+
+def draw_spending_per_category(fig, spending_by_category):
+    ax = fig.add_subplot()
+    colors = plt.cm.tab20.colors  # vibrant color palette
+    spending_by_category.plot(kind='barh', color=colors, ax=ax)
+    ax.set_title("Total Spending per Category")
+    ax.set_xlabel("Amount Spent (USD)")
+    ax.set_ylabel("Category")
 
-    plt.title(f"Daily Spending - {month:02d}/{year}")
-    plt.xlabel("Day of Month")
-    plt.ylabel("Amount Spent (USD)")
-    plt.xticks(daily_spending.index, rotation=45)  # ✅ only show actual days, tilted
-    plt.grid(True)
-    plt.tight_layout()
-    plt.show()
+def draw_cumulative_spending(fig, cumulative, full_resolution=False):
+    ax = fig.add_subplot()
+    plot_series(fig, ax, cumulative.index, cumulative.to_numpy(), full_resolution, 'lttb',
+                fill={'color': 'lightblue', 'alpha': 0.3}, color='royalblue', linewidth=2)
+    ax.set_title("Cumulative Spending Over Time")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Total Amount Spent (USD)")
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.grid(True)
 
-def plot_spending_per_category(df):
+def show_or_save(draw, output, *args):
+    """Draw on an interactive pyplot figure, or headless on an Agg figure saved to output."""
+    fig = plt.figure(figsize=FIGSIZE) if output is None else Figure(figsize=FIGSIZE)
+    draw(fig, *args)
+    fig.tight_layout()
+    if output is None:
+        plt.show()
+        return None
+    # The format (png, svg, ...) follows the file extension
+    fig.savefig(output)
+    return Path(output)
+
+# ========== CHARTS ==========
+
+@timed('plot_monthly_spending')
+def plot_monthly_spending(df, month, year, output=None, full_resolution=None):
     """
-    Plot total spending per category.
+    Plot daily spending for a given month and year.
+    Pass df=None to read the daily totals from the rollups, and output to save the
+    chart to a PNG/SVG file instead of showing it. full_resolution=None follows the
+    plot_full_resolution setting.
     """
-    df['Date'] = pd.to_datetime(df['Date'], format='%Y/%m/%d')
-
-    spending_by_category = df.groupby('Category')['Amount'].sum().sort_values()
+    daily_spending = monthly_spending_data(df, month, year)
+    if daily_spending.empty:
+        print(f"No expenses found for {month:02d}/{year}.")
+        return None
+    if full_resolution is None:
+        full_resolution = full_resolution_setting()
+    return show_or_save(draw_monthly_spending, output, daily_spending, month, year, full_resolution)
 
+@timed('plot_spending_per_category')
+def plot_spending_per_category(df=None, output=None):
+    """
+    Plot total spending per category.
+    Pass df=None to read the category totals from the rollups.
+    """
+    spending_by_category = category_spending_data(df)
     if spending_by_category.empty:
         print("❌ No spending data available.")
-        return
+        return None
+    return show_or_save(draw_spending_per_category, output, spending_by_category)
 
-    plt.figure(figsize=(10, 6))
-    colors = plt.cm.tab20.colors  # vibrant color palette
-    spending_by_category.plot(kind='barh', color=colors)
-    plt.title("Total Spending per Category")
-    plt.xlabel("Amount Spent (USD)")
-    plt.ylabel("Category")
-    plt.tight_layout()
-    plt.show()
-
-def plot_cumulative_spending(df):
+@timed('plot_cumulative_spending')
+def plot_cumulative_spending(df=None, output=None, full_resolution=None):
     """
     Plot cumulative spending over time (line + filled area).
+    Pass df=None to plot the per-day running total from the rollups. The line is
+    down-sampled to screen resolution and re-sampled on zoom unless full_resolution
+    (default: the plot_full_resolution setting).
     """
-    df['Date'] = pd.to_datetime(df['Date'], format='%Y/%m/%d')
-    df = df.sort_values(by='Date')
-
-    df['Cumulative'] = df['Amount'].cumsum()
-
-    plt.figure(figsize=(10, 6))
-    plt.plot(df['Date'], df['Cumulative'], color='royalblue', linewidth=2)
-    plt.fill_between(df['Date'], df['Cumulative'], color='lightblue', alpha=0.3)
-
-    plt.title("Cumulative Spending Over Time")
-    plt.xlabel("Date")
-    plt.ylabel("Total Amount Spent (USD)")
-    plt.xticks(rotation=45)
-    plt.grid(True)
-    plt.tight_layout()
-    plt.show()
\ No newline at end of file
+    cumulative = cumulative_spending_data(df)
+    if cumulative.empty:
+        print("❌ No spending data available.")
+        return None
+    if full_resolution is None:
+        full_resolution = full_resolution_setting()
+    return show_or_save(draw_cumulative_spending, output, cumulative, full_resolution)
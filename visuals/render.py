@@ -0,0 +1,78 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from app.expense_utils import get_data_filepath
+from app.instrument import timed
+from .plot_utils import (
+    category_spending_data, cumulative_spending_data, monthly_spending_data, show_or_save,
+    draw_cumulative_spending, draw_monthly_spending, draw_spending_per_category,
+)
+
+CHART_DIRNAME = 'charts'
+FORMATS = ('png', 'svg')
+
+# Bump when the look of the charts changes so cached images are redrawn
+RENDER_VERSION = 2
+
+# kind -> (data loader, draw function); the chart params are passed to both
+CHARTS = {
+    'monthly': (lambda month, year: monthly_spending_data(None, month, year), draw_monthly_spending),
+    'category': (lambda: category_spending_data(None), draw_spending_per_category),
+    'cumulative': (lambda: cumulative_spending_data(None), draw_cumulative_spending),
+}
+
+def get_chart_dir(filepath=None):
+    """Rendered charts of data/Expense_Tracker.* are cached in data/charts/Expense_Tracker/."""
+    filepath = Path(filepath or get_data_filepath())
+    return filepath.parent / CHART_DIRNAME / filepath.stem
+
+def chart_name(kind, **params):
+    """Stable file name prefix for a chart and its parameters, e.g. monthly-2025-03."""
+    if kind == 'monthly':
+        return f"monthly-{params['year']:04d}-{params['month']:02d}"
+    return '-'.join([kind] + [f"{k}{v}" for k, v in sorted(params.items())])
+
+def data_version(data):
+    """Hash of the numbers a chart is drawn from.
+
+    Charts are keyed on their own input rather than on the whole ledger, so adding an
+    expense in March leaves every other month's cached chart valid.
+    """
+    digest = hashlib.sha256(json.dumps(RENDER_VERSION).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+@timed('render_chart')
+def render_chart(kind, fmt='png', directory=None, **params):
+    """Render a chart headless to PNG/SVG, reusing the cached file when its data is unchanged.
+
+    Returns (path, rendered): rendered is False on a cache hit, and path is None when
+    there is nothing to plot.
+    """
+    if kind not in CHARTS:
+        raise ValueError(f"Unknown chart '{kind}'. Choose from: {', '.join(CHARTS)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported image format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+
+    load, draw = CHARTS[kind]
+    data = load(**params)
+    if data.empty:
+        return None, False
+
+    directory = Path(directory or get_chart_dir())
+    prefix = chart_name(kind, **params)
+    path = directory / f"{prefix}.{data_version(data)}.{fmt}"
+    if path.exists():
+        return path, False
+
+    directory.mkdir(parents=True, exist_ok=True)
+    for stale in directory.glob(f"{prefix}.*.{fmt}"):
+        stale.unlink()
+    tmp_path = path.with_name(f"{path.stem}.tmp.{fmt}")
+    show_or_save(lambda fig: draw(fig, data, **params), tmp_path)
+    os.replace(tmp_path, path)
+    return path, True